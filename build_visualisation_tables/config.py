@@ -6,6 +6,20 @@ PROJECT_FOLDER = "multi-campagne"
 WORKSPACE_PATH = workspace.files_path
 # WORKSPACE_PATH = os.path.join(os.getcwd(), "build_visualisation_tables", "workspace")
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
+PARTITION_STATE_FILE_PATH = os.path.join(
+    OUTPUTS_PATH, "build_visualisation_tables_partitions.json"
+)
+
+# dataset exports (tables above the xlsx row limit are only exported as parquet and csv)
+dataset_export_formats = ("parquet", "xlsx", "csv")
+dataset_max_rows_per_format = {"xlsx": 100_000}
+
+# database writes (number of rows sent per COPY / insert batch)
+db_copy_batch_size = 100_000
+# tables are loaded as '<table><db_staging_suffix>' then swapped in a single transaction
+db_staging_suffix = "_staging"
+# table keeping the fingerprint of the data of each published table
+db_fingerprints_table = "build_visualisation_tables_fingerprints"
 
 # campaign name cleaning and mapping
 campaign_name_cleaning_dict = {
@@ -201,6 +215,13 @@ cvrg_group_by_cols = [
     "site",
 ]
 
+# expected structure columns kept in the coverage table
+cvrg_expected_structure_cols = cvrg_group_by_cols + [
+    "LVL_3_NAME",
+    "LVL_6_NAME",
+    "order_day",
+]
+
 cvrg_district_level_target_keys = [
     "year",
     "round",
@@ -311,9 +332,15 @@ stock_tcv_cols = (
     ]
 )
 
-stocks_cols_selection_1 = ["period", "round", "year", "org_unit_id"]
-stocks_cols_selection_2 = stocks_cols_selection_1 + ["produit", "product_status"]
-stocks_cols_selection_3 = stocks_cols_selection_1 + ["produit"]
+stocks_cols_selection_2 = [
+    "period",
+    "round",
+    "year",
+    "org_unit_id",
+    "produit",
+    "product_status",
+]
+stocks_cols_selection_3 = ["period", "round", "year", "org_unit_id", "produit"]
 
 stocks_campaign_map = {
     "polio": stock_polio_cols,
@@ -362,8 +389,13 @@ supervision_campaign_map = {
     "méningite": supervision_men5_cols,
 }
 
-supervision_cols_selection_1 = ["period", "round", "year", "org_unit_id"]
-supervision_cols_selection_2 = supervision_cols_selection_1 + ["choix_campagne"]
+supervision_cols_selection_2 = [
+    "period",
+    "round",
+    "year",
+    "org_unit_id",
+    "choix_campagne",
+]
 
 # communication table
 communication_deployment_polio = [
@@ -804,3 +836,27 @@ communication_category_mapping = {
     "spots": "spots_diffuses",
     "population_expose": "population_exposee",
 }
+
+# single unpivot pass over the form data, shared by the coverage, stocks, supervision and communication tables
+unpivot_id_vars = ["period", "round", "year", "org_unit_id"]
+unpivot_campaign_maps = {
+    "couverture": cvrg_campaign_map,
+    "stocks": stocks_campaign_map,
+    "surveillance": supervision_campaign_map,
+    "communication": communication_campaign_map,
+}
+
+# columns of combined_iaso_data read by the pipeline (the other form columns are never decoded)
+combined_iaso_data_cols = list(
+    dict.fromkeys(
+        unpivot_id_vars
+        + cmpl_cols_selection_1
+        + ["choix_campagne", "month"]
+        + [
+            col
+            for campaign_map in unpivot_campaign_maps.values()
+            for cols in campaign_map.values()
+            for col in cols
+        ]
+    )
+)
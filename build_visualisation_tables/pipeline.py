@@ -1,19 +1,34 @@
+import io
+import json
 import os
 import pandas as pd
 import numpy as np
 import sqlalchemy as sa
-from openhexa.sdk import current_run, workspace, pipeline
+from openhexa.sdk import current_run, workspace, parameter, pipeline
 from shared_utils import (
+    ExpectedStructure,
+    apply_categorical_schema,
     load_data,
+    load_expected_structure,
     save_file,
+    export_to_dataset,
+    compute_fingerprint,
+    get_storage_backend,
+    read_fingerprint,
 )
 
 from config import (
     OUTPUTS_PATH,
-    cvrg_campaign_map,
+    PARTITION_STATE_FILE_PATH,
+    dataset_export_formats,
+    dataset_max_rows_per_format,
+    db_copy_batch_size,
+    db_staging_suffix,
+    db_fingerprints_table,
     cvrg_yellow_fever_age_adjustment,
     cvrg_rougeole_age_adjustment,
     cvrg_group_by_cols,
+    cvrg_expected_structure_cols,
     cvrg_district_level_target_keys,
     cvrg_district_level_group_keys,
     cvrg_district_level_final_keys,
@@ -25,17 +40,16 @@ from config import (
     cmpl_cols_selection_2,
     cmpl_cols_selection_3,
     cmpl_product_campaign_mapping,
-    stocks_campaign_map,
-    stocks_cols_selection_1,
     stocks_cols_selection_2,
     stocks_cols_selection_3,
     stock_ratios_config,
-    supervision_campaign_map,
-    supervision_cols_selection_1,
     supervision_cols_selection_2,
     communication_campaign_map,
     communication_category_groups,
     months_mapping_dict,
+    unpivot_id_vars,
+    unpivot_campaign_maps,
+    combined_iaso_data_cols,
 )
 from utils import (
     new_cols,
@@ -49,6 +63,11 @@ from utils import (
     communication_categorizer,
     get_communication_category_type,
     process_target_level,
+    get_partition_keys,
+    compute_partition_hashes,
+    get_partition_outputs,
+    sparse_melt,
+    build_unpivot_index,
 )
 
 
@@ -56,7 +75,15 @@ from utils import (
     "build_visualisation_tables",
     name="multi-campagne - Construction des tableaux pour la visualisation",
 )
-def build_visualisation_tables():
+@parameter(
+    "full_rebuild",
+    name="Reconstruction complète",
+    help="Recalculer toutes les campagnes, années et rounds au lieu des seuls modifiés depuis la dernière exécution",
+    type=bool,
+    required=False,
+    default=False,
+)
+def build_visualisation_tables(full_rebuild: bool = False):
     """
     This pipeline creates different tables for vizualization in Power BI and sends them to the database in the OH workspace.
 
@@ -75,22 +102,52 @@ def build_visualisation_tables():
     - ner_vaccination_products_filter_table: contains the list of products to be used as filter in PBI
     - ner_vaccination_combination_filter_table: contains the list of combinations to be used as filter in PBI
     - ner_spatial_units: contains the list of spatial units to be used as filter in PBI
+
+    Unless 'full_rebuild' is set, only the partitions (campaign, year, round) whose inputs changed in
+    combined_iaso_data, combined_target_data or expected_data_structure since the last run are
+    recomputed, and only those partitions are replaced in the database and in the parquet outputs.
+
+    Args:
+        full_rebuild (bool): Whether to recompute all the partitions.
     """
     # data imports
-    combined_df = load_data("combined_iaso_data")
+    combined_df = load_data("combined_iaso_data", columns=combined_iaso_data_cols)
     target_df = load_data("combined_target_data")
-    expected_structure_df = load_data("expected_data_structure")
+    expected_structure = load_expected_structure()
     iaso_org_unit_tree_clean_df = load_data("iaso_org_unit_tree_clean")
 
-    # create datasets
-    cvrg_total, cvrg_df = create_coverage_dataset(combined_df, expected_structure_df)
-    cvrg_csi_district = add_target_data(cvrg_df, target_df, iaso_org_unit_tree_clean_df)
-    cmpl = create_completeness_dataset(
-        combined_df, expected_structure_df, iaso_org_unit_tree_clean_df
+    # detect the partitions whose inputs changed since the last run
+    partition_state = compute_partition_state(
+        combined_df, target_df, expected_structure, iaso_org_unit_tree_clean_df
+    )
+    changed_partitions = (
+        None if full_rebuild else get_changed_partitions(partition_state)
     )
-    stock = create_stocks_dataset(combined_df, cvrg_total)
-    supervision = create_supervision_dataset(combined_df)
-    communication_long, communication = create_communication_dataset(combined_df)
+    if changed_partitions is not None and not changed_partitions:
+        current_run.log_info(
+            "Aucune partition (campagne, année, round) modifiée depuis la dernière exécution. "
+            "Les tables existantes sont conservées."
+        )
+        return
+
+    # create datasets
+    incremental_result = None
+    if changed_partitions is not None:
+        incremental_result = build_incremental_partitioned_tables(
+            combined_df,
+            target_df,
+            expected_structure,
+            iaso_org_unit_tree_clean_df,
+            changed_partitions,
+            partition_state["outputs"],
+        )
+    if incremental_result is None:
+        partitioned_tables = build_partitioned_tables(
+            combined_df, target_df, expected_structure, iaso_org_unit_tree_clean_df
+        )
+    else:
+        partitioned_tables, partition_rows, previous_tables = incremental_result
+
     (
         campaign_filter_table,
         month_filter_table,
@@ -98,8 +155,86 @@ def build_visualisation_tables():
         year_filter_table,
         products_filter_table,
         combination_filter_table,
-    ) = create_filter_tables(combined_df, expected_structure_df)
+    ) = create_filter_tables(combined_df, expected_structure.blocks())
     spatial_units_combined = create_dynamic_org_unit_table(iaso_org_unit_tree_clean_df)
+
+    # write to db
+    reference_tables = {
+        "ner_vaccination_cibles_district": target_df,
+        "ner_vaccination_campaign_filter_table": campaign_filter_table,
+        "ner_vaccination_month_filter_table": month_filter_table,
+        "ner_vaccination_round_filter_table": round_filter_table,
+        "ner_vaccination_year_filter_table": year_filter_table,
+        "ner_vaccination_products_filter_table": products_filter_table,
+        "ner_vaccination_combination_filter_table": combination_filter_table,
+        "ner_spatial_units": spatial_units_combined,
+        "ner_spatial_units_non_dynamic": iaso_org_unit_tree_clean_df,
+    }
+    outputs_dict = {**partitioned_tables, **reference_tables}
+
+    if incremental_result is None:
+        write_tables_to_db(outputs_dict)
+    else:
+        write_partitions_to_db(
+            partitioned_tables,
+            partition_rows,
+            previous_tables,
+            changed_partitions,
+            reference_tables,
+        )
+
+    for table_name, df in outputs_dict.items():
+        save_file(df, table_name)
+        export_to_dataset(
+            df,
+            OUTPUTS_PATH,
+            table_name,
+            description="Données de configuration de campagne (multi-formats)",
+            formats=dataset_export_formats,
+            max_rows_per_format=dataset_max_rows_per_format,
+        )
+
+    save_partition_state(partition_state)
+
+
+def build_partitioned_tables(
+    combined_df: pd.DataFrame,
+    target_df: pd.DataFrame,
+    expected_structure: ExpectedStructure,
+    iaso_org_unit_tree_clean_df: pd.DataFrame,
+) -> dict:
+    """
+    Build the tables whose rows belong to a single partition (campaign, year, round).
+
+    Args:
+        combined_df (pd.DataFrame): The processed data extracted from the IASO multi-campaign form.
+        target_df (pd.DataFrame): The combined target data.
+        expected_structure (ExpectedStructure): The expected structure of the data for each campaign.
+        iaso_org_unit_tree_clean_df (pd.DataFrame): The cleaned organizational unit tree.
+
+    Returns:
+        dict: The partitioned tables, by table name.
+    """
+    unpivoted_df = unpivot_form_data(combined_df)
+    cvrg_total, cvrg_df = create_coverage_dataset(
+        get_unpivoted_table(unpivoted_df, "couverture"),
+        expected_structure,
+    )
+    cvrg_csi_district = add_target_data(cvrg_df, target_df, iaso_org_unit_tree_clean_df)
+    cmpl = create_completeness_dataset(
+        combined_df,
+        expected_structure.materialize(cmpl_cols_selection_2),
+        iaso_org_unit_tree_clean_df,
+    )
+    stock = create_stocks_dataset(
+        get_unpivoted_table(unpivoted_df, "stocks"), cvrg_total
+    )
+    supervision = create_supervision_dataset(
+        get_unpivoted_table(unpivoted_df, "surveillance")
+    )
+    communication_long, communication = create_communication_dataset(
+        get_unpivoted_table(unpivoted_df, "communication")
+    )
     campaign_round_summary = create_campaign_round_summary_table(cvrg_total)
 
     # add month col
@@ -115,8 +250,7 @@ def build_visualisation_tables():
     for df in df_to_modify:
         df = add_month_column(df)
 
-    # write to db
-    outputs_dict = {
+    return {
         "ner_vaccination_couverture": cvrg_total,
         "ner_vaccination_couverture_csi_district_cibled": cvrg_csi_district,
         "ner_vaccination_completude": cmpl,
@@ -124,34 +258,311 @@ def build_visualisation_tables():
         "ner_vaccination_supervision": supervision,
         "ner_vaccination_communications_long": communication_long,
         "ner_vaccination_communications": communication,
-        "ner_vaccination_cibles_district": target_df,
-        "ner_vaccination_campaign_filter_table": campaign_filter_table,
-        "ner_vaccination_month_filter_table": month_filter_table,
-        "ner_vaccination_round_filter_table": round_filter_table,
-        "ner_vaccination_year_filter_table": year_filter_table,
-        "ner_vaccination_products_filter_table": products_filter_table,
-        "ner_vaccination_combination_filter_table": combination_filter_table,
-        "ner_spatial_units": spatial_units_combined,
-        "ner_spatial_units_non_dynamic": iaso_org_unit_tree_clean_df,
         "ner_vaccination_campaign_round_summary": campaign_round_summary,
     }
 
-    for table_name, df in outputs_dict.items():
-        write_to_db(df, table_name)
-        save_file(df, table_name)
-        export_to_dataset(df, OUTPUTS_PATH, table_name)
+
+def compute_partition_state(
+    combined_df: pd.DataFrame,
+    target_df: pd.DataFrame,
+    expected_structure: ExpectedStructure,
+    iaso_org_unit_tree_clean_df: pd.DataFrame,
+) -> dict:
+    """
+    Compute the hash of the inputs of each partition (campaign, year, round). The org unit tree
+    is used by every partition, so it is hashed as a whole. The expected structure is hashed
+    through its dimension tables, without materializing it. The output partitions fed by each
+    partition of the form data are recorded as well (see get_partition_outputs).
+
+    Args:
+        combined_df (pd.DataFrame): The processed data extracted from the IASO multi-campaign form.
+        target_df (pd.DataFrame): The combined target data.
+        expected_structure (ExpectedStructure): The expected structure of the data for each campaign.
+        iaso_org_unit_tree_clean_df (pd.DataFrame): The cleaned organizational unit tree.
+
+    Returns:
+        dict: The hash of the org unit tree ('global'), the hashes of the inputs of each partition ('partitions')
+              and the output partitions fed by each partition of the form data ('outputs').
+    """
+    input_hashes = [
+        compute_partition_hashes(df)
+        for df in [combined_df, target_df, *expected_structure.dimensions.values()]
+    ]
+    partition_keys = sorted(set().union(*input_hashes))
+    return {
+        "global": compute_fingerprint(iaso_org_unit_tree_clean_df),
+        "partitions": {
+            key: "|".join(hashes.get(key, "") for hashes in input_hashes)
+            for key in partition_keys
+        },
+        "outputs": get_partition_outputs(combined_df),
+    }
+
+
+def get_changed_partitions(partition_state: dict) -> list | None:
+    """
+    Compare the partition state with the one saved by the last run. The form data of a campaign
+    can feed the output partitions of other campaigns (e.g. the vitamine A columns feed the polio
+    partitions), so a changed partition of the form data also changes the output partitions its rows
+    feed now or fed at the last run.
+
+    Args:
+        partition_state (dict): The current partition state.
+
+    Returns:
+        list | None: The keys of the changed (new, modified or removed) output partitions, or None if
+                     every partition has to be rebuilt.
+    """
+    if not os.path.exists(PARTITION_STATE_FILE_PATH):
+        current_run.log_info(
+            "Aucun état de partitions précédent. Reconstruction complète des tables."
+        )
+        return None
+
+    try:
+        with open(PARTITION_STATE_FILE_PATH, "r") as f:
+            previous_state = json.load(f)
+    except (OSError, ValueError) as e:
+        current_run.log_warning(
+            f"État de partitions illisible, reconstruction complète des tables : {e}"
+        )
+        return None
+
+    if previous_state.get("global") != partition_state["global"]:
+        current_run.log_info(
+            "La pyramide sanitaire a changé. Reconstruction complète des tables."
+        )
+        return None
+
+    if "outputs" not in previous_state:
+        current_run.log_info(
+            "État de partitions incomplet. Reconstruction complète des tables."
+        )
+        return None
+
+    previous_partitions = previous_state.get("partitions", {})
+    current_partitions = partition_state["partitions"]
+    changed_partitions = sorted(
+        key
+        for key in set(previous_partitions) | set(current_partitions)
+        if previous_partitions.get(key) != current_partitions.get(key)
+    )
+    if changed_partitions:
+        current_run.log_info(
+            f"{len(changed_partitions)} partition(s) modifiée(s) : {', '.join(changed_partitions)}"
+        )
+
+    affected_partitions = set(changed_partitions)
+    for key in changed_partitions:
+        affected_partitions.update(previous_state["outputs"].get(key, []))
+        affected_partitions.update(partition_state["outputs"].get(key, []))
+    if len(affected_partitions) > len(changed_partitions):
+        current_run.log_info(
+            f"Partitions de sortie concernées : {', '.join(sorted(affected_partitions))}"
+        )
+    return sorted(affected_partitions)
+
+
+def save_partition_state(partition_state: dict) -> None:
+    """
+    Save the partition state of the current run.
+
+    Args:
+        partition_state (dict): The partition state.
+
+    Returns:
+        None
+    """
+    tmp_path = f"{PARTITION_STATE_FILE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(partition_state, f, indent=2)
+    os.replace(tmp_path, PARTITION_STATE_FILE_PATH)
+
+
+def build_incremental_partitioned_tables(
+    combined_df: pd.DataFrame,
+    target_df: pd.DataFrame,
+    expected_structure: ExpectedStructure,
+    iaso_org_unit_tree_clean_df: pd.DataFrame,
+    changed_partitions: list,
+    partition_outputs: dict,
+) -> tuple[dict, dict, dict] | None:
+    """
+    Rebuild the partitioned tables for the changed partitions only, and merge the result with
+    the tables saved by the last run.
+
+    The changed partitions are rebuilt from all the form data feeding them, whatever its campaign
+    (see get_partition_outputs). The rebuilt rows of the other partitions fed by this form data are
+    incomplete, and are dropped.
+
+    The incremental result is discarded (None is returned, so that every partition is rebuilt) when
+    it cannot be merged safely: a table of the last run is missing, or the columns of a table changed.
+
+    Args:
+        combined_df (pd.DataFrame): The processed data extracted from the IASO multi-campaign form.
+        target_df (pd.DataFrame): The combined target data.
+        expected_structure (ExpectedStructure): The expected structure of the data for each campaign.
+        iaso_org_unit_tree_clean_df (pd.DataFrame): The cleaned organizational unit tree.
+        changed_partitions (list): The keys of the changed partitions.
+        partition_outputs (dict): The output partitions fed by each partition of the form data.
+
+    Returns:
+        tuple[dict, dict, dict] | None: The merged tables, the rebuilt rows and the tables of the last run,
+                                        by table name, or None.
+    """
+    current_run.log_info(
+        f"Reconstruction incrémentale de {len(changed_partitions)} partition(s)..."
+    )
+    input_partitions = [
+        key
+        for key, outputs in partition_outputs.items()
+        if not set(changed_partitions).isdisjoint(outputs)
+    ]
+    try:
+        blocks = expected_structure.blocks()
+        partitioned_tables = build_partitioned_tables(
+            combined_df[get_partition_keys(combined_df).isin(input_partitions)],
+            target_df[get_partition_keys(target_df).isin(changed_partitions)],
+            expected_structure.select_blocks(
+                blocks[get_partition_keys(blocks).isin(changed_partitions)]
+            ),
+            iaso_org_unit_tree_clean_df,
+        )
+    except Exception as e:
+        current_run.log_warning(
+            f"Échec de la reconstruction incrémentale ({e}). Reconstruction complète des tables."
+        )
+        return None
+
+    merged_tables = {}
+    partition_rows = {}
+    previous_tables = {}
+    for table_name, new_rows in partitioned_tables.items():
+        try:
+            previous_df = load_data(table_name)
+        except FileNotFoundError:
+            current_run.log_warning(
+                f"Table {table_name} introuvable. Reconstruction complète des tables."
+            )
+            return None
+
+        new_rows = new_rows[get_partition_keys(new_rows).isin(changed_partitions)]
+
+        # pivoted tables only have the columns of the values present in the rebuilt partitions
+        if not set(new_rows.columns) <= set(previous_df.columns):
+            current_run.log_warning(
+                f"Les colonnes de la table {table_name} ont changé. Reconstruction complète des tables."
+            )
+            return None
+        missing_value_cols = [
+            col
+            for col in previous_df.columns
+            if col not in new_rows.columns
+            and pd.api.types.is_numeric_dtype(previous_df[col])
+        ]
+        new_rows = new_rows.reindex(columns=previous_df.columns).assign(
+            **{col: 0 for col in missing_value_cols}
+        )
+
+        kept_rows = previous_df[
+            ~get_partition_keys(previous_df).isin(changed_partitions)
+        ]
+        merged_tables[table_name] = pd.concat([kept_rows, new_rows], ignore_index=True)
+        partition_rows[table_name] = new_rows
+        previous_tables[table_name] = previous_df
+
+    return merged_tables, partition_rows, previous_tables
+
+
+def unpivot_form_data(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Unpivot the form data once for all the tables built from the campaign columns (coverage, stocks,
+    supervision and communication). Each non-zero cell is emitted once per (table, campaign) its column
+    belongs to, as listed in the config (unpivot_campaign_maps).
+
+    Args:
+        iaso_form_data_df (pd.DataFrame): the dataframe containing the processed data extracted from the IASO
+        multi-campaign form
+
+    Returns:
+        pd.DataFrame: the unpivoted cells, with the id columns (unpivot_id_vars), the form column ('category'),
+                      its 'value', and the 'table' and 'campaign' it belongs to.
+    """
+    current_run.log_info("Dépivotage des données du formulaire...")
+    try:
+        unpivot_index = build_unpivot_index(
+            unpivot_campaign_maps, iaso_form_data_df.columns
+        )
+
+        for campaign_name in communication_campaign_map:
+            if not (
+                (unpivot_index["table"] == "communication")
+                & (unpivot_index["campaign"] == campaign_name)
+            ).any():
+                current_run.log_warning(
+                    f"Aucune colonne valide trouvée pour la campagne de communication '{campaign_name}'. Cette campagne sera ignorée."
+                )
+
+        # zero or empty entries are not emitted by the unpivot
+        cells = sparse_melt(
+            iaso_form_data_df,
+            id_vars=unpivot_id_vars,
+            value_vars=list(unpivot_index["category"].unique()),
+            var_name="category",
+            value_name="value",
+        )
+        unpivoted_df = cells.merge(unpivot_index, on="category", how="inner")
+
+        for table_name, label in [
+            ("surveillance", "de surveillance"),
+            ("communication", "de communication"),
+        ]:
+            count_all_values = len(iaso_form_data_df) * int(
+                (unpivot_index["table"] == table_name).sum()
+            )
+            count_value_zero = count_all_values - int(
+                (unpivoted_df["table"] == table_name).sum()
+            )
+            if count_value_zero > 0:
+                proportion_value_zero = count_value_zero / count_all_values
+                current_run.log_warning(
+                    f"{count_value_zero} entrées ({proportion_value_zero:.2%}) liées aux informations {label} ont été supprimées car aucune valeur n'a été attribuée."
+                )
+
+        return unpivoted_df
+
+    except Exception as e:
+        msg = f"Erreur lors du dépivotage des données du formulaire: {e}"
+        current_run.log_error(msg)
+        raise
+
+
+def get_unpivoted_table(unpivoted_df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """
+    Select the unpivoted cells belonging to one table.
+
+    Args:
+        unpivoted_df (pd.DataFrame): the output of unpivot_form_data
+        table_name (str): the table name, as a key of unpivot_campaign_maps
+
+    Returns:
+        pd.DataFrame: the cells of the table, without the 'table' column.
+    """
+    return unpivoted_df.loc[unpivoted_df["table"] == table_name].drop(columns=["table"])
 
 
 def create_coverage_dataset(
-    iaso_form_data_df: pd.DataFrame,
-    expected_structure_df: pd.DataFrame,
+    unpivoted_df: pd.DataFrame,
+    expected_structure: ExpectedStructure,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Create coverage tables for visualization.
+    Create coverage tables for visualization. The expected rows are materialized one partition
+    (campaign, year, round) at a time, on the columns of the coverage table only.
 
     Args:
-        iaso_form_data_df (pd.DataFrame): the dataframe containing the processed data extracted from the IASO multi-campaign form
-        expected_structure_df (pd.DataFrame): the dataframe containing the expected structure of the data for each campaign
+        unpivoted_df (pd.DataFrame): the non-zero cells of the coverage columns of the IASO multi-campaign form
+                                     (see unpivot_form_data)
+        expected_structure (ExpectedStructure): the expected structure of the data for each campaign
 
     Returns:
         cvrg_total (pd.DataFrame): Coverage dataset DataFrame.
@@ -160,28 +571,8 @@ def create_coverage_dataset(
     """
     current_run.log_info("Création du tableau de couverture vaccinale...")
     try:
-        id_vars = ["period", "round", "year", "org_unit_id"]
-        all_campaign_data = []
-
-        for campaign_name, cols in cvrg_campaign_map.items():
-            valid_cols = [c for c in cols if c in iaso_form_data_df.columns]
-
-            if not valid_cols:
-                continue
-
-            temp_df = pd.melt(
-                iaso_form_data_df[id_vars + list(set(valid_cols))].fillna(0),
-                id_vars=id_vars,
-                value_vars=list(set(valid_cols)),
-                var_name="category",
-                value_name="value",
-            )
-            temp_df["campaign"] = campaign_name
-            all_campaign_data.append(temp_df)
-
-        df = pd.concat(all_campaign_data, ignore_index=True)
         df = new_cols(
-            df,
+            unpivoted_df.copy(),
             "categorizer",
             "category",
             [
@@ -206,9 +597,9 @@ def create_coverage_dataset(
         )
 
         # remove zero value entries
-        cvrg_total_all_values = df.groupby(cvrg_group_by_cols, as_index=False)[
-            "value"
-        ].sum()
+        cvrg_total_all_values = df.groupby(
+            cvrg_group_by_cols, as_index=False, observed=True
+        )["value"].sum()
         mask_value_zero = cvrg_total_all_values["value"] == 0
         cvrg_total = cvrg_total_all_values[~mask_value_zero].copy()
 
@@ -220,12 +611,28 @@ def create_coverage_dataset(
             )
 
         # merge with expected combined campaign data to ensure all combinations are present
-        df_final = expected_structure_df.merge(
-            cvrg_total,
-            on=cvrg_group_by_cols,
-            how="left",
-            indicator=True,
-        )
+        blocks = expected_structure.blocks()
+        block_partitions = get_partition_keys(blocks)
+        cvrg_partitions = get_partition_keys(cvrg_total)
+        df_final_partitions = [
+            expected_structure.select_blocks(blocks[block_partitions == partition])
+            .materialize(cvrg_expected_structure_cols)
+            .merge(
+                cvrg_total[cvrg_partitions == partition],
+                on=cvrg_group_by_cols,
+                how="left",
+                indicator=True,
+            )
+            for partition in block_partitions.unique()
+        ]
+        if df_final_partitions:
+            df_final = apply_categorical_schema(
+                pd.concat(df_final_partitions, ignore_index=True)
+            )
+        else:
+            df_final = expected_structure.materialize(
+                cvrg_expected_structure_cols
+            ).merge(cvrg_total, on=cvrg_group_by_cols, how="left", indicator=True)
         unmatched_entries_in_iaso = df_final[df_final["_merge"] == "right_only"]
         if not unmatched_entries_in_iaso.empty:
             proportion_unmatched_in_iaso = len(unmatched_entries_in_iaso) / len(
@@ -305,7 +712,7 @@ def add_target_data(
         # 3. Niveau District (Logic Optimized for Consistency)
         rep_ids = (
             iaso_org_unit_tree_clean_df.sort_values(["LVL_3_NAME", "org_unit_id"])
-            .groupby("LVL_3_NAME")["org_unit_id"]
+            .groupby("LVL_3_NAME", observed=True)["org_unit_id"]
             .first()
             .reset_index()
             .rename(columns={"org_unit_id": "rep_id"})
@@ -318,7 +725,7 @@ def add_target_data(
 
         # cvrg_district_df_2 --> CSI level coverage aggregated at district level
         cvrg_district_df_2 = cvrg_csi_df.groupby(
-            cvrg_district_level_group_keys, as_index=False
+            cvrg_district_level_group_keys, as_index=False, observed=True
         ).agg({"value": "sum"})
 
         # cvrg_district_df_1 --> Coverage for campaigns/districts that ONLY report at District level
@@ -338,7 +745,7 @@ def add_target_data(
 
         # Aggregating pure district data to ensure structure matches
         cvrg_district_df_1 = cvrg_district_df_1.groupby(
-            cvrg_district_level_group_keys, as_index=False
+            cvrg_district_level_group_keys, as_index=False, observed=True
         ).agg({"value": "sum"})
 
         # Append the two sources of District data
@@ -355,7 +762,7 @@ def add_target_data(
             cvrg_district_level_target_keys + ["cible"]
         ].drop_duplicates()
         target_district_df = target_df_unique.groupby(
-            cvrg_district_level_target_keys, as_index=False
+            cvrg_district_level_target_keys, as_index=False, observed=True
         )["cible"].sum()
 
         cvrg_district_with_targets = process_target_level(
@@ -378,7 +785,7 @@ def add_target_data(
         # normalize target values for PBI visualisation
         unique_target_cols = ["link_key", "year", "round", "produit", "age", "period"]
         duplication_counts = (
-            cvrg_csi_district.groupby(unique_target_cols)
+            cvrg_csi_district.groupby(unique_target_cols, observed=True)
             .size()
             .reset_index(name="row_count")
         )
@@ -447,7 +854,7 @@ def create_completeness_dataset(
         cmpl["_is_visited"] = cmpl["presence_equipe"] == 1
         cmpl["_first_visit_period"] = (
             cmpl[cmpl["_is_visited"]]
-            .groupby(cmpl_cols_selection_3)["period"]
+            .groupby(cmpl_cols_selection_3, observed=True)["period"]
             .transform("min")
         )
         cmpl["presence_equipe_cum"] = (
@@ -469,7 +876,7 @@ def create_completeness_dataset(
 
 
 def create_stocks_dataset(
-    iaso_form_data_df: pd.DataFrame, cvrg_total: pd.DataFrame
+    unpivoted_df: pd.DataFrame, cvrg_total: pd.DataFrame
 ) -> pd.DataFrame:
     """
     Create table to track stocks during the campaign. This is done by creating the following indicators:
@@ -485,8 +892,8 @@ def create_stocks_dataset(
        1 - (enfants_vaccines / (utilisé * box_ratio)))
 
     Args:
-        iaso_form_data_df (pd.DataFrame): the dataframe containing the processed data extracted from the
-        IASO multi-campaign form
+        unpivoted_df (pd.DataFrame): the non-zero cells of the stock columns of the IASO multi-campaign form
+                                     (see unpivot_form_data)
         cvrg_total (pd.DataFrame): Coverage total DataFrame.
 
     Returns:
@@ -494,30 +901,9 @@ def create_stocks_dataset(
     """
     current_run.log_info("Création du tableau des stocks...")
     try:
-        id_vars = stocks_cols_selection_1
-        all_campaign_data = []
-
-        for campaign_name, cols in stocks_campaign_map.items():
-            valid_cols = [c for c in cols if c in iaso_form_data_df.columns]
-
-            if not valid_cols:
-                continue
-
-            temp_df = pd.melt(
-                iaso_form_data_df[id_vars + list(set(valid_cols))].fillna(0),
-                id_vars=id_vars,
-                value_vars=list(set(valid_cols)),
-                var_name="category",
-                value_name="value",
-            )
-            temp_df["campaign"] = campaign_name
-            all_campaign_data.append(temp_df)
-
-        df = pd.concat(all_campaign_data, ignore_index=True)
-
         df = (
             new_cols(
-                df,
+                unpivoted_df.copy(),
                 "categorizer",
                 "category",
                 [
@@ -529,9 +915,9 @@ def create_stocks_dataset(
             .rename(columns={"produit_categorizer": "produit"})
         )
 
-        stock_total_all_values = df.groupby(stocks_cols_selection_2, as_index=False)[
-            "value"
-        ].sum()
+        stock_total_all_values = df.groupby(
+            stocks_cols_selection_2, as_index=False, observed=True
+        )["value"].sum()
 
         # remove zero value entries
         mask_value_zero = stock_total_all_values["value"] == 0
@@ -549,8 +935,16 @@ def create_stocks_dataset(
             index=stocks_cols_selection_3,
             columns=["product_status"],
             values="value",
+            observed=True,
         ).reset_index()
 
+        # make sure every stock status has a column, even if it was never reported
+        stock_total_pivot = stock_total_pivot.reindex(
+            columns=stock_total_pivot.columns.union(
+                ["stock", "reçu", "utilisé"], sort=False
+            )
+        )
+
         # compute stock metrics
         stock_total_pivot["box_ratio"] = stock_total_pivot["produit"].map(
             stock_ratios_config
@@ -571,7 +965,9 @@ def create_stocks_dataset(
 
         # add number of cases vaccinated from coverage data
         cvrg_stock = (
-            cvrg_total.groupby(stocks_cols_selection_3, as_index=False)["value"]
+            cvrg_total.groupby(stocks_cols_selection_3, as_index=False, observed=True)[
+                "value"
+            ]
             .sum()
             .rename(columns={"value": "enfants_vaccines"})
         )
@@ -579,7 +975,9 @@ def create_stocks_dataset(
         # merge stock data with coverage data to have the number of children vaccinated
         # alongside the stock data to allow to compute a ratio of remaining stock per children
         #  vaccinated in PBI
-        stock = stock_total_pivot.merge(cvrg_stock, how="left").fillna(0)
+        stock = stock_total_pivot.merge(cvrg_stock, how="left")
+        stock_value_cols = stock.select_dtypes("number").columns
+        stock[stock_value_cols] = stock[stock_value_cols].fillna(0)
 
         current_run.log_info("Tableau des stocks créé avec succès.")
 
@@ -591,7 +989,7 @@ def create_stocks_dataset(
         raise
 
 
-def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
+def create_supervision_dataset(unpivoted_df: pd.DataFrame) -> pd.DataFrame:
     """
     Create a table to track the number of notified cases of different types during each campaign.
     The following indicators are calculated:
@@ -603,8 +1001,8 @@ def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
     - 'fievre_jaune_notifie': this indicates the number of cases of yellow fever notified during a given period
 
     Args:
-        iaso_form_data_df (pd.DataFrame): the dataframe containing the processed data extracted from the IASO
-        multi-campaign form
+        unpivoted_df (pd.DataFrame): the non-zero cells of the supervision columns of the IASO multi-campaign
+                                     form (see unpivot_form_data)
 
     Returns:
         supervision_pivot(pd.DataFrame): Supervision dataset DataFrame with the number of cases notified for
@@ -613,36 +1011,7 @@ def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
     """
     current_run.log_info("Création du tableau de surveillance...")
     try:
-        id_vars = supervision_cols_selection_1
-        all_campaign_data = []
-
-        for campaign_name, cols in supervision_campaign_map.items():
-            valid_cols = [c for c in cols if c in iaso_form_data_df.columns]
-
-            if not valid_cols:
-                continue
-
-            temp_df = pd.melt(
-                iaso_form_data_df[id_vars + list(set(valid_cols))].fillna(0),
-                id_vars=id_vars,
-                value_vars=list(set(valid_cols)),
-                var_name="category",
-                value_name="value",
-            )
-            temp_df["choix_campagne"] = campaign_name
-            all_campaign_data.append(temp_df)
-
-        supervision_all_values = pd.concat(all_campaign_data, ignore_index=True)
-
-        # remove zero value entries
-        mask_value_zero = supervision_all_values["value"] == 0
-        supervision = supervision_all_values[~mask_value_zero].copy()
-        count_value_zero = mask_value_zero.sum()
-        if count_value_zero > 0:
-            proportion_value_zero = count_value_zero / len(supervision_all_values)
-            current_run.log_warning(
-                f"{len(mask_value_zero)} entrées ({proportion_value_zero:.2%}) liées aux informations de surveillance ont été supprimées car aucune valeur n'a été attribuée."
-            )
+        supervision = unpivoted_df.rename(columns={"campaign": "choix_campagne"})
 
         supervision = new_cols(
             supervision,
@@ -657,9 +1026,10 @@ def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
             supervision.groupby(
                 supervision_cols_selection_2 + ["supervision"],
                 as_index=False,
+                observed=True,
             )["value"]
             .sum()
-            .fillna(0)
+            .fillna({"value": 0})
         )
 
         supervision_pivot = pd.pivot_table(
@@ -668,6 +1038,7 @@ def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
             columns=["supervision"],
             values="value",
             fill_value=0,
+            observed=True,
         ).reset_index()
 
         current_run.log_info("Tableau de surveillance créé avec succès.")
@@ -680,15 +1051,15 @@ def create_supervision_dataset(iaso_form_data_df: pd.DataFrame) -> pd.DataFrame:
 
 
 def create_communication_dataset(
-    iaso_form_data_df: pd.DataFrame,
+    unpivoted_df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Create two tables (one in long format and one in wide format) to track the different
     communication strategies implemented during each campaign.
 
     Args:
-        iaso_form_data_df (pd.DataFrame): the dataframe containing the processed data extracted
-        from the IASO multi-campaign form
+        unpivoted_df (pd.DataFrame): the non-zero cells of the communication columns of the IASO
+        multi-campaign form (see unpivot_form_data)
 
     Returns:
         communication_long (pd.DataFrame): Communication dataset DataFrame in long format
@@ -696,43 +1067,14 @@ def create_communication_dataset(
     """
     current_run.log_info("Création des tableaux de stratégies de communication...")
     try:
-        id_vars = ["period", "round", "year", "org_unit_id"]
-
-        all_campaign_data = []
-
-        for campaign_name, cols in communication_campaign_map.items():
-            valid_cols = [c for c in cols if c in iaso_form_data_df.columns]
-            if not valid_cols:
-                current_run.log_warning(
-                    f"Aucune colonne valide trouvée pour la campagne de communication '{campaign_name}'. Cette campagne sera ignorée."
-                )
-                continue
-            temp_df = pd.melt(
-                iaso_form_data_df[id_vars + list(set(valid_cols))].fillna(0),
-                id_vars=id_vars,
-                value_vars=list(set(valid_cols)),
-                var_name="raw_indicator",
-                value_name="value",
-            )
-            temp_df["choix_campagne"] = campaign_name
-            temp_df["category"] = temp_df["raw_indicator"].apply(
-                lambda x: get_communication_category_type(
-                    x, communication_category_groups
-                )
-            )
-            all_campaign_data.append(temp_df)
-
-        communication_all_values = pd.concat(all_campaign_data, ignore_index=True)
-
-        # remove zero value entries
-        mask_value_zero = communication_all_values["value"] == 0
-        communication = communication_all_values[~mask_value_zero].copy()
-        count_value_zero = mask_value_zero.sum()
-        if count_value_zero > 0:
-            proportion_value_zero = count_value_zero / len(communication_all_values)
-            current_run.log_warning(
-                f"{len(mask_value_zero)} entrées ({proportion_value_zero:.2%}) liées aux informations de communication ont été supprimées car aucune valeur n'a été attribuée."
-            )
+        communication = unpivoted_df.rename(
+            columns={"category": "raw_indicator", "campaign": "choix_campagne"}
+        )
+        category_lookup = {
+            col: get_communication_category_type(col, communication_category_groups)
+            for col in communication["raw_indicator"].unique()
+        }
+        communication["category"] = communication["raw_indicator"].map(category_lookup)
 
         communication = new_cols(
             communication,
@@ -769,9 +1111,10 @@ def create_communication_dataset(
                     "variable",
                 ],
                 as_index=False,
+                observed=True,
             )["value"]
             .sum()
-            .fillna(0)
+            .fillna({"value": 0})
         )
 
         communication_wide = pd.pivot_table(
@@ -780,6 +1123,7 @@ def create_communication_dataset(
             columns=["variable"],
             values="value",
             fill_value=0,
+            observed=True,
         ).reset_index()
 
         current_run.log_info(
@@ -795,14 +1139,15 @@ def create_communication_dataset(
 
 
 def create_filter_tables(
-    iaso_form_data_df: pd.DataFrame, expected_structure_df: pd.DataFrame
+    iaso_form_data_df: pd.DataFrame, expected_blocks_df: pd.DataFrame
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Create filter tables for visualization in Power BI
 
     Args:
         iaso_form_data_df (pd.DataFrame): The dataframe containing the processed data extracted from the IASO multi-campaign form.
-        expected_structure_df (pd.DataFrame): The dataframe containing the expected structure of the IASO multi-campaign form.
+        expected_blocks_df (pd.DataFrame): The campaign rounds (produit, year, round) of the expected structure of the data
+                                           (see ExpectedStructure.blocks).
 
     Returns:
         campaign_filter_table (pd.DataFrame): DataFrame containing the list of campaigns to be used as filter in PBI
@@ -826,19 +1171,19 @@ def create_filter_tables(
             .reset_index(drop=True)
         )
         round_filter_table = (
-            expected_structure_df[["round"]]
+            expected_blocks_df[["round"]]
             .drop_duplicates()
             .dropna()
             .reset_index(drop=True)
         )
         year_filter_table = (
-            expected_structure_df[["year"]]
+            expected_blocks_df[["year"]]
             .drop_duplicates()
             .dropna()
             .reset_index(drop=True)
         )
         products_filter_table = (
-            expected_structure_df[["produit"]]
+            expected_blocks_df[["produit"]]
             .drop_duplicates()
             .dropna()
             .reset_index(drop=True)
@@ -913,13 +1258,20 @@ def create_dynamic_org_unit_table(
         # DS level choice
         districts = iaso_org_unit_tree_clean_df.copy()
         districts = districts.sort_values(["LVL_3_NAME", "org_unit_id"])
-        spatial_units_choice_0 = districts.groupby("LVL_3_NAME", as_index=False).first()
+        spatial_units_choice_0 = districts.groupby(
+            "LVL_3_NAME", as_index=False, observed=True
+        ).first()
 
         spatial_units_choice_0["choice_org_unit_level"] = "District"
         spatial_units_choice_0["LVL_1_NAME"] = "Niger"
 
-        spatial_units_choice_0["LVL_6_NAME"] = None
-        spatial_units_choice_0["LVL_6_UID"] = None
+        # empty columns typed like the CSI-level ones, so that the concat below does not
+        # depend on how pandas types all-NA columns
+        for col in ["LVL_6_NAME", "LVL_6_UID"]:
+            spatial_units_choice_0[col] = pd.Series(
+                index=spatial_units_choice_0.index,
+                dtype=iaso_org_unit_tree_clean_df[col].dtype,
+            )
 
         spatial_units_choice_0["link_key"] = (
             spatial_units_choice_0["org_unit_id"].astype(str)
@@ -982,10 +1334,10 @@ def create_campaign_round_summary_table(
             .reset_index(drop=True)
         )
         campaign_round_summary_df["round_start"] = campaign_round_summary_df.groupby(
-            ["produit", "year", "round"]
+            ["produit", "year", "round"], observed=True
         )["period"].transform("min")
         campaign_round_summary_df["round_end"] = campaign_round_summary_df.groupby(
-            ["produit", "year", "round"]
+            ["produit", "year", "round"], observed=True
         )["period"].transform("max")
         campaign_round_summary_df = (
             campaign_round_summary_df[
@@ -1027,7 +1379,7 @@ def add_month_column(df: pd.DataFrame) -> pd.DataFrame:
             group_cols = ["produit", "year", "round"]
 
         df["month"] = (
-            df.groupby(group_cols)["period"]
+            df.groupby(group_cols, observed=True)["period"]
             .transform("min")
             .dt.month.map(months_mapping_dict)
         )
@@ -1040,29 +1392,148 @@ def add_month_column(df: pd.DataFrame) -> pd.DataFrame:
         raise
 
 
-def write_to_db(df: pd.DataFrame, table_name: str) -> None:
+_db_engine = None
+
+
+def get_db_engine() -> sa.engine.Engine:
+    """
+    Return the SQLAlchemy engine of the workspace database, created once and shared
+    (with its connection pool) by all the writes of the pipeline.
+
+    Args:
+        None
+
+    Returns:
+        sa.engine.Engine: The database engine.
+    """
+    global _db_engine
+    if _db_engine is None:
+        _db_engine = sa.create_engine(workspace.database_url, pool_pre_ping=True)
+    return _db_engine
+
+
+def get_sql_column_types(df: pd.DataFrame) -> dict:
+    """
+    Derive explicit SQL column types from the pandas dtypes of a dataframe.
+
+    Args:
+        df (pd.DataFrame): The dataframe to write.
+
+    Returns:
+        dict: The SQLAlchemy type of each column.
+    """
+    column_types = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            column_types[col] = sa.Boolean()
+        elif pd.api.types.is_integer_dtype(dtype):
+            column_types[col] = sa.BigInteger()
+        elif pd.api.types.is_float_dtype(dtype):
+            column_types[col] = sa.Float(precision=53)
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            column_types[col] = sa.DateTime(timezone=True)
+        elif pd.api.types.is_datetime64_dtype(dtype):
+            column_types[col] = sa.DateTime()
+        else:
+            column_types[col] = sa.Text()
+    return column_types
+
+
+def copy_dataframe_to_table(
+    df: pd.DataFrame, table_name: str, connection: sa.engine.Connection
+) -> None:
+    """
+    Load a dataframe into an existing PostgreSQL table with COPY FROM STDIN, streaming
+    the rows as CSV in batches of 'db_copy_batch_size' rows. Both the psycopg2 (copy_expert)
+    and the psycopg 3 (copy) drivers are supported.
+
+    Args:
+        df (pd.DataFrame): The dataframe to load.
+        table_name (str): The name of the table.
+        connection (sa.engine.Connection): The connection holding the current transaction.
+
+    Returns:
+        None
+    """
+    preparer = connection.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(str(col)) for col in df.columns)
+    copy_sql = (
+        f"COPY {preparer.quote(table_name)} ({columns}) "
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        for start in range(0, len(df), db_copy_batch_size):
+            buffer = io.StringIO()
+            df.iloc[start : start + db_copy_batch_size].to_csv(
+                buffer, index=False, header=False, na_rep="\\N"
+            )
+            buffer.seek(0)
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(copy_sql, buffer)
+            else:
+                with cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def append_dataframe_to_table(
+    df: pd.DataFrame, table_name: str, connection: sa.engine.Connection
+) -> None:
+    """
+    Append the rows of a dataframe to an existing table, with COPY on PostgreSQL
+    and with to_sql on other databases (e.g. SQLite).
+
+    Args:
+        df (pd.DataFrame): The dataframe to append.
+        table_name (str): The name of the table.
+        connection (sa.engine.Connection): The connection holding the current transaction.
+
+    Returns:
+        None
+    """
+    if connection.dialect.name == "postgresql":
+        copy_dataframe_to_table(df, table_name, connection)
+    else:
+        df.to_sql(
+            name=table_name,
+            con=connection,
+            if_exists="append",
+            index=False,
+            dtype=get_sql_column_types(df),
+            chunksize=db_copy_batch_size,
+        )
+
+
+def write_to_db(
+    df: pd.DataFrame, table_name: str, connection: sa.engine.Connection
+) -> None:
     """
     Write the dataframe to a DB table with a given name. If the table already exists, it will be replaced.
 
+    The table is created with explicit column types derived from the dataframe dtypes. On PostgreSQL
+    the rows are bulk loaded with COPY; on other databases (e.g. SQLite) they are inserted with to_sql.
+
     Args:
         df (pd.DataFrame): The dataframe to write.
         table_name (str): The name of the table to write to.
+        connection (sa.engine.Connection): The connection holding the current transaction.
 
     Returns:
         None
     """
     current_run.log_info(f"Écriture des données dans la table DB {table_name}...")
     try:
-        engine = sa.create_engine(workspace.database_url)
-        connection = engine.connect()
-        df.to_sql(
+        df.head(0).to_sql(
             name=table_name,
             con=connection,
             if_exists="replace",
             index=False,
+            dtype=get_sql_column_types(df),
         )
+        append_dataframe_to_table(df, table_name, connection)
         current_run.log_info(f"Données écrites dans la table DB {table_name}")
-        connection.close()
     except Exception as e:
         msg = (
             f"Erreur lors de l'écriture des données dans la table DB {table_name}: {e}"
@@ -1071,68 +1542,325 @@ def write_to_db(df: pd.DataFrame, table_name: str) -> None:
         raise
 
 
-def export_to_dataset(df: pd.DataFrame, df_file_path: str, dataset_name: str) -> None:
+def get_published_fingerprints(connection: sa.engine.Connection) -> dict:
     """
-    Exports a DataFrame to an OpenHexa dataset in multiple formats (xlsx, parquet, csv).
+    Read the fingerprints of the tables currently published in the database, creating
+    the fingerprints table if needed.
 
     Args:
-        df (pd.DataFrame): The configuration dataframe to export.
-        df_file_path (str): The file path where the dataframe is saved.
-        dataset_name (str): The name of the OpenHexa dataset.
+        connection (sa.engine.Connection): The database connection.
+
+    Returns:
+        dict: The fingerprint of each published table.
     """
-    current_run.log_info(
-        f"Préparation de l'exportation vers le dataset : {dataset_name}..."
+    fingerprints_table = sa.Table(
+        db_fingerprints_table,
+        sa.MetaData(),
+        sa.Column("table_name", sa.Text(), primary_key=True),
+        sa.Column("fingerprint", sa.Text()),
     )
-    try:
-        dataset_slug = dataset_name.lower().strip().replace(" ", "-").replace("_", "-")
+    fingerprints_table.create(connection, checkfirst=True)
+    rows = connection.execute(
+        sa.select(fingerprints_table.c.table_name, fingerprints_table.c.fingerprint)
+    )
+    return {table_name: fingerprint for table_name, fingerprint in rows}
 
-        # check if dataset already exists
-        try:
-            dataset = workspace.get_dataset(dataset_slug)
-            current_run.log_info(f"Dataset existant trouvé : {dataset_slug}")
-        except Exception:
+
+def set_published_fingerprint(
+    connection: sa.engine.Connection, table_name: str, fingerprint: str
+) -> None:
+    """
+    Record the fingerprint of the data of a published table.
+
+    Args:
+        connection (sa.engine.Connection): The connection holding the current transaction.
+        table_name (str): The name of the published table.
+        fingerprint (str): The fingerprint of its data.
+
+    Returns:
+        None
+    """
+    fingerprints_table = connection.dialect.identifier_preparer.quote(
+        db_fingerprints_table
+    )
+    connection.execute(
+        sa.text(f"DELETE FROM {fingerprints_table} WHERE table_name = :table_name"),
+        {"table_name": table_name},
+    )
+    connection.execute(
+        sa.text(
+            f"INSERT INTO {fingerprints_table} (table_name, fingerprint) "
+            "VALUES (:table_name, :fingerprint)"
+        ),
+        {"table_name": table_name, "fingerprint": fingerprint},
+    )
+
+
+def stage_tables(
+    connection: sa.engine.Connection, tables_dict: dict, published_fingerprints: dict
+) -> dict:
+    """
+    Load the tables whose data differs from the published version (different fingerprint) into
+    staging tables. Tables whose data is identical to the published version are not rewritten.
+
+    Args:
+        connection (sa.engine.Connection): The connection holding the publishing transaction.
+        tables_dict (dict): The dataframes to publish, by table name.
+        published_fingerprints (dict): The fingerprint of each published table.
+
+    Returns:
+        dict: The fingerprint of each staged table, by table name.
+    """
+    inspector = sa.inspect(connection)
+    staged_fingerprints = {}
+    for table_name, df in tables_dict.items():
+        fingerprint = compute_fingerprint(df)
+        if (
+            inspector.has_table(table_name)
+            and published_fingerprints.get(table_name) == fingerprint
+        ):
             current_run.log_info(
-                f"Dataset {dataset_name} non trouvé. Création en cours..."
+                f"Table DB {table_name} inchangée, aucune écriture nécessaire."
             )
-            dataset = workspace.create_dataset(
-                name=dataset_name,
-                description="Données de configuration de campagne (multi-formats)",
+            continue
+        write_to_db(df, f"{table_name}{db_staging_suffix}", connection)
+        staged_fingerprints[table_name] = fingerprint
+    return staged_fingerprints
+
+
+def swap_staged_tables(
+    connection: sa.engine.Connection, staged_fingerprints: dict
+) -> None:
+    """
+    Replace the published tables with their staging tables (see stage_tables).
+
+    Args:
+        connection (sa.engine.Connection): The connection holding the publishing transaction.
+        staged_fingerprints (dict): The fingerprint of each staged table, by table name.
+
+    Returns:
+        None
+    """
+    preparer = connection.dialect.identifier_preparer
+    for table_name, fingerprint in staged_fingerprints.items():
+        staging_name = f"{table_name}{db_staging_suffix}"
+        connection.execute(
+            sa.text(f"DROP TABLE IF EXISTS {preparer.quote(table_name)}")
+        )
+        connection.execute(
+            sa.text(
+                f"ALTER TABLE {preparer.quote(staging_name)} "
+                f"RENAME TO {preparer.quote(table_name)}"
             )
+        )
+        set_published_fingerprint(connection, table_name, fingerprint)
+
+
+def write_tables_to_db(tables_dict: dict) -> None:
+    """
+    Publish a set of tables in the database without exposing partial state to readers (e.g. Power BI).
+
+    Each changed table is loaded into a staging table, then all the staging tables replace the
+    published tables, in a single transaction. Tables whose data is identical to the published
+    version (same fingerprint) are not rewritten.
+
+    Args:
+        tables_dict (dict): The dataframes to publish, by table name.
 
-        # define versioning
-        latest_version = dataset.latest_version
-        version_number = (
-            int(latest_version.name.lstrip("v")) + 1 if latest_version else 1
+    Returns:
+        None
+    """
+    current_run.log_info("Publication des tables dans la base de données...")
+    try:
+        with get_db_engine().begin() as connection:
+            staged_fingerprints = stage_tables(
+                connection, tables_dict, get_published_fingerprints(connection)
+            )
+            swap_staged_tables(connection, staged_fingerprints)
+
+        if not staged_fingerprints:
+            current_run.log_info("Aucune table DB modifiée.")
+            return
+        current_run.log_info(
+            f"{len(staged_fingerprints)} tables DB publiées : {', '.join(staged_fingerprints)}"
         )
-        new_version_name = f"v{version_number}"
+    except Exception as e:
+        msg = f"Erreur lors de la publication des tables dans la base de données : {e}"
+        current_run.log_error(msg)
+        raise
 
-        # create local files
-        os.makedirs(df_file_path, exist_ok=True)
-        base_path = os.path.join(df_file_path, dataset_name)
-        files_to_upload = {
-            "parquet": f"{base_path}.parquet",
-            # "xlsx": f"{base_path}.xlsx", # commented out to avoid creating excel files as some are too large
-            "csv": f"{base_path}.csv",
-        }
 
-        df.to_parquet(files_to_upload["parquet"], index=False)
-        # df.to_excel(files_to_upload["xlsx"], index=False)
-        df.to_csv(files_to_upload["csv"], index=False)
+def can_replace_partitions_in_place(
+    inspector: sa.engine.reflection.Inspector,
+    table_name: str,
+    published_fingerprint: str | None,
+    previous_df: pd.DataFrame,
+    new_rows: pd.DataFrame,
+) -> bool:
+    """
+    Check whether the partitions of a published table can be replaced with delete and insert
+    statements, i.e. the published table holds the data of the last saved parquet file and the
+    rebuilt rows have the same columns and column types.
 
-        # upload to Dataset in OH
-        version = dataset.create_version(new_version_name)
+    Args:
+        inspector (sa.engine.reflection.Inspector): The inspector of the database connection.
+        table_name (str): The name of the table.
+        published_fingerprint (str | None): The fingerprint of the published table.
+        previous_df (pd.DataFrame): The table saved by the last run.
+        new_rows (pd.DataFrame): The rebuilt rows of the changed partitions.
 
-        for format_type, file_path in files_to_upload.items():
-            version.add_file(file_path, os.path.basename(file_path))
-            current_run.log_info(
-                f"Fichier {format_type} ajouté à la version {new_version_name}"
+    Returns:
+        bool: True if the partitions can be replaced in place.
+    """
+    if not inspector.has_table(table_name):
+        return False
+    saved_fingerprint = read_fingerprint(
+        get_storage_backend(), f"{table_name}.parquet.fingerprint"
+    ).get("fingerprint")
+    if published_fingerprint is None or published_fingerprint != saved_fingerprint:
+        return False
+
+    published_columns = [col["name"] for col in inspector.get_columns(table_name)]
+    if published_columns != [str(col) for col in new_rows.columns]:
+        return False
+
+    if len(new_rows) == 0:
+        return True
+    new_types = [type(t) for t in get_sql_column_types(new_rows).values()]
+    previous_types = [type(t) for t in get_sql_column_types(previous_df).values()]
+    return new_types == previous_types
+
+
+def replace_partitions(
+    connection: sa.engine.Connection,
+    table_name: str,
+    df: pd.DataFrame,
+    new_rows: pd.DataFrame,
+    previous_df: pd.DataFrame,
+    changed_partitions: list,
+) -> None:
+    """
+    Replace the changed partitions of a published table: the rows of the changed partitions are
+    deleted and the rebuilt rows are inserted.
+
+    Args:
+        connection (sa.engine.Connection): The connection holding the publishing transaction.
+        table_name (str): The name of the table.
+        df (pd.DataFrame): The merged table.
+        new_rows (pd.DataFrame): The rebuilt rows of the changed partitions.
+        previous_df (pd.DataFrame): The table saved by the last run.
+        changed_partitions (list): The keys of the changed partitions.
+
+    Returns:
+        None
+    """
+    # delete the published rows of the changed partitions
+    partition_cols = [
+        "choix_campagne" if "choix_campagne" in df.columns else "produit",
+        "year",
+        "round",
+    ]
+    rows_to_delete = previous_df[
+        get_partition_keys(previous_df).isin(changed_partitions)
+    ][partition_cols].drop_duplicates()
+    table = sa.table(table_name, *(sa.column(col) for col in partition_cols))
+    for values in rows_to_delete.itertuples(index=False, name=None):
+        conditions = [
+            (
+                table.c[col].is_(None)
+                if pd.isna(value)
+                else table.c[col] == (value.item() if hasattr(value, "item") else value)
+            )
+            for col, value in zip(partition_cols, values)
+        ]
+        connection.execute(table.delete().where(sa.and_(*conditions)))
+
+    # insert the rebuilt rows
+    if len(new_rows) > 0:
+        append_dataframe_to_table(new_rows, table_name, connection)
+
+    set_published_fingerprint(connection, table_name, compute_fingerprint(df))
+    current_run.log_info(
+        f"Table DB {table_name} : {len(rows_to_delete)} partition(s) remplacée(s), "
+        f"{len(new_rows)} lignes insérées."
+    )
+
+
+def write_partitions_to_db(
+    tables_dict: dict,
+    partition_rows: dict,
+    previous_tables: dict,
+    changed_partitions: list,
+    reference_tables: dict,
+) -> None:
+    """
+    Publish the result of an incremental run in a single transaction: the changed partitions of
+    the partitioned tables are replaced in place (see replace_partitions), and the other tables are
+    replaced through staging tables (see write_tables_to_db), so that readers (e.g. Power BI) never
+    see a partially published run.
+
+    A partitioned table is fully replaced instead of updated in place when it is not published yet,
+    when its published content does not match the last saved parquet file, or when its columns changed.
+
+    Args:
+        tables_dict (dict): The merged tables, by table name.
+        partition_rows (dict): The rebuilt rows of the changed partitions, by table name.
+        previous_tables (dict): The tables saved by the last run, by table name.
+        changed_partitions (list): The keys of the changed partitions.
+        reference_tables (dict): The tables that are not partitioned, by table name.
+
+    Returns:
+        None
+    """
+    current_run.log_info(
+        "Mise à jour des partitions modifiées dans la base de données..."
+    )
+    try:
+        with get_db_engine().begin() as connection:
+            published_fingerprints = get_published_fingerprints(connection)
+            inspector = sa.inspect(connection)
+
+            updated_tables = {}
+            fully_replaced_tables = {}
+            for table_name, df in tables_dict.items():
+                if can_replace_partitions_in_place(
+                    inspector,
+                    table_name,
+                    published_fingerprints.get(table_name),
+                    previous_tables[table_name],
+                    partition_rows[table_name],
+                ):
+                    updated_tables[table_name] = df
+                else:
+                    fully_replaced_tables[table_name] = df
+            if fully_replaced_tables:
+                current_run.log_info(
+                    f"Remplacement complet des tables DB : {', '.join(fully_replaced_tables)}"
+                )
+
+            # the staging tables are loaded first, so that the published tables are only locked
+            # by the partition updates and the swap, at the end of the transaction
+            staged_fingerprints = stage_tables(
+                connection,
+                {**fully_replaced_tables, **reference_tables},
+                published_fingerprints,
             )
+            for table_name, df in updated_tables.items():
+                replace_partitions(
+                    connection,
+                    table_name,
+                    df,
+                    partition_rows[table_name],
+                    previous_tables[table_name],
+                    changed_partitions,
+                )
+            swap_staged_tables(connection, staged_fingerprints)
 
         current_run.log_info(
-            f"Exportation terminée avec succès pour {dataset_name} ({new_version_name})"
+            f"{len(updated_tables) + len(staged_fingerprints)} tables DB publiées."
         )
     except Exception as e:
-        msg = f"Erreur lors de l'exportation vers le dataset {dataset_name}: {e}"
+        msg = f"Erreur lors de la mise à jour des partitions dans la base de données : {e}"
         current_run.log_error(msg)
         raise
 
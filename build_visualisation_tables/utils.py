@@ -1,6 +1,8 @@
 from openhexa.sdk import current_run
+import hashlib
+import numpy as np
 import pandas as pd
-from sqlalchemy import inspect
+import inspect
 import config
 
 
@@ -158,12 +160,37 @@ def get_communication_category_type(col_name: str, master_groups: dict) -> str:
     return "N/A"
 
 
+def build_category_lookup(values: pd.Index, function_list: list) -> pd.DataFrame:
+    """
+    Applies the categorizer functions once per distinct value, instead of once per row.
+
+    Parameters:
+        values (pd.Index): The distinct values to categorize (e.g. the melted form column names).
+        function_list (list): The categorizer functions.
+
+    Returns:
+        pd.DataFrame: The lookup table, indexed by value, with one column per categorizer
+                      (named after the function without its last '_' suffix).
+    """
+    return pd.DataFrame(
+        {
+            fun.__name__.rsplit("_", maxsplit=1)[0]: [fun(value) for value in values]
+            for fun in function_list
+        },
+        index=values,
+        dtype=object,
+    )
+
+
 def new_cols(
     df: pd.DataFrame, pattern: str, value_col: str, function_list=None
 ) -> pd.DataFrame:
     """
     Adds new columns to the dataframe based on functions whose names contain a specific pattern.
 
+    The functions are evaluated once per distinct value of 'value_col' (a few hundred form
+    column names) and the results are mapped back to the rows through the value codes.
+
     Parameters:
         df (pd.DataFrame): The input dataframe to modify.
         pattern (str): A common string in function names to identify relevant functions.
@@ -181,9 +208,12 @@ def new_cols(
             if inspect.isfunction(obj) and pattern in name
         ]
 
-    for fun in function_list:
-        new_colname = fun.__name__.rsplit("_", maxsplit=1)[0]
-        df.loc[:, new_colname] = df[value_col].map(fun)
+    codes, distinct_values = pd.factorize(df[value_col])
+    lookup = build_category_lookup(pd.Index(distinct_values), function_list)
+    for new_colname in lookup.columns:
+        # missing values have the code -1, which picks the trailing NaN
+        categories = np.append(lookup[new_colname].to_numpy(dtype=object), np.nan)
+        df.loc[:, new_colname] = categories.take(codes)
 
     return df
 
@@ -228,7 +258,9 @@ def process_target_level(
 
         # Data Cleaning and Cumulative Sum
         merged["value"] = merged["value"].fillna(0)
-        merged["value_cum"] = merged.groupby(cumsum_keys)["value"].transform("cumsum")
+        merged["value_cum"] = merged.groupby(cumsum_keys, observed=True)[
+            "value"
+        ].transform("cumsum")
 
         # Standardize Target as Nullable Integer
         merged["cible"] = (
@@ -242,3 +274,200 @@ def process_target_level(
             f"Erreur lors du traitement des cibles au niveau {level_label}: {e}"
         )
         raise
+
+
+def _normalize_partition_values(values: pd.Series) -> pd.Series:
+    """
+    Normalizes the values of a partition column to strings, so that integer values stored
+    as floats (e.g. 2024.0) give the same key as integers.
+
+    Parameters:
+        values (pd.Series): The values of the partition column.
+
+    Returns:
+        pd.Series: The normalized values, with "" for missing values.
+    """
+    numeric_values = pd.to_numeric(values, errors="coerce")
+    is_integer = numeric_values.notna() & (numeric_values % 1 == 0)
+    normalized = values.astype(object).where(values.isna(), values.astype(str))
+    normalized = normalized.where(
+        ~is_integer, numeric_values.where(is_integer).astype("Int64").astype(str)
+    )
+    return normalized.fillna("").astype(str)
+
+
+def get_partition_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    Computes the partition key ('campaign|year|round') of each row of a dataframe. The campaign
+    is read from the 'choix_campagne' column, or derived from the 'produit' column.
+
+    Parameters:
+        df (pd.DataFrame): A dataframe with 'year', 'round' and 'choix_campagne' or 'produit' columns.
+
+    Returns:
+        pd.Series: The partition key of each row.
+    """
+    if "choix_campagne" in df.columns:
+        campaign = df["choix_campagne"]
+    else:
+        campaign = df["produit"].map(config.cmpl_product_campaign_mapping)
+
+    return (
+        _normalize_partition_values(campaign)
+        + "|"
+        + _normalize_partition_values(df["year"])
+        + "|"
+        + _normalize_partition_values(df["round"])
+    )
+
+
+def compute_partition_hashes(df: pd.DataFrame) -> dict:
+    """
+    Computes a hash of the rows of each partition of a dataframe, independent of the row order.
+
+    Parameters:
+        df (pd.DataFrame): A dataframe with 'year', 'round' and 'choix_campagne' or 'produit' columns.
+
+    Returns:
+        dict: The hash of each partition key.
+    """
+    row_hashes = pd.DataFrame(
+        {
+            "key": get_partition_keys(df).values,
+            "row_hash": pd.util.hash_pandas_object(df, index=False).values,
+        }
+    ).sort_values(["key", "row_hash"])
+    columns_signature = "|".join(f"{col}:{df[col].dtype}" for col in df.columns)
+
+    partition_hashes = {}
+    for key, group in row_hashes.groupby("key", sort=False):
+        hasher = hashlib.blake2b(columns_signature.encode(), digest_size=20)
+        hasher.update(group["row_hash"].values.tobytes())
+        partition_hashes[key] = hasher.hexdigest()
+    return partition_hashes
+
+
+def sparse_melt(
+    df: pd.DataFrame,
+    id_vars: list,
+    value_vars: list,
+    var_name: str = "variable",
+    value_name: str = "value",
+) -> pd.DataFrame:
+    """
+    Unpivots a dataframe like pd.melt, but only emits the non-null, non-zero cells. The cells are
+    located directly on the numpy block of the value columns, so the dense long frame (rows x
+    value columns) is never materialized.
+
+    Parameters:
+        df (pd.DataFrame): The wide dataframe.
+        id_vars (list): The identifier columns, repeated on each emitted row.
+        value_vars (list): The columns to unpivot.
+        var_name (str, optional): The name of the column holding the unpivoted column names. Defaults to "variable".
+        value_name (str, optional): The name of the column holding the values. Defaults to "value".
+
+    Returns:
+        pd.DataFrame: The long dataframe, ordered like pd.melt (column by column).
+    """
+    value_dtypes = [df[col].dtype for col in value_vars]
+    block = df[value_vars].to_numpy(dtype=float, na_value=np.nan)
+    mask = block != 0
+    mask &= ~np.isnan(block)
+    col_idx, row_idx = np.nonzero(mask.T)
+
+    long_df = df[id_vars].iloc[row_idx].reset_index(drop=True)
+    long_df[var_name] = np.asarray(value_vars, dtype=object)[col_idx]
+    values = block[row_idx, col_idx]
+    if value_dtypes and all(
+        isinstance(dtype, np.dtype) and dtype.kind in "biuf" for dtype in value_dtypes
+    ):
+        values = values.astype(np.result_type(*value_dtypes))
+    long_df[value_name] = values
+    return long_df
+
+
+def build_unpivot_index(campaign_maps: dict, available_columns: list) -> pd.DataFrame:
+    """
+    Builds the index mapping each form column to the table(s) and campaign(s) it belongs to.
+
+    Parameters:
+        campaign_maps (dict): For each table, the mapping of each campaign to its form columns.
+        available_columns (list): The columns present in the form data.
+
+    Returns:
+        pd.DataFrame: One row per (category, table, campaign), where 'category' is the form column name.
+    """
+    available_columns = set(available_columns)
+    index_rows = [
+        (col, table_name, campaign_name)
+        for table_name, campaign_map in campaign_maps.items()
+        for campaign_name, cols in campaign_map.items()
+        for col in cols
+        if col in available_columns
+    ]
+    return pd.DataFrame(
+        index_rows, columns=["category", "table", "campaign"]
+    ).drop_duplicates(ignore_index=True)
+
+
+def get_partition_outputs(iaso_form_data_df: pd.DataFrame) -> dict:
+    """
+    Lists the output partitions fed by each partition of the form data. The rows of a form partition
+    feed the completeness partition of their own campaign ('choix_campagne'), and, through each of
+    their non-zero columns, a partition of the tables built from that column: the coverage and stock
+    rows are partitioned by the campaign of their product (cmpl_product_campaign_mapping), the
+    supervision and communication rows by the campaign of the column (unpivot_campaign_maps).
+
+    Parameters:
+        iaso_form_data_df (pd.DataFrame): The processed data extracted from the IASO multi-campaign form.
+
+    Returns:
+        dict: The sorted keys of the output partitions fed by each partition key of the form data.
+    """
+    unpivot_index = build_unpivot_index(
+        config.unpivot_campaign_maps, iaso_form_data_df.columns
+    )
+    product_categorizers = {
+        "couverture": produit_categorizer,
+        "stocks": produit_categorizer_stocks,
+    }
+    unpivot_index["output_campaign"] = [
+        (
+            config.cmpl_product_campaign_mapping.get(
+                product_categorizers[table_name](category)
+            )
+            if table_name in product_categorizers
+            else campaign_name
+        )
+        for category, table_name, campaign_name in unpivot_index[
+            ["category", "table", "campaign"]
+        ].itertuples(index=False)
+    ]
+
+    partition_keys = get_partition_keys(iaso_form_data_df)
+    categories = list(unpivot_index["category"].unique())
+    block = iaso_form_data_df[categories].to_numpy(dtype=float, na_value=np.nan)
+    filled_categories = (
+        pd.DataFrame((block != 0) & ~np.isnan(block), columns=categories)
+        .groupby(partition_keys.to_numpy())
+        .any()
+        .stack()
+    )
+    filled_categories = filled_categories[filled_categories].reset_index()
+    filled_categories.columns = ["input_partition", "category", "is_filled"]
+
+    fed_partitions = filled_categories.merge(
+        unpivot_index[["category", "output_campaign"]], on="category"
+    )
+    fed_partitions["output_partition"] = (
+        _normalize_partition_values(fed_partitions["output_campaign"])
+        + "|"
+        + fed_partitions["input_partition"].str.split("|", n=1).str[1]
+    )
+
+    partition_outputs = {key: {key} for key in partition_keys.unique()}
+    for input_partition, output_partition in fed_partitions[
+        ["input_partition", "output_partition"]
+    ].itertuples(index=False):
+        partition_outputs[input_partition].add(output_partition)
+    return {key: sorted(outputs) for key, outputs in partition_outputs.items()}
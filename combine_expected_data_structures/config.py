@@ -9,3 +9,6 @@ WORKSPACE_PATH = workspace.files_path
 # )  # local
 CONFIG_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "inputs", "config")
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
+
+# number of new campaign config files read in parallel
+config_read_max_workers = 4
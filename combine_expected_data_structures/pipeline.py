@@ -1,13 +1,16 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from openhexa.sdk import current_run, pipeline
 import pandas as pd
 from shared_utils import (
-    load_data,
-    save_file,
+    ExpectedStructure,
+    load_expected_structure,
+    save_expected_structure,
 )
 
 from config import (
     CONFIG_PATH,
+    config_read_max_workers,
 )
 
 
@@ -18,7 +21,8 @@ from config import (
 def combine_expected_data_structures():
     """
     This pipeline combines the expected data structure of historical campaigns with the
-    expected data structure of new campaigns.
+    expected data structure of new campaigns. The combined structure is saved in its
+    factorized form (one table per dimension, see ExpectedStructure).
 
     Args:
         None
@@ -32,66 +36,100 @@ def combine_expected_data_structures():
     )
 
     # combine with historical campaigns config
-    expected_data_structure_historical_campaigns = load_data(
+    expected_data_structure_historical_campaigns = load_expected_structure(
         "expected_data_structure_historical_campaigns"
     )
-    combined_df = combine(
+    combined_structure = combine(
         expected_data_structure_historical_campaigns,
         expected_data_structure_new_campaigns,
     )
 
     # save
-    save_file(combined_df, "expected_data_structure")
+    save_expected_structure(combined_structure)
+
+
+def read_config_file(config_path: str) -> pd.DataFrame:
+    """
+    Read a new campaign config file. The config file is the source of its rows in the expected
+    structure, and is named after the file.
+
+    Args:
+        config_path (str): Path to the config file.
+
+    Returns:
+        config_df (pd.DataFrame): The configuration, with its 'source' column.
+    """
+    config_df = pd.read_parquet(config_path)
+    config_df["source"] = os.path.splitext(os.path.basename(config_path))[0]
+    return config_df
+
+
+def factorize_config_file(config_path: str) -> ExpectedStructure:
+    """
+    Read a new campaign config file and factorize its configuration (see ExpectedStructure.from_dataframe).
+
+    Args:
+        config_path (str): Path to the config file.
+
+    Returns:
+        structure (ExpectedStructure): The expected structure configured by the file.
+
+    Raises:
+        ValueError: If the configuration can not be factorized. The error names the config file and
+                    the campaign rounds whose rows are not the cross product of their dimensions.
+    """
+    try:
+        # duplicated rows are dropped on their natural key during the factorization
+        return ExpectedStructure.from_dataframe(read_config_file(config_path))
+    except ValueError as e:
+        raise ValueError(
+            f"Fichier de configuration {os.path.basename(config_path)} invalide: {e}"
+        ) from e
 
 
 def generate_expected_data_structure_for_new_campaigns(
     config_dir_path: str,
-) -> pd.DataFrame:
+) -> ExpectedStructure | None:
     """
-    Import all config files relating to new campaigns and append the corresponding
-    configurations to the combined DataFrame of historical campaigns.
+    Import all config files relating to new campaigns and factorize the corresponding
+    configurations. The files are read and factorized in parallel, then combined.
 
     Args:
         config_dir_path (str): Path to the directory containing the new campaign configuration files.
 
     Returns:
-        combined_df (pd.DataFrame): Adjusted DataFrame with new campaign configurations added.
+        structure (ExpectedStructure | None): The expected structure of the new campaigns, or None if there
+                                              is no config file.
     """
     current_run.log_info(
         "Ajout des configurations des nouvelles campagnes au DataFrame combiné..."
     )
     try:
-        config_files = [
+        config_files = sorted(
             f
             for f in os.listdir(config_dir_path)
             if f.startswith("config_") and f.endswith(".parquet")
-        ]
+        )
         if not config_files:
             current_run.log_warning(
                 f"Aucun fichier de configuration de nouvelle campagne trouvé dans le dossier {CONFIG_PATH}. Aucune configuration de nouvelle campagne ne sera ajoutée aux données combinées."
             )
-            return (
-                pd.DataFrame()
-            )  # Return an empty DataFrame if no config files are found
+            return None  # Return no structure if no config files are found
         else:
             current_run.log_info(
                 f"Fichiers de configuration de nouvelle campagne trouvés: {config_files}."
             )
-            combined_df = (
-                pd.DataFrame()
-            )  # Initialize an empty DataFrame to hold the combined data
-            for config_file in config_files:
-                config_path = os.path.join(config_dir_path, config_file)
-                config_df = pd.read_parquet(config_path)
-                combined_df = pd.concat([combined_df, config_df], ignore_index=True)
+            config_paths = [os.path.join(config_dir_path, f) for f in config_files]
+            with ThreadPoolExecutor(max_workers=config_read_max_workers) as executor:
+                structures = list(executor.map(factorize_config_file, config_paths))
 
-            combined_df = combined_df.drop_duplicates().reset_index(drop=True)
+            structure = ExpectedStructure.concat(structures)
 
             current_run.log_info(
                 "Configurations des nouvelles campagnes ajoutées avec succès au DataFrame combiné."
             )
 
-            return combined_df
+            return structure
 
     except Exception as e:
         msg = f"Erreur lors de l'ajout des configurations des nouvelles campagnes au DataFrame combiné: {e}"
@@ -100,35 +138,33 @@ def generate_expected_data_structure_for_new_campaigns(
 
 
 def combine(
-    df_1: pd.DataFrame,
-    df_2: pd.DataFrame,
-) -> pd.DataFrame:
+    historical_structure: ExpectedStructure,
+    new_structure: ExpectedStructure | None,
+) -> ExpectedStructure:
     """
-    Combine two dataframes containing the same structure.
+    Combine the expected structure of historical campaigns with that of new campaigns.
 
     Args:
-        df_1 (pd.DataFrame): First dataframe
-        df_2 (pd.DataFrame): Second dataframe
+        historical_structure (ExpectedStructure): Expected structure of historical campaigns
+        new_structure (ExpectedStructure | None): Expected structure of new campaigns, if any
 
     Returns:
-        combined_df (pd.DataFrame): Combined DataFrame
+        combined_structure (ExpectedStructure): Combined expected structure
     """
     current_run.log_info(
         "Combinaison de la structure des données attendue des campagnes historiques avec celle des nouvelles campagnes..."
     )
     try:
-        combined_df = (
-            pd.concat(
-                [df_1, df_2],
-                ignore_index=True,
+        if new_structure is None:
+            combined_structure = historical_structure
+        else:
+            combined_structure = ExpectedStructure.concat(
+                [historical_structure, new_structure]
             )
-            .drop_duplicates()
-            .reset_index(drop=True)
-        )
 
         current_run.log_info("Combinaison des structures de données attendues réussie.")
 
-        return combined_df
+        return combined_structure
 
     except Exception as e:
         msg = f"Erreur lors de la combinaison des structures de données attendues: {e}"
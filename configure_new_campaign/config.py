@@ -10,6 +10,10 @@ WORKSPACE_PATH = workspace.files_path
 CONFIG_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "inputs", "config")
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
 
+# columns read from the input files
+configured_target_data_cols = ["produit", "year", "LVL_2_NAME"]
+org_unit_tree_cols = ["org_unit_id", "LVL_2_NAME", "LVL_3_NAME", "LVL_6_NAME"]
+
 # configs
 campaign_name_dict = {
     "Polio": "vaccin polio",
@@ -2,12 +2,15 @@ from openhexa.sdk import current_run, parameter, pipeline
 import pandas as pd
 from shared_utils import (
     load_data,
+    load_expected_structure,
     save_file,
     export_to_dataset,
 )
 
 from config import (
     CONFIG_PATH,
+    configured_target_data_cols,
+    org_unit_tree_cols,
     required_regions,
     campaign_config_dict,
     campaign_name_dict,
@@ -134,8 +137,13 @@ def configure_new_campaign(
         campaign_round_start_date,
         campaign_round_end_date,
     )
-    configured_target_data = load_data("combined_configured_target_data")
-    expected_data_structure = load_data("expected_data_structure")
+    configured_target_data = load_data(
+        "combined_configured_target_data", columns=configured_target_data_cols
+    )
+    expected_data_structure = load_expected_structure(
+        columns=["produit", "year", "round", "period"],
+        filters={"produit": [campaign_name_dict[campaign]], "year": [year]},
+    ).materialize(["produit", "year", "round", "period"])
     overlap_exists = validate_coherence_of_params(
         configured_target_data,
         expected_data_structure,
@@ -155,7 +163,7 @@ def configure_new_campaign(
         overlap_exists,
     )
     campaign_round = config_df["round"].iloc[0]
-    org_unit_tree = load_data("iaso_org_unit_tree_clean")
+    org_unit_tree = load_data("iaso_org_unit_tree_clean", columns=org_unit_tree_cols)
     config_df = add_org_unit_info(config_df, org_unit_tree, campaign_scale)
     save_file(config_df, f"config_{campaign}_{year}_{campaign_round.replace(' ', '_')}")
     export_to_dataset(
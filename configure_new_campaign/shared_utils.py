@@ -1,6 +1,17 @@
+import hashlib
+import io
+import json
 import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openhexa.sdk import current_run, workspace
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from openpyxl import Workbook
 
 WORKSPACE_PATH = workspace.files_path
 # WORKSPACE_PATH = os.path.join(
@@ -9,27 +20,620 @@ WORKSPACE_PATH = workspace.files_path
 PROJECT_FOLDER = "multi-campagne"
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
 
+# dataset export settings
+EXPORT_MAX_WORKERS = 4
+# a format is not exported when the dataframe has more rows than its limit
+DEFAULT_MAX_ROWS_PER_FORMAT = {}
+XLSX_MAX_ROWS_PER_SHEET = 1_048_575  # Excel worksheet row limit, header excluded
+XLSX_WRITE_BATCH_SIZE = 10_000
 
-def load_data(file_name: str) -> pd.DataFrame:
+# low-cardinality dimension columns, stored as pandas categoricals (Arrow dictionaries in parquet)
+CATEGORICAL_COLUMNS = (
+    "produit",
+    "choix_campagne",
+    "round",
+    "age",
+    "site",
+    "sexe",
+    "vaccination_status",
+    "month",
+)
+CATEGORICAL_COLUMN_PATTERNS = (re.compile(r"^LVL_\d+_NAME$"),)
+
+# metadata file of a partitioned parquet dataset, holding its schema and partition columns
+PARQUET_DATASET_METADATA = "_common_metadata"
+# uncompressed Arrow IPC copy of each saved file, memory-mapped by load_data (see read_arrow_cache)
+ARROW_CACHE_EXTENSION = "arrow"
+
+# factorized expected data structure (see ExpectedStructure)
+EXPECTED_STRUCTURE_NAME = "expected_data_structure"
+EXPECTED_STRUCTURE_KEYS = ["source", "produit", "year", "round"]
+# the first column of each dimension identifies its values (the other columns describe them)
+# the dimension tables are stored as parquet datasets partitioned by these columns
+EXPECTED_STRUCTURE_PARTITION_COLS = ["produit", "year"]
+EXPECTED_STRUCTURE_DIMENSIONS = {
+    "org_units": ["org_unit_id", "LVL_3_NAME", "LVL_6_NAME"],
+    "sexes": ["sexe"],
+    "ages": ["age"],
+    "sites": ["site"],
+    "vaccination_statuses": ["vaccination_status"],
+    "periods": ["period", "order_day"],
+}
+EXPECTED_STRUCTURE_NATURAL_KEY = EXPECTED_STRUCTURE_KEYS + [
+    cols[0] for cols in EXPECTED_STRUCTURE_DIMENSIONS.values()
+]
+EXPECTED_STRUCTURE_COLUMNS = [
+    "org_unit_id",
+    "LVL_3_NAME",
+    "LVL_6_NAME",
+    "sexe",
+    "year",
+    "produit",
+    "round",
+    "age",
+    "site",
+    "vaccination_status",
+    "period",
+    "order_day",
+]
+
+
+class LocalStorage:
+    """
+    Storage backend keeping the pipeline outputs as files in a folder of the workspace.
+
+    Args:
+        root_path (str): The folder where the files are stored.
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+
+    def path(self, name: str) -> str | None:
+        """
+        Return the local path of a file, or None if the backend does not store files on disk.
+        """
+        return os.path.join(self.root_path, name)
+
+    def exists(self, name: str) -> bool:
+        """
+        Check whether a file exists in the storage.
+        """
+        return os.path.exists(self.path(name))
+
+    def modified_time(self, name: str) -> float:
+        """
+        Return the last modification time of a file. For a partitioned dataset (a directory), this is
+        the last modification time of its files, metadata files included.
+        """
+        file_path = self.path(name)
+        if not os.path.isdir(file_path):
+            return os.path.getmtime(file_path)
+        return max(
+            [os.path.getmtime(file_path)]
+            + [
+                os.path.getmtime(os.path.join(dir_path, file_name))
+                for dir_path, _, file_names in os.walk(file_path)
+                for file_name in file_names
+            ]
+        )
+
+    def read_bytes(self, name: str) -> bytes:
+        """
+        Read the raw content of a file.
+        """
+        with open(self.path(name), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, name: str, data: bytes) -> None:
+        """
+        Write the raw content of a file.
+        """
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "wb") as f:
+            f.write(data)
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a file (or a partitioned parquet dataset) from the storage, if it exists.
+        """
+        if os.path.isdir(self.path(name)):
+            shutil.rmtree(self.path(name))
+        elif self.exists(name):
+            os.remove(self.path(name))
+
+    def read_parquet(
+        self,
+        name: str,
+        columns: list | None = None,
+        filters: list | None = None,
+    ) -> pd.DataFrame:
+        """
+        Read a parquet file, or a parquet dataset partitioned by write_parquet, into a dataframe.
+        Only the given columns are decoded (the columns absent from the file are ignored), and
+        the filters are pushed down to pyarrow: the partitions and row groups that cannot match
+        are skipped.
+        """
+        path = self.path(name)
+        if not os.path.isdir(path):
+            return pd.read_parquet(
+                path,
+                columns=select_available_columns(columns, pq.read_schema(path).names),
+                filters=filters,
+            )
+
+        # the partition columns are typed from the schema saved at write time, instead of
+        # being inferred from the folder names
+        schema = pq.read_schema(os.path.join(path, PARQUET_DATASET_METADATA))
+        partition_cols = json.loads(schema.metadata[b"partition_cols"])
+        partition_fields = []
+        for col in partition_cols:
+            field = schema.field(col)
+            if pa.types.is_dictionary(field.type):
+                field = field.with_type(field.type.value_type)
+            partition_fields.append(field)
+        partition_schema = pa.schema(partition_fields)
+        schema = pa.schema(
+            [
+                (
+                    partition_schema.field(field.name)
+                    if field.name in partition_cols
+                    else field
+                )
+                for field in schema
+            ],
+            metadata=schema.metadata,
+        )
+        dataset = ds.dataset(
+            path,
+            schema=schema,
+            format="parquet",
+            partitioning=ds.partitioning(partition_schema, flavor="hive"),
+        )
+        table = dataset.to_table(
+            columns=select_available_columns(columns, schema.names),
+            filter=pq.filters_to_expression(filters) if filters else None,
+        )
+        return table.to_pandas()
+
+    def write_parquet(
+        self, df: pd.DataFrame, name: str, partition_cols: list | None = None
+    ) -> None:
+        """
+        Write a dataframe to a parquet file, or to a hive-partitioned parquet dataset (one folder
+        per value of the partition columns) when partition columns are given. The dataset is
+        written next to the previous one and swapped in once complete.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not partition_cols:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            df.to_parquet(path, index=False)
+            return
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        pq.write_to_dataset(table, tmp_path, partition_cols=partition_cols)
+        pq.write_metadata(
+            table.schema.with_metadata(
+                {
+                    **(table.schema.metadata or {}),
+                    b"partition_cols": json.dumps(partition_cols).encode(),
+                }
+            ),
+            os.path.join(tmp_path, PARQUET_DATASET_METADATA),
+        )
+        self.remove(name)
+        os.replace(tmp_path, path)
+
+    def read_ipc(self, name: str) -> pa.Table:
+        """
+        Memory-map an Arrow IPC file: the data is read lazily from the page cache, without copy.
+        """
+        with pa.memory_map(self.path(name), "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def write_ipc(self, table: pa.Table, name: str) -> None:
+        """
+        Write a table to an uncompressed Arrow IPC file. The file is written next to the previous
+        one and swapped in once complete.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+
+class InMemoryStorage:
+    """
+    Storage backend keeping the pipeline outputs in memory, to run the pipelines
+    without touching the workspace (e.g. in tests).
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.modified_times = {}
+
+    def path(self, name: str) -> str | None:
+        """
+        Return the local path of a file, or None if the backend does not store files on disk.
+        """
+        return None
+
+    def exists(self, name: str) -> bool:
+        """
+        Check whether a file exists in the storage.
+        """
+        return name in self.files
+
+    def modified_time(self, name: str) -> float:
+        """
+        Return the last modification time of a file.
+        """
+        return self.modified_times[name]
+
+    def read_bytes(self, name: str) -> bytes:
+        """
+        Read the raw content of a file.
+        """
+        if name not in self.files:
+            raise FileNotFoundError(name)
+        return self.files[name]
+
+    def write_bytes(self, name: str, data: bytes) -> None:
+        """
+        Write the raw content of a file.
+        """
+        self.files[name] = bytes(data)
+        self.modified_times[name] = time.time()
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a file from the storage, if it exists.
+        """
+        self.files.pop(name, None)
+        self.modified_times.pop(name, None)
+
+    def read_parquet(
+        self,
+        name: str,
+        columns: list | None = None,
+        filters: list | None = None,
+    ) -> pd.DataFrame:
+        """
+        Read a parquet file into a dataframe, decoding only the given columns (the columns absent
+        from the file are ignored) and rows matching the filters.
+        """
+        source = io.BytesIO(self.read_bytes(name))
+        return pd.read_parquet(
+            source,
+            columns=select_available_columns(columns, pq.read_schema(source).names),
+            filters=filters,
+        )
+
+    def write_parquet(
+        self, df: pd.DataFrame, name: str, partition_cols: list | None = None
+    ) -> None:
+        """
+        Write a dataframe to a parquet file. The data is kept in memory as a single file, so the
+        partition columns are ignored.
+        """
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        self.write_bytes(name, buffer.getvalue())
+
+    def read_ipc(self, name: str) -> pa.Table:
+        """
+        Read an Arrow IPC file, without copying its data.
+        """
+        return pa.ipc.open_file(pa.BufferReader(self.read_bytes(name))).read_all()
+
+    def write_ipc(self, table: pa.Table, name: str) -> None:
+        """
+        Write a table to an uncompressed Arrow IPC file.
+        """
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.write_bytes(name, sink.getvalue().to_pybytes())
+
+
+def select_available_columns(
+    columns: list | None, available_columns: list
+) -> list | None:
+    """
+    Keep the requested columns that are present in a file, in the requested order.
+
+    Args:
+        columns (list | None): The requested columns, or None for all the columns.
+        available_columns (list): The columns of the file.
+
+    Returns:
+        list | None: The columns to read, or None for all the columns.
+    """
+    if columns is None:
+        return None
+    available_columns = set(available_columns)
+    return [col for col in columns if col in available_columns]
+
+
+_storage_backend = LocalStorage(OUTPUTS_PATH)
+
+
+def get_storage_backend() -> LocalStorage | InMemoryStorage:
+    """
+    Return the storage backend used by load_data and save_file.
+    """
+    return _storage_backend
+
+
+def set_storage_backend(backend: LocalStorage | InMemoryStorage) -> None:
+    """
+    Replace the storage backend used by load_data and save_file.
+
+    Args:
+        backend (LocalStorage | InMemoryStorage): The new storage backend.
+
+    Returns:
+        None
+    """
+    global _storage_backend
+    _storage_backend = backend
+
+
+def is_categorical_column(column_name: str) -> bool:
+    """
+    Check whether a column is declared as categorical in the schema registry
+    (CATEGORICAL_COLUMNS and CATEGORICAL_COLUMN_PATTERNS).
+    """
+    return column_name in CATEGORICAL_COLUMNS or any(
+        pattern.match(str(column_name)) for pattern in CATEGORICAL_COLUMN_PATTERNS
+    )
+
+
+def apply_categorical_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the text columns declared in the schema registry to categoricals. The categories
+    are the sorted values of the column, so that the same data always gives the same
+    categories whatever the order of its rows. Numeric columns are left untouched.
+
+    Args:
+        df (pd.DataFrame): The dataframe to convert.
+
+    Returns:
+        pd.DataFrame: The dataframe with its dimension columns stored as categoricals.
+    """
+    converted_cols = {}
+    for col in df.columns:
+        if not is_categorical_column(col):
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            values = df[col].cat.remove_unused_categories()
+        elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(
+            df[col]
+        ):
+            values = df[col].astype("category")
+        else:
+            continue
+        categories = values.cat.categories
+        if categories.empty or not all(
+            isinstance(category, str) for category in categories
+        ):
+            continue
+        if not categories.is_monotonic_increasing:
+            values = values.cat.reorder_categories(sorted(categories))
+        if values.dtype != df[col].dtype:
+            converted_cols[col] = values
+
+    if not converted_cols:
+        return df
+    return df.assign(**converted_cols)
+
+
+def compute_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Compute a fingerprint of a dataframe from its Arrow schema and the raw Arrow buffers
+    of its columns, without serializing the data. The dataframe is fingerprinted as saved by
+    save_file (see apply_categorical_schema), so that the same data gives the same fingerprint
+    whether its dimension columns are stored as text or as categoricals.
+
+    Args:
+        df (pd.DataFrame): The dataframe to fingerprint.
+
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    table = pa.Table.from_pandas(apply_categorical_schema(df), preserve_index=False)
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(str(table.schema.remove_metadata()).encode())
+    hasher.update(str(table.num_rows).encode())
+    for column in table.columns:
+        for chunk in column.chunks:
+            hasher.update(f"{chunk.offset}:{len(chunk)}".encode())
+            buffers = chunk.buffers()
+            # the values of a dictionary column are stored in its dictionary, not in its buffers
+            if pa.types.is_dictionary(chunk.type):
+                buffers += chunk.dictionary.buffers()
+            for buffer in buffers:
+                if buffer is not None:
+                    hasher.update(memoryview(buffer))
+    return hasher.hexdigest()
+
+
+def read_fingerprint(storage: LocalStorage | InMemoryStorage, name: str) -> dict:
+    """
+    Read a fingerprint file stored next to an output.
+
+    Args:
+        storage (LocalStorage | InMemoryStorage): The storage backend holding the fingerprint.
+        name (str): The name of the fingerprint file.
+
+    Returns:
+        dict: The content of the fingerprint file, or an empty dict if it is missing or unreadable.
+    """
+    try:
+        return json.loads(storage.read_bytes(name))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_fingerprint(
+    storage: LocalStorage | InMemoryStorage, name: str, content: dict
+) -> None:
+    """
+    Write a fingerprint file next to an output.
+
+    Args:
+        storage (LocalStorage | InMemoryStorage): The storage backend holding the fingerprint.
+        name (str): The name of the fingerprint file.
+        content (dict): The fingerprint and its associated information.
+
+    Returns:
+        None
+    """
+    storage.write_bytes(name, json.dumps(content).encode())
+
+
+def is_arrow_cache_fresh(
+    storage: LocalStorage | InMemoryStorage, file_name: str, fingerprint: str | None
+) -> bool:
+    """
+    Check whether the Arrow IPC cache of a file holds the data of its parquet file: the cache
+    must carry the fingerprint of the parquet file, and must not be older than it (the parquet
+    file may have been rewritten without going through save_file).
+
+    Args:
+        storage (LocalStorage | InMemoryStorage): The storage backend holding the file.
+        file_name (str): The name of the file, without extension.
+        fingerprint (str | None): The fingerprint of the parquet file.
+
+    Returns:
+        bool: Whether the cache can be used instead of the parquet file.
+    """
+    cache_name = f"{file_name}.{ARROW_CACHE_EXTENSION}"
+    if fingerprint is None or not storage.exists(cache_name):
+        return False
+    try:
+        cache_fingerprint = (storage.read_ipc(cache_name).schema.metadata or {}).get(
+            b"fingerprint"
+        )
+        cache_modified_time = storage.modified_time(cache_name)
+        file_modified_time = storage.modified_time(f"{file_name}.parquet")
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return (
+        cache_fingerprint == fingerprint.encode()
+        and cache_modified_time >= file_modified_time
+    )
+
+
+def write_arrow_cache(
+    storage: LocalStorage | InMemoryStorage,
+    df: pd.DataFrame,
+    file_name: str,
+    fingerprint: str,
+) -> None:
+    """
+    Write the uncompressed Arrow IPC cache of a saved file, tagged with its fingerprint.
+
+    Args:
+        storage (LocalStorage | InMemoryStorage): The storage backend holding the file.
+        df (pd.DataFrame): The saved data.
+        file_name (str): The name of the file, without extension.
+        fingerprint (str): The fingerprint of the saved data.
+
+    Returns:
+        None
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"fingerprint": fingerprint.encode()}
+    )
+    storage.write_ipc(table, f"{file_name}.{ARROW_CACHE_EXTENSION}")
+
+
+def read_arrow_cache(
+    storage: LocalStorage | InMemoryStorage,
+    file_name: str,
+    columns: list | None = None,
+    filters: list | None = None,
+) -> pd.DataFrame | None:
     """
-    Load data from a parquet file in the OUTPUTS_PATH.
+    Read a file from its Arrow IPC cache, if the cache is fresh. The cache is memory-mapped, so
+    only the selected columns and rows are actually read from disk.
+
+    Args:
+        storage (LocalStorage | InMemoryStorage): The storage backend holding the file.
+        file_name (str): The name of the file, without extension.
+        columns (list, optional): The columns to read (see load_data). Defaults to None (all columns).
+        filters (list, optional): Row filters, in the pyarrow format (see load_data). Defaults to None.
+
+    Returns:
+        pd.DataFrame | None: The data, or None if the cache is missing or stale.
+    """
+    fingerprint = read_fingerprint(storage, f"{file_name}.parquet.fingerprint").get(
+        "fingerprint"
+    )
+    if not is_arrow_cache_fresh(storage, file_name, fingerprint):
+        return None
+
+    table = storage.read_ipc(f"{file_name}.{ARROW_CACHE_EXTENSION}")
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(select_available_columns(columns, table.column_names))
+    return table.to_pandas()
+
+
+def load_data(
+    file_name: str,
+    columns: list | None = None,
+    filters: list | None = None,
+) -> pd.DataFrame:
+    """
+    Load data from a parquet file in the OUTPUTS_PATH. The dimension columns of the
+    schema registry are returned as categoricals (see apply_categorical_schema). The data is
+    memory-mapped from the Arrow IPC cache written by save_file when it is fresh, and decoded
+    from the parquet file otherwise.
 
     Args:
         file_name (str): The name of the file to read from.
+        columns (list, optional): The columns to read. The columns absent from the file are ignored.
+                                  Defaults to None (all columns).
+        filters (list, optional): Row filters pushed down to pyarrow, in the pyarrow format, e.g.
+                                  [("produit", "in", ["rougeole"]), ("year", "==", 2026)].
+                                  Defaults to None (all rows).
 
     Returns:
         df (pd.DataFrame): The dataframe containing the file data.
     """
     current_run.log_info(f"Importation du fichier {file_name}...")
-    file_to_import = os.path.join(OUTPUTS_PATH, f"{file_name}.parquet")
+    storage = get_storage_backend()
+    file_to_import = storage.path(f"{file_name}.parquet") or f"{file_name}.parquet"
 
-    if not os.path.exists(file_to_import):
+    if not storage.exists(f"{file_name}.parquet"):
         msg = f"Le fichier {file_to_import} n'existe pas."
         current_run.log_error(msg)
         raise FileNotFoundError(msg)
 
     try:
-        df = pd.read_parquet(file_to_import)
+        df = read_arrow_cache(storage, file_name, columns, filters)
+        if df is not None:
+            file_to_import = (
+                storage.path(f"{file_name}.{ARROW_CACHE_EXTENSION}")
+                or f"{file_name}.{ARROW_CACHE_EXTENSION}"
+            )
+        else:
+            df = storage.read_parquet(
+                f"{file_name}.parquet", columns=columns, filters=filters
+            )
+        df = apply_categorical_schema(df)
         current_run.log_info(
             f"Données du fichier {file_name} chargées avec succès depuis le fichier {file_to_import}"
         )
@@ -40,30 +644,58 @@ def load_data(file_name: str) -> pd.DataFrame:
         raise
 
 
-def save_file(df: pd.DataFrame, file_name: str) -> None:
+def save_file(
+    df: pd.DataFrame, file_name: str, partition_cols: list | None = None
+) -> None:
     """
-    Save a dataframe to a parquet file.
+    Save a dataframe to a parquet file. The file is left untouched when its data and its layout
+    (partition columns) are unchanged.
+    The dimension columns of the schema registry are stored as dictionaries, so that they are
+    loaded back as categoricals. An uncompressed Arrow IPC copy of the data is written next to
+    the parquet file, for load_data to memory-map.
 
     Args:
         df (pd.DataFrame): DataFrame containing the data to be saved.
         file_name (str): Name of the file to save the DataFrame as.
+        partition_cols (list, optional): Columns by which the file is partitioned (hive layout), so that
+                                         load_data filters on these columns only read the matching
+                                         partitions. Defaults to None (single file).
 
     Returns:
         None
     """
     current_run.log_info("Enregistrement du fichier dans l'espace de travail...")
 
-    if not os.path.exists(OUTPUTS_PATH):
-        os.makedirs(OUTPUTS_PATH)
-    file_path = os.path.join(
-        OUTPUTS_PATH,
-        f"{file_name}.parquet",
-    )
+    storage = get_storage_backend()
+    file_path = storage.path(f"{file_name}.parquet") or f"{file_name}.parquet"
+    fingerprint_name = f"{file_name}.parquet.fingerprint"
     try:
-        df.to_parquet(
-            file_path,
-            index=False,
-        )
+        df = apply_categorical_schema(df)
+        fingerprint = compute_fingerprint(df)
+        fingerprint_record = {
+            "fingerprint": fingerprint,
+            "partition_cols": list(partition_cols or []),
+        }
+        # a parquet file newer than its fingerprint was rewritten outside save_file
+        if (
+            storage.exists(f"{file_name}.parquet")
+            and read_fingerprint(storage, fingerprint_name) == fingerprint_record
+            and storage.modified_time(f"{file_name}.parquet")
+            <= storage.modified_time(fingerprint_name)
+        ):
+            # files saved before the cache existed get one
+            if not storage.exists(f"{file_name}.{ARROW_CACHE_EXTENSION}"):
+                write_arrow_cache(storage, df, file_name, fingerprint)
+            current_run.log_info(
+                f"Données inchangées, fichier conservé tel quel: {file_path}"
+            )
+            return
+
+        # the stale cache is removed first, so that it is never read with the new parquet file
+        storage.remove(f"{file_name}.{ARROW_CACHE_EXTENSION}")
+        storage.write_parquet(df, f"{file_name}.parquet", partition_cols)
+        write_fingerprint(storage, fingerprint_name, fingerprint_record)
+        write_arrow_cache(storage, df, file_name, fingerprint)
         current_run.log_info(f"Fichier enregistré avec succès: {file_path}")
     except Exception as e:
         msg = f"Erreur lors de l'enregistrement du fichier: {str(e)}"
@@ -71,14 +703,378 @@ def save_file(df: pd.DataFrame, file_name: str) -> None:
         raise
 
 
-def export_to_dataset(df: pd.DataFrame, df_file_path: str, dataset_name: str) -> None:
+class ExpectedStructure:
+    """
+    Factorized representation of the expected data structure. The structure is made of blocks: a block
+    is a campaign round (produit, year, round) configured by a source (the historical campaigns or a new
+    campaign configuration file). The expected rows of a block are the cross product of the values of
+    its dimensions (org units, sexes, ages, sites, vaccination statuses and periods), so only the
+    dimension tables are stored, and the rows are materialized on demand, for the blocks and the
+    columns a pipeline needs.
+
+    Args:
+        dimensions (dict): For each dimension of EXPECTED_STRUCTURE_DIMENSIONS, a dataframe with the block
+                           keys (EXPECTED_STRUCTURE_KEYS) and the columns of the dimension. A dimension
+                           reduced to the block keys can not be materialized (see load_expected_structure).
+    """
+
+    def __init__(self, dimensions: dict):
+        self.dimensions = {}
+        for name, cols in EXPECTED_STRUCTURE_DIMENSIONS.items():
+            available_cols = [col for col in cols if col in dimensions[name].columns]
+            self.dimensions[name] = dimensions[name][
+                EXPECTED_STRUCTURE_KEYS + available_cols
+            ].drop_duplicates(
+                subset=EXPECTED_STRUCTURE_KEYS + available_cols[:1], ignore_index=True
+            )
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ExpectedStructure":
+        """
+        Factorize a materialized expected structure. The rows are deduplicated on their natural key
+        (EXPECTED_STRUCTURE_NATURAL_KEY), not on all their columns.
+
+        The rows of each block must be the cross product of the values of its dimensions (e.g. every
+        org unit of a campaign round expects every age of the round): a block covering only some
+        combinations can not be factorized, and is reported in the error.
+
+        Args:
+            df (pd.DataFrame): The expected rows, with the EXPECTED_STRUCTURE_COLUMNS and a 'source' column.
+
+        Returns:
+            ExpectedStructure: The factorized structure.
+
+        Raises:
+            ValueError: If the dataframe has unknown columns, or if the rows of a block are not the cross
+                        product of its dimensions.
+        """
+        unknown_cols = set(df.columns) - set(EXPECTED_STRUCTURE_COLUMNS) - {"source"}
+        if unknown_cols:
+            raise ValueError(
+                f"Colonnes inconnues dans la structure des données attendues: {sorted(unknown_cols)}"
+            )
+
+        structure = cls(
+            {
+                name: df[EXPECTED_STRUCTURE_KEYS + cols]
+                for name, cols in EXPECTED_STRUCTURE_DIMENSIONS.items()
+            }
+        )
+        row_counts = (
+            df.drop_duplicates(subset=EXPECTED_STRUCTURE_NATURAL_KEY)
+            .groupby(EXPECTED_STRUCTURE_KEYS, observed=True, dropna=False)
+            .size()
+            .rename("row_count")
+            .reset_index()
+        )
+        check = structure.block_sizes().merge(
+            row_counts, on=EXPECTED_STRUCTURE_KEYS, how="outer"
+        )
+        invalid_blocks = check[check["size"] != check["row_count"]]
+        if not invalid_blocks.empty:
+            block_names = [
+                f"{block.produit} {block.year} {block.round} (source: {block.source}, "
+                f"{block.row_count:.0f} lignes au lieu de {block.size:.0f})"
+                for block in invalid_blocks.itertuples(index=False)
+            ]
+            raise ValueError(
+                "La structure des données attendues ne peut pas être factorisée: les lignes de ces "
+                "rounds de campagne ne sont pas le produit croisé de leurs dimensions: "
+                f"{', '.join(block_names)}"
+            )
+        return structure
+
+    @classmethod
+    def concat(cls, structures: list) -> "ExpectedStructure":
+        """
+        Combine several structures into one.
+
+        Args:
+            structures (list): The ExpectedStructure objects to combine.
+
+        Returns:
+            ExpectedStructure: The combined structure.
+        """
+        return cls(
+            {
+                name: pd.concat(
+                    [structure.dimensions[name] for structure in structures],
+                    ignore_index=True,
+                )
+                for name in EXPECTED_STRUCTURE_DIMENSIONS
+            }
+        )
+
+    def blocks(self) -> pd.DataFrame:
+        """
+        Return the keys (EXPECTED_STRUCTURE_KEYS) of the blocks having values in every dimension.
+        """
+        blocks = None
+        for dimension in self.dimensions.values():
+            keys = dimension[EXPECTED_STRUCTURE_KEYS].drop_duplicates()
+            blocks = (
+                keys
+                if blocks is None
+                else blocks.merge(keys, on=EXPECTED_STRUCTURE_KEYS)
+            )
+        return blocks.reset_index(drop=True)
+
+    def block_sizes(self) -> pd.DataFrame:
+        """
+        Return the keys of the blocks with their number of expected rows ('size').
+        """
+        sizes = self.blocks()
+        sizes["size"] = 1
+        for name, dimension in self.dimensions.items():
+            counts = (
+                dimension.groupby(EXPECTED_STRUCTURE_KEYS, observed=True, dropna=False)
+                .size()
+                .rename(name)
+                .reset_index()
+            )
+            sizes = sizes.merge(counts, on=EXPECTED_STRUCTURE_KEYS)
+            sizes["size"] *= sizes.pop(name)
+        return sizes
+
+    def select_blocks(self, blocks: pd.DataFrame) -> "ExpectedStructure":
+        """
+        Restrict the structure to the given blocks.
+
+        Args:
+            blocks (pd.DataFrame): The keys (EXPECTED_STRUCTURE_KEYS) of the blocks to keep.
+
+        Returns:
+            ExpectedStructure: The structure of the selected blocks.
+        """
+        keys = blocks[EXPECTED_STRUCTURE_KEYS].drop_duplicates()
+        return ExpectedStructure(
+            {
+                name: dimension.merge(keys, on=EXPECTED_STRUCTURE_KEYS)
+                for name, dimension in self.dimensions.items()
+            }
+        )
+
+    def materialize(self, columns: list | None = None) -> pd.DataFrame:
+        """
+        Build the expected rows, projected on the given columns. Only the dimensions holding these
+        columns are expanded, and the rows are deduplicated when the projection or several sources
+        configuring the same campaign round can produce the same row twice.
+
+        Args:
+            columns (list, optional): The columns to materialize. Defaults to EXPECTED_STRUCTURE_COLUMNS.
+
+        Returns:
+            pd.DataFrame: The expected rows.
+        """
+        columns = list(columns or EXPECTED_STRUCTURE_COLUMNS)
+        used_dimensions = [
+            name
+            for name, cols in EXPECTED_STRUCTURE_DIMENSIONS.items()
+            if set(cols) & set(columns)
+        ]
+        blocks = self.blocks()
+        rows = blocks
+        for name in used_dimensions:
+            rows = rows.merge(self.dimensions[name], on=EXPECTED_STRUCTURE_KEYS)
+
+        campaign_round_keys = EXPECTED_STRUCTURE_KEYS[1:]
+        is_unique = (
+            set(campaign_round_keys) <= set(columns)
+            and all(
+                set(EXPECTED_STRUCTURE_DIMENSIONS[name]) <= set(columns)
+                for name in used_dimensions
+            )
+            and not blocks.duplicated(campaign_round_keys).any()
+        )
+        rows = rows[columns]
+        if not is_unique:
+            rows = rows.drop_duplicates()
+        return apply_categorical_schema(rows.reset_index(drop=True))
+
+
+def save_expected_structure(
+    structure: ExpectedStructure, name: str = EXPECTED_STRUCTURE_NAME
+) -> None:
+    """
+    Save the dimension tables of a factorized expected structure, as '{name}_{dimension}' parquet datasets
+    partitioned by EXPECTED_STRUCTURE_PARTITION_COLS.
+
+    Args:
+        structure (ExpectedStructure): The structure to save.
+        name (str, optional): The name of the structure. Defaults to EXPECTED_STRUCTURE_NAME.
+
+    Returns:
+        None
+    """
+    for dimension_name, dimension in structure.dimensions.items():
+        save_file(
+            dimension,
+            f"{name}_{dimension_name}",
+            partition_cols=EXPECTED_STRUCTURE_PARTITION_COLS,
+        )
+
+
+def load_expected_structure(
+    name: str = EXPECTED_STRUCTURE_NAME,
+    columns: list | None = None,
+    filters: dict | None = None,
+) -> ExpectedStructure:
+    """
+    Load a factorized expected structure saved by save_expected_structure, reading only what
+    the caller needs: the dimensions holding none of the given columns are reduced to their
+    blocks, and the filters are pushed down to the parquet datasets, so that only the matching
+    partitions (produit, year) are read.
+
+    Args:
+        name (str, optional): The name of the structure. Defaults to EXPECTED_STRUCTURE_NAME.
+        columns (list, optional): The columns that will be materialized. Defaults to None (all columns).
+        filters (dict, optional): The accepted values of some columns, e.g. {"produit": ["rougeole"]}.
+                                  A filter on a key column selects blocks, a filter on a dimension
+                                  column selects values of that dimension. Defaults to None.
+
+    Returns:
+        ExpectedStructure: The expected structure.
+    """
+    dimensions = {}
+    for dimension_name, dimension_cols in EXPECTED_STRUCTURE_DIMENSIONS.items():
+        if columns is None or set(dimension_cols) & set(columns):
+            read_cols = EXPECTED_STRUCTURE_KEYS + dimension_cols
+        else:
+            read_cols = EXPECTED_STRUCTURE_KEYS
+        read_filters = [
+            (col, "in", list(values))
+            for col, values in (filters or {}).items()
+            if col in EXPECTED_STRUCTURE_KEYS + dimension_cols
+        ]
+        dimensions[dimension_name] = load_data(
+            f"{name}_{dimension_name}",
+            columns=read_cols,
+            filters=read_filters or None,
+        )
+    return ExpectedStructure(dimensions)
+
+
+def write_xlsx_streaming(
+    df: pd.DataFrame,
+    file_path: str,
+    max_rows_per_sheet: int | None = None,
+) -> None:
+    """
+    Write a dataframe to an xlsx file row by row with a write-only workbook, so that the memory
+    used does not grow with the size of the table. Frames exceeding the Excel row limit are
+    split over several sheets (Sheet1, Sheet2, ...), each one with the header row.
+
+    Args:
+        df (pd.DataFrame): The dataframe to write.
+        file_path (str): The path of the xlsx file.
+        max_rows_per_sheet (int, optional): The maximum number of data rows per sheet.
+                                            Defaults to XLSX_MAX_ROWS_PER_SHEET.
+
+    Returns:
+        None
+    """
+    if max_rows_per_sheet is None:
+        max_rows_per_sheet = XLSX_MAX_ROWS_PER_SHEET
+
+    workbook = Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    sheet_starts = range(0, max(len(df), 1), max_rows_per_sheet)
+
+    for sheet_number, sheet_start in enumerate(sheet_starts, start=1):
+        worksheet = workbook.create_sheet(title=f"Sheet{sheet_number}")
+        worksheet.append(header)
+        sheet_end = min(sheet_start + max_rows_per_sheet, len(df))
+
+        for batch_start in range(sheet_start, sheet_end, XLSX_WRITE_BATCH_SIZE):
+            batch = df.iloc[
+                batch_start : min(batch_start + XLSX_WRITE_BATCH_SIZE, sheet_end)
+            ]
+            for col in batch.columns[
+                batch.dtypes.map(lambda dtype: isinstance(dtype, pd.DatetimeTZDtype))
+            ]:
+                batch = batch.assign(**{col: batch[col].dt.tz_localize(None)})
+            # missing values are written as empty cells
+            batch = batch.astype(object).where(batch.notna(), None)
+            for row in batch.itertuples(index=False, name=None):
+                worksheet.append(row)
+
+    workbook.save(file_path)
+
+
+def write_export_file(df: pd.DataFrame, format_type: str, file_path: str) -> str:
+    """
+    Write a dataframe to a file in the given export format.
+
+    Args:
+        df (pd.DataFrame): The dataframe to write.
+        format_type (str): The export format ("parquet", "xlsx" or "csv").
+        file_path (str): The path of the file to write.
+
+    Returns:
+        str: The path of the written file.
+    """
+    if format_type == "parquet":
+        df.to_parquet(file_path, index=False)
+    elif format_type == "xlsx":
+        write_xlsx_streaming(df, file_path)
+    elif format_type == "csv":
+        df.to_csv(file_path, index=False)
+    else:
+        raise ValueError(f"Format d'exportation non supporté : {format_type}")
+    return file_path
+
+
+def select_export_formats(
+    df: pd.DataFrame, formats: tuple, max_rows_per_format: dict | None = None
+) -> list:
+    """
+    Apply the format policy of a dataset: formats whose row limit is exceeded by the dataframe are skipped.
+
+    Args:
+        df (pd.DataFrame): The dataframe to export.
+        formats (tuple): The requested formats.
+        max_rows_per_format (dict, optional): The maximum number of rows per format.
+                                              Defaults to DEFAULT_MAX_ROWS_PER_FORMAT.
+
+    Returns:
+        list: The formats to export.
+    """
+    if max_rows_per_format is None:
+        max_rows_per_format = DEFAULT_MAX_ROWS_PER_FORMAT
+
+    selected_formats = []
+    for format_type in formats:
+        max_rows = max_rows_per_format.get(format_type)
+        if max_rows is not None and len(df) > max_rows:
+            current_run.log_warning(
+                f"Format {format_type} ignoré : {len(df)} lignes (limite : {max_rows})."
+            )
+            continue
+        selected_formats.append(format_type)
+    return selected_formats
+
+
+def export_to_dataset(
+    df: pd.DataFrame,
+    df_file_path: str,
+    dataset_name: str,
+    description: str = "",
+    formats: tuple = ("parquet", "xlsx", "csv"),
+    max_rows_per_format: dict | None = None,
+) -> None:
     """
     Exports a DataFrame to an OpenHexa dataset in multiple formats (xlsx, parquet, csv).
+    No new version is created when the data is identical to the latest exported version.
+    The files are written concurrently and uploaded one after another, each as soon as it is ready.
 
     Args:
         df (pd.DataFrame): The configuration dataframe to export.
         df_file_path (str): The file path where the dataframe is saved.
         dataset_name (str): The name of the OpenHexa dataset.
+        description (str, optional): The description of the dataset if it has to be created. Defaults to "".
+        formats (tuple, optional): The formats to export. Defaults to ("parquet", "xlsx", "csv").
+        max_rows_per_format (dict, optional): The maximum number of rows per format, above which
+                                              the format is skipped. Defaults to DEFAULT_MAX_ROWS_PER_FORMAT.
     """
     current_run.log_info(
         f"Préparation de l'exportation vers le dataset : {dataset_name}..."
@@ -94,12 +1090,35 @@ def export_to_dataset(df: pd.DataFrame, df_file_path: str, dataset_name: str) ->
         current_run.log_info(f"Dataset {dataset_name} non trouvé. Création en cours...")
         dataset = workspace.create_dataset(
             name=dataset_name,
-            description="",
+            description=description,
         )
 
     # define versioning
     try:
         latest_version = dataset.latest_version
+        df = apply_categorical_schema(df)
+        fingerprint = compute_fingerprint(df)
+        export_storage = LocalStorage(df_file_path)
+        fingerprint_name = f"{dataset_name}.dataset.fingerprint"
+        previous_export = read_fingerprint(export_storage, fingerprint_name)
+        base_path = os.path.join(df_file_path, dataset_name)
+        files_to_upload = {
+            format_type: f"{base_path}.{format_type}"
+            for format_type in select_export_formats(df, formats, max_rows_per_format)
+        }
+        # the export is only skipped when its output files are still on disk
+        if (
+            latest_version
+            and previous_export.get("fingerprint") == fingerprint
+            and previous_export.get("version") == latest_version.name
+            and all(os.path.isfile(file_path) for file_path in files_to_upload.values())
+        ):
+            current_run.log_info(
+                f"Données inchangées depuis la version {latest_version.name} du dataset {dataset_name}. "
+                "Aucune nouvelle version créée."
+            )
+            return
+
         version_number = (
             int(latest_version.name.lstrip("v")) + 1 if latest_version else 1
         )
@@ -109,26 +1128,51 @@ def export_to_dataset(df: pd.DataFrame, df_file_path: str, dataset_name: str) ->
         if not os.path.exists(df_file_path):
             os.makedirs(df_file_path)
 
-        base_path = os.path.join(df_file_path, dataset_name)
-        files_to_upload = {
-            "parquet": f"{base_path}.parquet",
-            "xlsx": f"{base_path}.xlsx",
-            "csv": f"{base_path}.csv",
+        # the parquet file written by save_file is uploaded as is when it holds the same data
+        # (rewriting it would also make its Arrow cache stale)
+        reused_files = {
+            format_type: file_path
+            for format_type, file_path in files_to_upload.items()
+            if format_type == "parquet"
+            and os.path.isfile(file_path)
+            and read_fingerprint(
+                export_storage, f"{dataset_name}.parquet.fingerprint"
+            ).get("fingerprint")
+            == fingerprint
         }
 
-        df.to_parquet(files_to_upload["parquet"], index=False)
-        df.to_excel(files_to_upload["xlsx"], index=False)
-        df.to_csv(files_to_upload["csv"], index=False)
+        # the version is created once the first file is ready, so that a failing writer
+        # does not leave an empty version behind
+        versions = []
 
-        # upload to Dataset in OH
-        version = dataset.create_version(new_version_name)
-
-        for format_type, file_path in files_to_upload.items():
-            version.add_file(file_path, os.path.basename(file_path))
+        def upload_file(format_type: str, file_path: str) -> None:
+            if not versions:
+                versions.append(dataset.create_version(new_version_name))
+            versions[0].add_file(file_path, os.path.basename(file_path))
             current_run.log_info(
                 f"Fichier {format_type} ajouté à la version {new_version_name}"
             )
 
+        # write the files in parallel and upload them to Dataset in OH from this thread only,
+        # the dataset version not being safe to share between threads
+        for format_type, file_path in reused_files.items():
+            upload_file(format_type, file_path)
+        with ThreadPoolExecutor(max_workers=EXPORT_MAX_WORKERS) as executor:
+            write_futures = {
+                executor.submit(write_export_file, df, format_type, file_path): (
+                    format_type
+                )
+                for format_type, file_path in files_to_upload.items()
+                if format_type not in reused_files
+            }
+            for future in as_completed(write_futures):
+                upload_file(write_futures[future], future.result())
+        write_fingerprint(
+            export_storage,
+            fingerprint_name,
+            {"fingerprint": fingerprint, "version": new_version_name},
+        )
+
         current_run.log_info(
             f"Exportation terminée avec succès pour {dataset_name} ({new_version_name})"
         )
@@ -9,7 +9,22 @@ WORKSPACE_PATH = workspace.files_path
 # )  # local only
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
 
+# columns read from the historical target data
+target_data_cols = [
+    "org_unit_id",
+    "LVL_2_NAME",
+    "LVL_3_NAME",
+    "LVL_6_NAME",
+    "year",
+    "produit",
+    "round",
+    "age",
+]
+
 # configs
+# name of the historical campaigns in the expected structure (see ExpectedStructure)
+historical_source_name = "historique"
+
 product_site_config = {
     "vaccin polio": {
         "ordinaire",
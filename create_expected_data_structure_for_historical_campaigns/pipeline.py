@@ -3,10 +3,13 @@ import pandas as pd
 import numpy as np
 from shared_utils import (
     load_data,
-    save_file,
+    ExpectedStructure,
+    save_expected_structure,
 )
 
 from config import (
+    historical_source_name,
+    target_data_cols,
     product_site_config,
     product_status_config,
     sex_types_config,
@@ -28,12 +31,12 @@ def create_expected_data_structure_for_historical_campaigns():
     The main steps of the pipeline are as follows:
     - create the combinations of parameters (product, site, age group, sex, vaccination status,
       campaign round, campaign year, campaign period) based on the configurations of historical
-      campaigns
-    - save the combined dataframe in the outputs folder as a parquet file in the workspace
+      campaigns, in the factorized form of the expected structure (one table per dimension)
+    - save the dimension tables in the outputs folder as parquet files in the workspace
 
     """
     # load relevant data
-    target_df = load_data("combined_historical_target_data")
+    target_df = load_data("combined_historical_target_data", columns=target_data_cols)
 
     # create combination dataset for historical campaigns
     product_site_df = create_product_site_df()
@@ -41,7 +44,7 @@ def create_expected_data_structure_for_historical_campaigns():
     product_status_df = create_product_status_df()
     age_product_year_round_df = create_age_product_year_round_df(target_df)
     campaign_period_df = create_campaign_period_df()
-    combined_df = combine_dfs(
+    dimensions = combine_dfs(
         target_df,
         age_product_year_round_df,
         product_site_df,
@@ -49,10 +52,12 @@ def create_expected_data_structure_for_historical_campaigns():
         product_status_df,
         campaign_period_df,
     )
-    combined_df = adjust_to_specific_campaigns(combined_df)
+    expected_structure = adjust_to_specific_campaigns(dimensions)
 
     # save
-    save_file(combined_df, "expected_data_structure_historical_campaigns")
+    save_expected_structure(
+        expected_structure, "expected_data_structure_historical_campaigns"
+    )
 
 
 def create_product_site_df() -> pd.DataFrame:
@@ -223,9 +228,12 @@ def combine_dfs(
     sex_type_df: pd.DataFrame,
     product_status_df: pd.DataFrame,
     campaign_period_df: pd.DataFrame,
-) -> pd.DataFrame:
+) -> dict:
     """
-    Combine all DataFrames into a single DataFrame representing the combination products dataset of historical campaigns.
+    Combine all DataFrames into the dimension tables of the expected structure of historical campaigns.
+    Each campaign round (product, year, round) of the target data is a block, whose expected rows are
+    the cross product of its org units, sex types, age groups, sites, statuses and periods. The cross
+    product itself is never built (see ExpectedStructure).
 
     Args:
         target_df (pd.DataFrame): DataFrame with target data.
@@ -236,82 +244,75 @@ def combine_dfs(
         campaign_period_df (pd.DataFrame): DataFrame with campaign periods.
 
     Returns:
-        combined_df (pd.DataFrame): The combined DataFrame representing the combination products dataset of historical campaigns.
+        dimensions (dict): The dimension tables, by dimension name, keyed by block (source, product, year, round).
+                           The org units table also holds the region names (LVL_2_NAME).
     """
     current_run.log_info(
         "Combinaison de tous les DataFrames de campagnes historiques en un seul jeu de données..."
     )
     try:
-        # cross join org_unit, sex, and combo df
+        block_keys = ["produit", "year", "round"]
+        blocks = age_product_year_round_df[block_keys].drop_duplicates()
+        blocks.insert(0, "source", historical_source_name)
+
+        # org units and sex types apply to every campaign round
         org_unit_ids_df = target_df[
             ["org_unit_id", "LVL_2_NAME", "LVL_3_NAME", "LVL_6_NAME"]
         ].drop_duplicates()
-        combined_df = org_unit_ids_df.merge(sex_type_df, how="cross").merge(
-            age_product_year_round_df, how="cross"
-        )
+        org_units_df = blocks.merge(org_unit_ids_df, how="cross")
+        sexes_df = blocks.merge(sex_type_df, how="cross")
+        ages_df = blocks.merge(age_product_year_round_df, on=block_keys)
 
-        # merge with product sites
-        combined_df = combined_df.merge(
+        # product sites
+        sites_df = blocks.merge(
             product_site_df, on="produit", how="left", indicator=True
         )
-        unmatched = combined_df[combined_df["_merge"] == "left_only"]
+        unmatched = sites_df[sites_df["_merge"] == "left_only"]
         if not unmatched.empty:
             msg = f"Entrées non appariées trouvées lors de la fusion des DataFrames produit et site : {unmatched}"
             current_run.log_error(msg)
             raise ValueError(msg)
+        sites_df = sites_df.drop(columns=["_merge"])
 
-        combined_df = combined_df.drop(columns=["_merge"])
-
-        # merge with product statuses
-        combined_df = combined_df.merge(
+        # product statuses
+        statuses_df = blocks.merge(
             product_status_df, on="produit", how="left", indicator=True
         )
-        unmatched = combined_df[combined_df["_merge"] == "left_only"]
+        unmatched = statuses_df[statuses_df["_merge"] == "left_only"]
         if not unmatched.empty:
             msg = f"Entrées non appariées trouvées lors de la fusion des DataFrames produit et statut : {unmatched}"
             current_run.log_error(msg)
             raise ValueError(msg)
+        statuses_df = statuses_df.drop(columns=["_merge"]).rename(
+            columns={"status": "vaccination_status"}
+        )
 
-        combined_df = combined_df.drop(columns=["_merge"])
-
-        # merge with campaign periods
-        combined_df = combined_df.merge(
+        # campaign periods
+        periods_df = blocks.merge(
             campaign_period_df,
-            on=["produit", "year", "round"],
+            on=block_keys,
             how="left",
             indicator=True,
         )
-        unmatched = combined_df[combined_df["_merge"] == "left_only"]
+        unmatched = periods_df[periods_df["_merge"] == "left_only"]
         if not unmatched.empty:
             msg = f"Entrées non appariées trouvées lors de la fusion du DataFrame des périodes de campagne : {unmatched}"
             current_run.log_error(msg)
             raise ValueError(msg)
-
-        combined_df = combined_df.drop(columns=["_merge"])
-
-        # final cleanup
-        combined_df = combined_df.drop_duplicates().reset_index(drop=True)
-
-        combined_df = combined_df.rename(
-            columns={
-                "org_unit_id": "org_unit_id",
-                "site": "site",
-                "age": "age",
-                "sexe": "sexe",
-                "product": "produit",
-                "status": "vaccination_status",
-                "round": "round",
-                "year": "year",
-                "period": "period",
-                "order_day": "order_day",
-            }
-        )
+        periods_df = periods_df.drop(columns=["_merge"])
 
         current_run.log_info(
             "Tous les DataFrames de campagnes historiques combinés avec succès."
         )
 
-        return combined_df
+        return {
+            "org_units": org_units_df,
+            "sexes": sexes_df,
+            "ages": ages_df,
+            "sites": sites_df,
+            "vaccination_statuses": statuses_df,
+            "periods": periods_df,
+        }
 
     except ValueError:
         raise
@@ -321,15 +322,16 @@ def combine_dfs(
         raise
 
 
-def adjust_to_specific_campaigns(combined_df: pd.DataFrame) -> pd.DataFrame:
+def adjust_to_specific_campaigns(dimensions: dict) -> ExpectedStructure:
     """
-    Adjust the combined DataFrame for specific campaigns as needed.
+    Adjust the dimension tables for specific campaigns as needed, and build the expected structure.
 
     Args:
-        combined_df (pd.DataFrame): DataFrame containing the combined campaign data.
+        dimensions (dict): The dimension tables returned by combine_dfs.
 
     Returns:
-        combined_df (pd.DataFrame): Adjusted DataFrame with specific campaign adjustments applied.
+        expected_structure (ExpectedStructure): The expected structure of historical campaigns, with
+                                                specific campaign adjustments applied.
     """
     current_run.log_info(
         "Ajustement du DataFrame combiné pour des campagnes spécifiques..."
@@ -337,22 +339,27 @@ def adjust_to_specific_campaigns(combined_df: pd.DataFrame) -> pd.DataFrame:
     try:
         # For yellow fever campaigns 2025 2026 round 1, delete all entries outside the
         #  regions of Dosso and Tahoua (only these 2 regions have been covered)
+        org_units_df = dimensions["org_units"]
         mask_yellow_fever_dosso_tahouha = (
-            (combined_df["produit"] == "fièvre jaune")
-            & (combined_df["year"].isin([2025, 2026]))
-            & (combined_df["round"] == "round 1")
-            & (~combined_df["LVL_2_NAME"].isin(["Dosso", "Tahoua"]))
+            (org_units_df["produit"] == "fièvre jaune")
+            & (org_units_df["year"].isin([2025, 2026]))
+            & (org_units_df["round"] == "round 1")
+            & (~org_units_df["LVL_2_NAME"].isin(["Dosso", "Tahoua"]))
         )
-        combined_df = combined_df[~mask_yellow_fever_dosso_tahouha].reset_index(
+        org_units_df = org_units_df[~mask_yellow_fever_dosso_tahouha].reset_index(
             drop=True
         )
-        combined_df = combined_df.drop(columns=["LVL_2_NAME"])
+        org_units_df = org_units_df.drop(columns=["LVL_2_NAME"])
+
+        expected_structure = ExpectedStructure(
+            {**dimensions, "org_units": org_units_df}
+        )
 
         current_run.log_info(
             "Ajustement du DataFrame combiné pour des campagnes spécifiques effectué avec succès."
         )
 
-        return combined_df
+        return expected_structure
     except Exception as e:
         msg = f"Erreur lors de l'ajustement du DataFrame combiné pour des campagnes spécifiques: {e}"
         current_run.log_error(msg)
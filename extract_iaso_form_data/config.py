@@ -9,6 +9,9 @@ WORKSPACE_PATH = workspace.files_path
 # )  # local only
 OUTPUTS_PATH = os.path.join(WORKSPACE_PATH, PROJECT_FOLDER, "outputs")
 IASO_EXTRACTION_PATH = os.path.join(OUTPUTS_PATH, "iaso_données_extraites")
+FORM_SCHEMA_CACHE_PATH = os.path.join(IASO_EXTRACTION_PATH, "form_schema_cache")
+WATERMARK_FILE_PATH = os.path.join(IASO_EXTRACTION_PATH, "extraction_watermarks.json")
+COMBINE_MANIFEST_PATH = os.path.join(IASO_EXTRACTION_PATH, "combine_manifest.json")
 
 # IASO Connector Instances
 connection = workspace.get_connection("iaso-pev-niger")
@@ -19,3 +22,12 @@ iaso_connector_slug = {
 }
 
 iaso_form_id = 1186
+
+# IASO extraction settings
+iaso_page_size = 50
+iaso_max_concurrent_requests = 4
+iaso_requests_per_second = 4.0
+iaso_backfill_max_workers = 3
+iaso_combine_max_workers = 4
+# the current month is fully re-extracted at least this often, to drop the submissions deleted in IASO
+iaso_current_month_refresh_days = 7
@@ -1,8 +1,13 @@
 import datetime
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
-from openhexa.sdk import current_run, pipeline
+import pyarrow as pa
+import pyarrow.feather as feather
+from openhexa.sdk import current_run, parameter, pipeline
 from pathlib import Path
 from shared_utils import (
     save_file,
@@ -12,11 +17,21 @@ from shared_utils import (
 from config import (
     OUTPUTS_PATH,
     IASO_EXTRACTION_PATH,
+    FORM_SCHEMA_CACHE_PATH,
+    WATERMARK_FILE_PATH,
+    COMBINE_MANIFEST_PATH,
     iaso_connector_slug,
     iaso_form_id,
+    iaso_page_size,
+    iaso_max_concurrent_requests,
+    iaso_requests_per_second,
+    iaso_backfill_max_workers,
+    iaso_combine_max_workers,
+    iaso_current_month_refresh_days,
 )
 from utils import (
     IASOConnectionHandler,
+    conform_to_arrow_schema,
 )
 
 
@@ -24,19 +39,83 @@ from utils import (
     "extract_iaso_form_data",
     name="multi-campagne - Extraction des données du formulaire IASO",
 )
-def extract_iaso_form_data():
+@parameter(
+    "full_refresh",
+    name="Extraction complète",
+    help="Ignorer le dernier point de synchronisation et ré-extraire le mois en cours en entier",
+    type=bool,
+    required=False,
+    default=False,
+)
+def extract_iaso_form_data(full_refresh: bool = False):
     """
-    Main pipeline function to extract and process IASO form data
+    Main pipeline function to extract and process IASO form data.
+
+    The historical months without a feather file are extracted first. Then, when a watermark from
+    a previous successful run exists (and 'full_refresh' is not set), only the submissions modified
+    since that watermark are requested from IASO and upserted into the existing monthly feather files.
+    The current month is fully re-extracted when there is no watermark, when it has no feather file yet,
+    or when its last full extraction is older than 'iaso_current_month_refresh_days' days (the
+    modification watermark does not see the submissions deleted in IASO).
+
+    Args:
+        full_refresh (bool): Whether to ignore the watermark and re-extract the current month entirely.
     """
-    extract_iaso_data_for_current_month()
     extract_iaso_data_for_other_months()
-    combined_df = process_historical_and_current_data()
+
+    watermark = None if full_refresh else load_extraction_watermark(iaso_form_id)
+    if watermark is not None:
+        extract_iaso_data_since_watermark(watermark)
+    if watermark is None or is_current_month_refresh_due(iaso_form_id):
+        extract_iaso_data_for_current_month()
+        save_current_month_refresh_time(iaso_form_id)
+
+    iaso_connector_instance = get_iaso_connector_instance()
+    iaso_connector_instance.get_data_structure_from_the_form(iaso_form_id)
+    manifest = build_partitions_manifest(iaso_connector_instance.form_version_id)
+    if not partitions_changed_since_last_combine(manifest):
+        current_run.log_info(
+            "Aucune partition modifiée depuis la dernière combinaison. "
+            "Les données combinées existantes sont conservées."
+        )
+        return
+
+    combined_df = process_historical_and_current_data(
+        iaso_connector_instance.form_data_structure_df.name.unique()
+    )
+    save_extraction_watermark(iaso_form_id, combined_df)
     save_file(combined_df, "combined_iaso_data_raw")
     export_to_dataset(
         combined_df,
         OUTPUTS_PATH,
         "combined_iaso_data_raw",
     )
+    save_combine_manifest(manifest)
+
+
+def get_iaso_connector_instance(
+    max_parallel_extractions: int = 1,
+) -> IASOConnectionHandler:
+    """
+    Creates an authenticated IASO connection handler configured with the extraction settings
+    (page size, number of concurrent requests and request rate) defined in the config. The
+    parsed form structure is cached in the FORM_SCHEMA_CACHE_PATH.
+
+    Args:
+        max_parallel_extractions (int, optional): The number of extractions that will share the handler
+                                                  at the same time, to size its connection pool. Defaults to 1.
+
+    Returns:
+        IASOConnectionHandler: The authenticated IASO connection handler.
+    """
+    return IASOConnectionHandler(
+        iaso_connector_slug,
+        page_size=iaso_page_size,
+        max_concurrent_requests=iaso_max_concurrent_requests,
+        requests_per_second=iaso_requests_per_second,
+        schema_cache_dir=FORM_SCHEMA_CACHE_PATH,
+        max_parallel_extractions=max_parallel_extractions,
+    )
 
 
 def extract_iaso_data_for_current_month() -> None:
@@ -59,28 +138,23 @@ def extract_iaso_data_for_current_month() -> None:
         f"Début de l'extraction IASO pour le mois en cours : {current_period_str}..."
     )
     try:
-        iaso_connector_instance = IASOConnectionHandler(iaso_connector_slug)
-        iaso_connector_instance.get_data_structure_from_the_form(iaso_form_id)
+        iaso_connector_instance = get_iaso_connector_instance()
 
         current_period_start_date = f"{current_year}-{current_month:02d}-01"
+        file_name = f"multicampaign_df_{current_period_str}_raw.feather"
 
-        current_df = iaso_connector_instance.extract_submissions_info(
-            form_id=iaso_form_id, dateFrom=current_period_start_date
+        row_count = iaso_connector_instance.extract_submissions_to_file(
+            form_id=iaso_form_id,
+            file_path=os.path.join(IASO_EXTRACTION_PATH, file_name),
+            dateFrom=current_period_start_date,
         )
 
-        if current_df is None or current_df.empty:
+        if row_count == 0:
             current_run.log_warning(
                 f"Aucune soumission trouvée pour {current_period_str}. Le fichier existant ne sera pas modifié."
             )
             return
 
-        file_name = f"multicampaign_df_{current_period_str}_raw.feather"
-
-        file_path = os.path.join(IASO_EXTRACTION_PATH, file_name)
-        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-
-        current_df.to_feather(file_path)
-
         current_run.log_info(
             f"Données IASO pour {current_period_str} extraites et sauvegardées avec succès."
         )
@@ -97,6 +171,9 @@ def extract_iaso_data_for_other_months() -> None:
     skipping months that already have a saved file, and saving each month's data as
     a feather file in the IASO_EXTRACTION_PATH.
 
+    The missing months are planned up front and extracted in parallel on a pool of
+    'iaso_backfill_max_workers' workers sharing the same authenticated IASO session.
+
     Args:
         None
 
@@ -113,135 +190,696 @@ def extract_iaso_data_for_other_months() -> None:
     )
 
     try:
-        iaso_connector_instance = IASOConnectionHandler(iaso_connector_slug)
-        iaso_connector_instance.get_data_structure_from_the_form(iaso_form_id)
-
         existing_files = (
             os.listdir(IASO_EXTRACTION_PATH)
             if os.path.exists(IASO_EXTRACTION_PATH)
             else []
         )
+        missing_months = plan_missing_months(
+            current_year, current_month, existing_files
+        )
 
-        for year in range(2024, current_year + 1):
-            for month in range(1, 13):
-                if year == current_year and month >= current_month:
-                    continue
-
-                period_str = f"{year}-{month:02d}"
-                expected_file_name = f"multicampaign_df_{period_str}_raw.feather"
-
-                if expected_file_name in existing_files:
-                    continue
+        if not missing_months:
+            current_run.log_info("Tous les mois historiques sont déjà extraits.")
+            return
 
-                period_start_date = datetime.date(year, month, 1)
-                if month == 12:
-                    period_end_date = datetime.date(year + 1, 1, 1)
-                else:
-                    period_end_date = datetime.date(year, month + 1, 1)
+        current_run.log_info(
+            f"{len(missing_months)} mois à extraire : {', '.join(month[0] for month in missing_months)}"
+        )
 
-                current_run.log_info(
-                    f"Extraction des données IASO pour {period_str}..."
-                )
+        iaso_connector_instance = get_iaso_connector_instance(
+            max_parallel_extractions=iaso_backfill_max_workers
+        )
+        # load the form structure once before starting the workers, which only read it
+        iaso_connector_instance.get_data_structure_from_the_form(iaso_form_id)
 
+        with ThreadPoolExecutor(max_workers=iaso_backfill_max_workers) as executor:
+            futures = {
+                executor.submit(
+                    extract_iaso_data_for_month,
+                    iaso_connector_instance,
+                    period_str,
+                    period_start_date,
+                    period_end_date,
+                ): period_str
+                for period_str, period_start_date, period_end_date in missing_months
+            }
+
+            for month_count, future in enumerate(as_completed(futures), start=1):
+                period_str = futures[future]
                 try:
-                    month_df = iaso_connector_instance.extract_submissions_info(
-                        form_id=iaso_form_id,
-                        dateFrom=period_start_date.strftime("%Y-%m-%d"),
-                        dateTo=period_end_date.strftime("%Y-%m-%d"),
-                    )
-
-                    if month_df is None or month_df.empty:
-                        current_run.log_info(
-                            f"Aucune donnée trouvée pour {period_str}."
-                        )
-                        continue
-
-                    # Save the file
-                    file_path = os.path.join(IASO_EXTRACTION_PATH, expected_file_name)
-                    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-
-                    month_df.to_feather(file_path)
-
+                    future.result()
                     current_run.log_info(
-                        f"Extraction des données IASO réussie pour {period_str} : {expected_file_name}"
+                        f"[{month_count}/{len(futures)}] Extraction terminée pour {period_str}."
                     )
-
                 except Exception as e:
                     current_run.log_error(
-                        f"Erreur lors de l'extraction de {period_str}: {str(e)}"
+                        f"[{month_count}/{len(futures)}] Erreur lors de l'extraction de {period_str}: {str(e)}"
                     )
-                    continue
     except Exception as e:
         msg = f"Erreur critique lors de l'extraction des données historiques (Excluant {current_period_str}) : {str(e)}"
         current_run.log_error(msg)
         raise
 
 
-def process_historical_and_current_data() -> pd.DataFrame:
+def plan_missing_months(
+    current_year: int, current_month: int, existing_files: list
+) -> list[tuple[str, datetime.date, datetime.date]]:
     """
-    Combine all the historical and current month data extracted from IASO,
-    handling duplicates and ensuring alignment with the expected form structure.
+    List the months from January 2024 up to the month preceding the current month that
+    don't have a saved feather file yet.
 
     Args:
+        current_year (int): The current year.
+        current_month (int): The current month.
+        existing_files (list): The names of the files in the IASO_EXTRACTION_PATH.
+
+    Returns:
+        list[tuple[str, datetime.date, datetime.date]]: The missing months, as tuples of
+            ('YYYY-MM', first day of the month, first day of the following month).
+    """
+    missing_months = []
+    for year in range(2024, current_year + 1):
+        for month in range(1, 13):
+            if year == current_year and month >= current_month:
+                continue
+
+            period_str = f"{year}-{month:02d}"
+            if f"multicampaign_df_{period_str}_raw.feather" in existing_files:
+                continue
+
+            period_start_date = datetime.date(year, month, 1)
+            if month == 12:
+                period_end_date = datetime.date(year + 1, 1, 1)
+            else:
+                period_end_date = datetime.date(year, month + 1, 1)
+
+            missing_months.append((period_str, period_start_date, period_end_date))
+
+    return missing_months
+
+
+def extract_iaso_data_for_month(
+    iaso_connector_instance: IASOConnectionHandler,
+    period_str: str,
+    period_start_date: datetime.date,
+    period_end_date: datetime.date,
+) -> None:
+    """
+    Extract the data of one month from IASO and save it as a feather file in the IASO_EXTRACTION_PATH.
+
+    Args:
+        iaso_connector_instance (IASOConnectionHandler): The authenticated IASO connection handler, with
+                                                         the form structure already loaded.
+        period_str (str): The month to extract, formatted as 'YYYY-MM'.
+        period_start_date (datetime.date): The first day of the month.
+        period_end_date (datetime.date): The first day of the following month.
+
+    Returns:
         None
+    """
+    current_run.log_info(f"Extraction des données IASO pour {period_str}...")
+
+    expected_file_name = f"multicampaign_df_{period_str}_raw.feather"
+    row_count = iaso_connector_instance.extract_submissions_to_file(
+        form_id=iaso_form_id,
+        file_path=os.path.join(IASO_EXTRACTION_PATH, expected_file_name),
+        dateFrom=period_start_date.strftime("%Y-%m-%d"),
+        dateTo=period_end_date.strftime("%Y-%m-%d"),
+        load_form_structure=False,
+    )
+
+    if row_count == 0:
+        current_run.log_info(f"Aucune donnée trouvée pour {period_str}.")
+        return
+
+    current_run.log_info(
+        f"Extraction des données IASO réussie pour {period_str} : {expected_file_name}"
+    )
+
+
+def save_feather_file(df: pd.DataFrame | pa.Table, file_path: str) -> None:
+    """
+    Save a dataframe as a feather file atomically: the data is written to a temporary file
+    which then replaces the target file, so that an interrupted write never leaves a
+    truncated feather file behind.
+
+    Args:
+        df (pd.DataFrame | pa.Table): The dataframe (or Arrow table) to save.
+        file_path (str): The path of the feather file.
 
     Returns:
-        pd.DataFrame: Combined DataFrame containing all the extracted data from IASO.
+        None
     """
-    current_run.log_info("Combinaison des données historiques et du mois en cours...")
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_file_path = f"{file_path}.tmp"
+    try:
+        if isinstance(df, pa.Table):
+            feather.write_feather(df, tmp_file_path)
+        else:
+            df.reset_index(drop=True).to_feather(tmp_file_path)
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+
+
+def load_extraction_watermark(form_id: int) -> float | None:
+    """
+    Load the watermark (latest submission modification timestamp) recorded by the last
+    successful extraction of a form.
+
+    Args:
+        form_id (int): The ID of the IASO form.
+
+    Returns:
+        float | None: The watermark as a unix timestamp, or None if no watermark was recorded.
+    """
+    if not os.path.exists(WATERMARK_FILE_PATH):
+        current_run.log_info(
+            "Aucun point de synchronisation trouvé. Le mois en cours sera extrait en entier."
+        )
+        return None
+
+    try:
+        with open(WATERMARK_FILE_PATH, "r") as f:
+            watermarks = json.load(f)
+    except Exception as e:
+        current_run.log_warning(
+            f"Lecture du point de synchronisation impossible ({str(e)}). Le mois en cours sera extrait en entier."
+        )
+        return None
+
+    watermark = watermarks.get(str(form_id), {}).get("updated_at")
+    if watermark is not None:
+        watermark_date = datetime.datetime.fromtimestamp(
+            watermark, datetime.timezone.utc
+        )
+        current_run.log_info(
+            f"Point de synchronisation trouvé pour le formulaire {form_id} : {watermark_date:%Y-%m-%d %H:%M:%S} (UTC)"
+        )
+    return watermark
+
+
+def save_extraction_watermark(form_id: int, combined_df: pd.DataFrame) -> None:
+    """
+    Record the latest modification timestamp ('updated_at', or 'created_at' for submissions
+    extracted before 'updated_at' was collected) found in the extracted data as the watermark
+    of the form.
+
+    Args:
+        form_id (int): The ID of the IASO form.
+        combined_df (pd.DataFrame): Combined DataFrame containing all the extracted data from IASO.
+
+    Returns:
+        None
+    """
+    timestamp_cols = [
+        col for col in ["updated_at", "created_at"] if col in combined_df.columns
+    ]
+    if combined_df.empty or not timestamp_cols:
+        current_run.log_warning(
+            "Aucune date de modification disponible. Le point de synchronisation n'est pas mis à jour."
+        )
+        return
+
+    watermark = get_modification_timestamps(combined_df).max()
+    if pd.isna(watermark):
+        return
+
+    watermarks = read_watermark_file()
+    watermarks.setdefault(str(form_id), {})["updated_at"] = float(watermark)
+    write_watermark_file(watermarks)
+
+    current_run.log_info(
+        f"Point de synchronisation du formulaire {form_id} mis à jour."
+    )
+
+
+def read_watermark_file() -> dict:
+    """
+    Read the watermark file, holding for each form the latest extracted modification timestamp
+    ('updated_at') and the time of the last full extraction of the current month
+    ('current_month_refreshed_at').
+
+    Args:
+        None
+
+    Returns:
+        dict: The content of the watermark file, by form ID, or an empty dict if it is missing or unreadable.
+    """
+    try:
+        with open(WATERMARK_FILE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_watermark_file(watermarks: dict) -> None:
+    """
+    Write the watermark file atomically.
+
+    Args:
+        watermarks (dict): The content of the watermark file, by form ID.
+
+    Returns:
+        None
+    """
+    Path(WATERMARK_FILE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{WATERMARK_FILE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, WATERMARK_FILE_PATH)
+
+
+def is_current_month_refresh_due(form_id: int) -> bool:
+    """
+    Check whether the current month has to be fully re-extracted: it has no feather file yet, or
+    its last full extraction is older than 'iaso_current_month_refresh_days' days.
+
+    Args:
+        form_id (int): The ID of the IASO form.
+
+    Returns:
+        bool: True if the current month has to be fully re-extracted.
+    """
+    now = datetime.datetime.today()
+    current_period_str = f"{now.year}-{now.month:02d}"
+    file_path = os.path.join(
+        IASO_EXTRACTION_PATH, f"multicampaign_df_{current_period_str}_raw.feather"
+    )
+    if not os.path.exists(file_path):
+        return True
+
+    refreshed_at = (
+        read_watermark_file().get(str(form_id), {}).get("current_month_refreshed_at")
+    )
+    if refreshed_at is None:
+        return True
+    if time.time() - refreshed_at >= iaso_current_month_refresh_days * 86400:
+        current_run.log_info(
+            f"Dernière extraction complète du mois en cours le {datetime.datetime.fromtimestamp(refreshed_at):%Y-%m-%d}. "
+            "Le mois en cours sera extrait en entier."
+        )
+        return True
+    return False
+
+
+def save_current_month_refresh_time(form_id: int) -> None:
+    """
+    Record the time of the full extraction of the current month of a form.
+
+    Args:
+        form_id (int): The ID of the IASO form.
+
+    Returns:
+        None
+    """
+    watermarks = read_watermark_file()
+    watermarks.setdefault(str(form_id), {})["current_month_refreshed_at"] = time.time()
+    write_watermark_file(watermarks)
+
+
+def extract_iaso_data_since_watermark(watermark: float) -> None:
+    """
+    Extract from IASO the submissions created or modified since the watermark and upsert them
+    (by 'uuid') into the monthly feather files of the IASO_EXTRACTION_PATH, based on the month
+    of their creation date. The submissions of a month without a feather file are left to its
+    full extraction (see extract_iaso_data_for_other_months and extract_iaso_data_for_current_month),
+    which would otherwise consider the month as extracted.
+
+    Args:
+        watermark (float): The unix timestamp of the latest modification already extracted.
+
+    Returns:
+        None
+    """
+    # the API filter works at day level: the overlap is absorbed by the upsert on 'uuid'
+    modification_date_from = datetime.datetime.fromtimestamp(
+        watermark, datetime.timezone.utc
+    ).strftime("%Y-%m-%d")
+
+    current_run.log_info(
+        f"Extraction des soumissions IASO modifiées depuis le {modification_date_from}..."
+    )
+    try:
+        iaso_connector_instance = get_iaso_connector_instance()
+        delta_df = iaso_connector_instance.extract_submissions_info(
+            form_id=iaso_form_id, modificationDateFrom=modification_date_from
+        )
+
+        if delta_df is None or delta_df.empty:
+            current_run.log_info(
+                f"Aucune soumission modifiée depuis le {modification_date_from}."
+            )
+            return
+
+        delta_periods = pd.to_datetime(delta_df["created_at"], unit="s").dt.strftime(
+            "%Y-%m"
+        )
+        upserted_periods = 0
+        for period_str, period_df in delta_df.groupby(delta_periods):
+            if upsert_monthly_partition(period_df, period_str):
+                upserted_periods += 1
+
+        current_run.log_info(
+            f"{len(delta_df)} soumission(s) modifiée(s) reçue(s), {upserted_periods} fichier(s) mensuel(s) mis à jour."
+        )
+    except Exception as e:
+        msg = f"Erreur critique lors de l'extraction incrémentale des données IASO : {str(e)}"
+        current_run.log_error(msg)
+        raise
+
+
+def upsert_monthly_partition(df: pd.DataFrame, period_str: str) -> bool:
+    """
+    Insert or replace (by 'uuid') the given submissions in the existing feather file of a month.
+    A month without a feather file is skipped: it has not been fully extracted yet.
+
+    Only the submissions that are new, or modified since their stored version, are upserted, so
+    that the file (and the manifest of the partitions, see build_partitions_manifest) is left
+    untouched when the day-level overlap of the delta only brings back stored submissions. The
+    submissions are cast to the schema of the stored file before being merged.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the submissions of the month.
+        period_str (str): The month of the submissions, formatted as 'YYYY-MM'.
+
+    Returns:
+        bool: Whether the file was updated.
+    """
+    file_path = os.path.join(
+        IASO_EXTRACTION_PATH, f"multicampaign_df_{period_str}_raw.feather"
+    )
+
+    if not os.path.exists(file_path):
+        current_run.log_info(
+            f"Aucun fichier pour {period_str} : {len(df)} soumission(s) laissée(s) à l'extraction complète du mois."
+        )
+        return False
+
+    existing_table = feather.read_table(file_path)
+    df = df.drop_duplicates(subset="uuid", keep="last")
+
+    timestamp_cols = [
+        col
+        for col in ["uuid", "updated_at", "created_at"]
+        if col in existing_table.column_names
+    ]
+    stored_df = existing_table.select(timestamp_cols).to_pandas()
+    stored_df = pd.DataFrame(
+        {
+            "uuid": stored_df["uuid"],
+            "stored_at": get_modification_timestamps(stored_df),
+        }
+    ).drop_duplicates(subset="uuid", keep="last")
+    stored_at = (
+        df[["uuid"]].merge(stored_df, on="uuid", how="left")["stored_at"].to_numpy()
+    )
+    modified_at = get_modification_timestamps(df).to_numpy()
+    is_new = ~df["uuid"].isin(stored_df["uuid"]).to_numpy()
+    is_changed = (
+        is_new
+        | (modified_at > stored_at)
+        | (np.isnan(stored_at) & ~np.isnan(modified_at))
+    )
+    df = df[is_changed]
+    if df.empty:
+        current_run.log_info(f"Aucune soumission modifiée pour {period_str}.")
+        return False
+
+    schema = get_upsert_schema(existing_table.schema, df)
+    kept_rows = ~existing_table.column("uuid").to_pandas().isin(df["uuid"]).to_numpy()
+    table = pa.concat_tables(
+        [
+            conform_partition(existing_table.filter(pa.array(kept_rows)), schema),
+            conform_to_arrow_schema(df, schema),
+        ]
+    )
+    save_feather_file(table, file_path)
+    current_run.log_info(
+        f"{len(df)} soumission(s) intégrée(s) dans le fichier de {period_str}."
+    )
+    return True
+
+
+def get_modification_timestamps(df: pd.DataFrame) -> pd.Series:
+    """
+    Get the modification timestamp of each submission: 'updated_at', or 'created_at' for the
+    submissions extracted before 'updated_at' was collected.
+
+    Args:
+        df (pd.DataFrame): The submissions.
+
+    Returns:
+        pd.Series: The modification timestamps (NaN when unknown).
+    """
+    timestamps = pd.Series(np.nan, index=df.index)
+    for col in ["updated_at", "created_at"]:
+        if col in df.columns:
+            timestamps = timestamps.fillna(pd.to_numeric(df[col], errors="coerce"))
+    return timestamps.astype(float)
+
+
+def get_upsert_schema(existing_schema: pa.Schema, df: pd.DataFrame) -> pa.Schema:
+    """
+    Build the schema of a monthly file after an upsert: the schema of the stored file, followed by
+    the columns only found in the upserted submissions (e.g. after a new version of the form). These
+    columns, and the columns entirely null in the stored file, are typed like the extracted
+    submissions: numeric columns as float64, other columns as strings.
 
-    # Checking if the extraction folder exists
+    Args:
+        existing_schema (pa.Schema): The schema of the stored file.
+        df (pd.DataFrame): The upserted submissions.
+
+    Returns:
+        pa.Schema: The schema of the updated file.
+    """
+
+    def submission_type(col: str) -> pa.DataType:
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(
+            df[col]
+        ):
+            return pa.float64()
+        return pa.string()
+
+    fields = [
+        (
+            pa.field(field.name, submission_type(field.name))
+            if pa.types.is_null(field.type) and field.name in df.columns
+            else field
+        )
+        for field in existing_schema
+    ]
+    fields.extend(
+        pa.field(col, submission_type(col))
+        for col in df.columns
+        if col not in existing_schema.names
+    )
+    return pa.schema(fields)
+
+
+def list_partition_files() -> list:
+    """
+    List the monthly feather partitions present in the extraction folder, sorted by name.
+
+    Args:
+        None
+
+    Returns:
+        list: The names of the feather files.
+    """
     if not os.path.exists(IASO_EXTRACTION_PATH):
         msg = f"Le dossier de données n'existe pas : {IASO_EXTRACTION_PATH}"
         current_run.log_error(msg)
         raise FileNotFoundError(msg)
 
-    dataframes_list = []
+    return sorted(
+        file
+        for file in os.listdir(IASO_EXTRACTION_PATH)
+        if file.endswith(".feather") and not file.startswith("~$")
+    )
+
+
+def build_partitions_manifest(form_version_id: int | None) -> dict:
+    """
+    Describe the current state of the monthly partitions (size and modification time of each file)
+    together with the form version used to build the combined data.
+
+    Args:
+        form_version_id (int | None): The ID of the latest version of the IASO form.
+
+    Returns:
+        dict: The manifest of the partitions.
+    """
+    partitions = {}
+    for file in list_partition_files():
+        stat = os.stat(os.path.join(IASO_EXTRACTION_PATH, file))
+        partitions[file] = [stat.st_size, stat.st_mtime_ns]
+
+    return {"form_version_id": form_version_id, "partitions": partitions}
+
+
+def partitions_changed_since_last_combine(manifest: dict) -> bool:
+    """
+    Check whether the partitions changed since the last time 'combined_iaso_data_raw.parquet' was written.
+
+    Args:
+        manifest (dict): The manifest of the current partitions.
+
+    Returns:
+        bool: False only if the combined file exists and was built from the exact same partitions.
+    """
+    combined_file_path = os.path.join(OUTPUTS_PATH, "combined_iaso_data_raw.parquet")
+    if not os.path.exists(combined_file_path) or not os.path.exists(
+        COMBINE_MANIFEST_PATH
+    ):
+        return True
+
     try:
-        # Collecting all feather files in the extraction folder
-        for file in os.listdir(IASO_EXTRACTION_PATH):
-            if file.endswith(".feather") and not file.startswith("~$"):
-                current_run.log_info(f"Lecture du fichier : {file}")
-                file_path = os.path.join(IASO_EXTRACTION_PATH, file)
-                df = pd.read_feather(file_path)
-
-                if not df.empty:
-                    dataframes_list.append(df)
-                else:
-                    current_run.log_warning(f"Fichier ignoré : {file}")
-                    continue
-
-        # Combining all dataframes into one
-        if not dataframes_list:
+        with open(COMBINE_MANIFEST_PATH, "r") as f:
+            previous_manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        current_run.log_warning(
+            f"Manifeste de combinaison illisible, recombinaison complète : {str(e)}"
+        )
+        return True
+
+    return previous_manifest != manifest
+
+
+def save_combine_manifest(manifest: dict) -> None:
+    """
+    Save the manifest of the partitions used to build 'combined_iaso_data_raw.parquet'.
+
+    Args:
+        manifest (dict): The manifest of the partitions.
+
+    Returns:
+        None
+    """
+    tmp_path = f"{COMBINE_MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, COMBINE_MANIFEST_PATH)
+
+
+def unify_partition_schemas(tables: list) -> pa.Schema:
+    """
+    Build a single schema for all the partitions. A column keeps its type when it is the same
+    in every partition (columns entirely null in a partition are ignored), numeric types are
+    promoted to float64 and any other conflict falls back to string.
+
+    Args:
+        tables (list): The pyarrow tables read from the partitions.
+
+    Returns:
+        pa.Schema: The unified schema.
+    """
+    column_types = {}
+    for table in tables:
+        for field in table.schema:
+            types = column_types.setdefault(field.name, set())
+            if not pa.types.is_null(field.type):
+                types.add(field.type)
+
+    fields = []
+    for name, types in column_types.items():
+        if not types:
+            unified_type = pa.null()
+        elif len(types) == 1:
+            unified_type = next(iter(types))
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            unified_type = pa.float64()
+        else:
+            unified_type = pa.string()
+        fields.append(pa.field(name, unified_type))
+
+    return pa.schema(fields)
+
+
+def conform_partition(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Cast a partition to the unified schema, adding the columns it does not have as nulls.
+
+    Args:
+        table (pa.Table): The partition.
+        schema (pa.Schema): The unified schema.
+
+    Returns:
+        pa.Table: The partition with the unified schema.
+    """
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def process_historical_and_current_data(expected_columns: list) -> pd.DataFrame:
+    """
+    Combine all the historical and current month data extracted from IASO,
+    handling duplicates and ensuring alignment with the expected form structure.
+
+    The partitions are read in parallel as Arrow tables, cast to a unified schema and
+    concatenated without going through pandas, so that columns never get upcast to object.
+
+    Args:
+        expected_columns (list): The column names expected from the form structure.
+
+    Returns:
+        pd.DataFrame: Combined DataFrame containing all the extracted data from IASO.
+    """
+    current_run.log_info("Combinaison des données historiques et du mois en cours...")
+
+    files = list_partition_files()
+    try:
+        current_run.log_info(f"Lecture de {len(files)} fichiers Feather...")
+        file_paths = [os.path.join(IASO_EXTRACTION_PATH, file) for file in files]
+        with ThreadPoolExecutor(max_workers=iaso_combine_max_workers) as executor:
+            tables = list(executor.map(feather.read_table, file_paths))
+
+        tables_list = []
+        for file, table in zip(files, tables):
+            if table.num_rows > 0:
+                tables_list.append(table)
+            else:
+                current_run.log_warning(f"Fichier ignoré : {file}")
+
+        # Combining all partitions into one
+        if not tables_list:
             current_run.log_warning(
                 "Aucune donnée trouvée dans les fichiers Feather. Un dataframe vide sera retourné."
             )
             return pd.DataFrame()
 
-        combined_df = pd.concat(dataframes_list, ignore_index=True)
-
-        # Checking for duplicates based on 'uuid' column and keeping the first occurrence
-        if "uuid" in combined_df.columns:
-            duplicates = combined_df.duplicated(subset=["uuid"], keep="first")
-            duplicates_count = duplicates.sum()
-
-            if duplicates_count > 0:
-                total = len(combined_df)
-                current_run.log_warning(
-                    f"{duplicates_count} doublons détectés ({duplicates_count / total:.2%}). "
-                    "Suppression en gardant la première occurrence."
-                )
-                combined_df = combined_df[~duplicates].reset_index(drop=True)
-        else:
+        schema = unify_partition_schemas(tables_list)
+        if "uuid" not in schema.names:
             msg = "La colonne 'uuid' est absente. Impossible de dédoublonner."
             current_run.log_error(msg)
             raise KeyError(msg)
 
-        # Making sure the combined dataframe has all the expected columns based on the form structure
-        iaso_connector_instance = IASOConnectionHandler(iaso_connector_slug)
-        iaso_connector_instance.get_data_structure_from_the_form(iaso_form_id)
-        expected_columns = iaso_connector_instance.form_data_structure_df.name.unique()
+        combined_table = pa.concat_tables(
+            [conform_partition(table, schema) for table in tables_list]
+        )
 
+        # Checking for duplicates based on a hash index of the 'uuid' column and keeping the first occurrence
+        uuid_index = pd.Index(combined_table.column("uuid").to_pandas())
+        duplicates = uuid_index.duplicated(keep="first")
+        duplicates_count = int(duplicates.sum())
+        if duplicates_count > 0:
+            total = combined_table.num_rows
+            current_run.log_warning(
+                f"{duplicates_count} doublons détectés ({duplicates_count / total:.2%}). "
+                "Suppression en gardant la première occurrence."
+            )
+            combined_table = combined_table.filter(pa.array(~duplicates))
+
+        combined_df = combined_table.to_pandas()
+
+        # Making sure the combined dataframe has all the expected columns based on the form structure
         missing_cols = [
             col for col in expected_columns if col not in combined_df.columns
         ]
@@ -1,10 +1,17 @@
 import io
+import os
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from openhexa.sdk import current_run
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
 import requests
 import json
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Iterator, List
+from iaso_session import IASOSession
 
 
 def request_explanatory_decorator(function):
@@ -21,7 +28,10 @@ def request_explanatory_decorator(function):
     """
 
     def wrapper_request(
-        url: str, headers: dict, process_message: str
+        url: str,
+        headers: dict,
+        process_message: str,
+        session: requests.Session | None = None,
     ) -> requests.Response | None:
         """
         Wrapper function to handle API requests and provide detailed error messages.
@@ -30,12 +40,13 @@ def request_explanatory_decorator(function):
             url (str): The URL to send the request to.
             headers (dict): The headers to include in the request.
             process_message (str): A message describing the process for error context.
+            session (requests.Session, optional): The session used to send the request. Defaults to None.
 
         Returns:
             requests.Response | None: The response object from the GET request, or None if an error occurred.
         """
         try:
-            r = function(url, headers)
+            r = function(url, headers, session)
             r.raise_for_status()
             if not r.text:
                 print("ERROR: Empty response body")
@@ -63,64 +74,141 @@ def request_explanatory_decorator(function):
 
 
 @request_explanatory_decorator
-def request_with_explanation(url: str, headers: dict):
+def request_with_explanation(
+    url: str, headers: dict, session: requests.Session | None = None
+):
     """
     Sends a GET request to the specified URL with the provided headers.
 
     Parameters:
         url (str): The URL to send the request to.
         headers (dict): The headers to include in the request.
+        session (requests.Session, optional): The session used to send the request.
+                                              Defaults to None (no connection reuse).
 
     Returns:
         requests.Response: The response object from the GET request.
     """
-    return requests.get(url, headers=headers)
+    return (session or requests).get(url, headers=headers)
 
 
-def period_form_convert_date(row: pd.Series) -> str:
+def period_processing(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Converts various date formats to a standardized 'YYYY-MM-DD' format.
+    Processes the 'period' column in the DataFrame to standardize date formats to 'YYYY-MM-DD'.
+
+    The values are classified by format and each class is converted with a single call:
+        - missing or 'Invalid date' periods are replaced by the submission creation date
+        - 8-digit periods are read as 'YYYYMMDD'
+        - other periods of at least 8 characters are read as 'YYYY-MM-DD'
+        - shorter periods are replaced by the submission creation date when available
 
     Parameters:
-        row (pd.Series): A pandas Series containing date information.
+        df (pd.DataFrame): The input DataFrame containing a 'period' column.
 
     Returns:
-        str: The converted date in 'YYYY-MM-DD' string format or the original value if conversion fails.
+        df (pd.DataFrame): The DataFrame with the processed 'period' column.
     """
-    val_0 = row.iloc[0]
+    created_at_str = pd.to_datetime(df.created_at, unit="s").dt.strftime("%Y-%m-%d")
+    period = df.period.mask(df.period == "Invalid date", None)
+    period = period.mask(period.isna(), created_at_str).astype(object)
+
+    period_str = period.astype(str)
+    period_len = period_str.str.len()
+    is_compact_date = (period_len == 8) & period_str.str.isdigit()
+    is_iso_date = ~is_compact_date & (period_len >= 8)
+    is_short_value = (
+        ~is_compact_date & ~is_iso_date & (df.created_at.astype(str).str.len() >= 8)
+    )
 
-    if len(str(val_0)) == 8 and str(val_0).isdigit():
-        return pd.to_datetime(val_0, format="%Y%m%d").strftime("%Y-%m-%d")
-    elif len(str(val_0)) >= 8:
-        return pd.to_datetime(val_0, format="%Y-%m-%d").strftime("%Y-%m-%d")
-    elif len(str(row.iloc[1])) >= 8:
-        return pd.to_datetime(row.iloc[1], unit="s").strftime("%Y-%m-%d")
-    else:
-        return val_0
+    if is_compact_date.any():
+        period[is_compact_date] = pd.to_datetime(
+            period_str[is_compact_date], format="%Y%m%d"
+        ).dt.strftime("%Y-%m-%d")
+    if is_iso_date.any():
+        period[is_iso_date] = pd.to_datetime(
+            period_str[is_iso_date], format="%Y-%m-%d"
+        ).dt.strftime("%Y-%m-%d")
+    period[is_short_value] = created_at_str[is_short_value]
+
+    df.period = period
+    return df
 
 
-def period_processing(df: pd.DataFrame) -> pd.DataFrame:
+def conform_to_arrow_schema(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
     """
-    Processes the 'period' column in the DataFrame to standardize date formats.
+    Converts formatted submissions to an Arrow table with the given schema, adding the
+    missing columns as nulls.
 
     Parameters:
-        df (pd.DataFrame): The input DataFrame containing a 'period' column.
+        df (pd.DataFrame): The formatted submissions.
+        schema (pa.Schema): The target schema.
 
     Returns:
-        df (pd.DataFrame): The DataFrame with the processed 'period' column.
+        pa.Table: The submissions as an Arrow table.
     """
-    df.period = df.period.mask(df.period == "Invalid date", None)
-    df.period = df.period.mask(
-        df.period.isna(),
-        df.created_at.apply(lambda x: pd.to_datetime(x, unit="s").strftime("%Y-%m-%d")),
-    )
-    df.period = df.period.mask(
-        df.period.notna(),
-        df[["period", "created_at"]].apply(
-            lambda row: period_form_convert_date(row), axis=1
-        ),
-    )
-    return df
+    arrays = []
+    for field in schema:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), type=field.type))
+            continue
+
+        col = df[field.name]
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            col = col.where(col.isna(), col.astype(str))
+        elif pa.types.is_integer(field.type):
+            col = pd.to_numeric(col, errors="coerce").astype("Int64")
+        elif pa.types.is_floating(field.type):
+            col = pd.to_numeric(col, errors="coerce")
+        arrays.append(pa.array(col, type=field.type, from_pandas=True))
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket limiting the number of requests sent to the IASO API per second.
+    """
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        """
+        Initializes the rate limiter.
+
+        Parameters:
+            rate (float): The number of tokens added to the bucket per second. A rate <= 0 disables the limiter.
+            capacity (int, optional): The maximum number of tokens the bucket can hold, i.e. the allowed burst.
+                                      Defaults to the rate rounded down (at least 1).
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token is available and consumes it.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last_refill) * self.rate
+                )
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
 
 
 class Conector_from_Dict:
@@ -146,26 +234,63 @@ class IASOConnectionHandler:
 
     Parameters:
         iaso_connector_slug (Dict[str, Any]): A dictionary containing 'username', 'password', and 'url' keys.
+        page_size (int, optional): The number of submissions requested per page. Defaults to 50.
+        max_concurrent_requests (int, optional): The maximum number of pages fetched in parallel. Defaults to 1.
+        requests_per_second (float, optional): The maximum number of requests sent per second. Defaults to 2.
+        schema_cache_dir (str, optional): The folder where the parsed form structures are cached. Defaults to None.
+        max_parallel_extractions (int, optional): The maximum number of extractions run at the same time with
+                                                  the handler (e.g. months backfilled in parallel). Defaults to 1.
 
     """
 
-    def __init__(self, iaso_connector_slug: Dict[str, Any]):
+    # parsed form structures shared by all the handlers, keyed by (form id, form version id)
+    _form_structure_cache: Dict[Tuple[int, int], pd.DataFrame] = {}
+    _form_structure_cache_lock = threading.Lock()
+
+    def __init__(
+        self,
+        iaso_connector_slug: Dict[str, Any],
+        page_size: int = 50,
+        max_concurrent_requests: int = 1,
+        requests_per_second: float = 2.0,
+        schema_cache_dir: str | None = None,
+        max_parallel_extractions: int = 1,
+    ):
         """
         Initializes the IASO connection handler with the provided connector details.
 
         Parameters:
             iaso_connector_slug (Dict[str, Any]): A dictionary containing 'username', 'password', and 'url' keys.
+            page_size (int, optional): The number of submissions requested per page. Defaults to 50.
+            max_concurrent_requests (int, optional): The maximum number of pages fetched in parallel. Defaults to 1.
+            requests_per_second (float, optional): The maximum number of requests sent per second. Defaults to 2.
+            schema_cache_dir (str, optional): The folder where the parsed form structures are cached. Defaults to None.
+            max_parallel_extractions (int, optional): The maximum number of extractions run at the same time with
+                                                      the handler (e.g. months backfilled in parallel). Defaults to 1.
         """
         self.iaso_connector = Conector_from_Dict(iaso_connector_slug)
+        self.page_size = page_size
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self.session = IASOSession(
+            self.iaso_connector.url,
+            self.iaso_connector.username,
+            self.iaso_connector.password,
+            # each parallel extraction fetches up to 'max_concurrent_requests' pages at once
+            pool_maxsize=max(
+                10, max(1, max_parallel_extractions) * self.max_concurrent_requests
+            ),
+        )
         self.headers = self.connection()
-        self.session = requests.Session()
+        self.rate_limiter = TokenBucketRateLimiter(requests_per_second)
+        self.schema_cache_dir = schema_cache_dir
+        self.form_version_id = None
         self.instance_info_cols = [
             "uuid",
             "form_id",
-            "form_name",
             "org_unit_id",
             "org_unit_updated_at",
             "created_at",
+            "updated_at",
             "period",
             "status",
         ]
@@ -180,13 +305,7 @@ class IASOConnectionHandler:
         Returns:
             headers (Dict[str, Any]): A dictionary containing the authentication headers.
         """
-        creds = {
-            "username": self.iaso_connector.username,
-            "password": self.iaso_connector.password,
-        }
-        r = requests.post(f"{self.iaso_connector.url}/api/token/", json=creds)
-        token = r.json().get("access")
-        headers = {"Authorization": "Bearer %s" % token}
+        headers = self.session.authenticate()
         return headers
 
     def _get_form_metadata(self, form_id: int) -> Dict[str, Any]:
@@ -209,7 +328,7 @@ class IASOConnectionHandler:
             "latest_form_version",
         ]
         url = f"{self.iaso_connector.url}/api/forms/{form_id}/?fields={','.join(fields_scope_list)}"
-        r = requests.get(url, headers=self.headers)
+        r = self.session.get(url)
         form_metadata_dict = json.loads(r.content)
         return form_metadata_dict
 
@@ -226,7 +345,7 @@ class IASOConnectionHandler:
             form_df_raw_tuple (Tuple[pd.DataFrame, pd.DataFrame]): A tuple containing the survey and choices DataFrames.
         """
         try:
-            r = requests.get(url)
+            r = self.session.get(url)
             assert r.status_code == 200
             content = io.BytesIO(r.content)
             form_survey = pd.read_excel(content, sheet_name="survey")
@@ -309,23 +428,138 @@ class IASOConnectionHandler:
                     choices_label_dict
                 )
 
-        self.form_data_structure_df = survey_tab_df
-        self.form_content_form_structure_base_columns_list = survey_tab_df.name.unique()
+        self._set_form_data_structure(survey_tab_df)
+
+    def _set_form_data_structure(self, form_data_structure_df: pd.DataFrame) -> None:
+        """
+        Stores the form data structure and the list of its base column names.
+
+        Parameters:
+            form_data_structure_df (pd.DataFrame): The processed form data structure.
+
+        Returns:
+            None: Updates the instance attributes in-place.
+        """
+        self.form_data_structure_df = form_data_structure_df
+        self.form_content_form_structure_base_columns_list = (
+            form_data_structure_df.name.unique()
+        )
+
+    def _get_form_structure_cache_path(self, form_id: int, version_id: int) -> str:
+        """
+        Builds the path of the on-disk cache file of a form version structure.
+
+        Parameters:
+            form_id (int): The ID of the form.
+            version_id (int): The ID of the form version.
+
+        Returns:
+            str: The path of the cache file.
+        """
+        return os.path.join(
+            self.schema_cache_dir, f"form_{form_id}_version_{version_id}_structure.pkl"
+        )
+
+    def _load_cached_form_structure(
+        self, form_id: int, version_id: int
+    ) -> pd.DataFrame | None:
+        """
+        Retrieves the structure of a form version from the in-memory cache, or from the
+        on-disk cache when a cache folder is configured.
+
+        Parameters:
+            form_id (int): The ID of the form.
+            version_id (int): The ID of the form version.
+
+        Returns:
+            pd.DataFrame | None: The cached form structure, or None if it is not cached.
+        """
+        cache_key = (form_id, version_id)
+        with self._form_structure_cache_lock:
+            if cache_key in self._form_structure_cache:
+                return self._form_structure_cache[cache_key]
+
+        if self.schema_cache_dir is None:
+            return None
+
+        cache_path = self._get_form_structure_cache_path(form_id, version_id)
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            form_data_structure_df = pd.read_pickle(cache_path)
+        except Exception as e:
+            current_run.log_warning(
+                f"Cache de la structure du formulaire illisible ({cache_path}) : {e}"
+            )
+            return None
+
+        with self._form_structure_cache_lock:
+            self._form_structure_cache[cache_key] = form_data_structure_df
+        return form_data_structure_df
+
+    def _save_cached_form_structure(
+        self, form_id: int, version_id: int, form_data_structure_df: pd.DataFrame
+    ) -> None:
+        """
+        Stores the structure of a form version in the in-memory cache, and in the on-disk
+        cache when a cache folder is configured.
+
+        Parameters:
+            form_id (int): The ID of the form.
+            version_id (int): The ID of the form version.
+            form_data_structure_df (pd.DataFrame): The processed form data structure.
+
+        Returns:
+            None
+        """
+        with self._form_structure_cache_lock:
+            self._form_structure_cache[(form_id, version_id)] = form_data_structure_df
+
+        if self.schema_cache_dir is None:
+            return
+
+        try:
+            os.makedirs(self.schema_cache_dir, exist_ok=True)
+            form_data_structure_df.to_pickle(
+                self._get_form_structure_cache_path(form_id, version_id)
+            )
+        except Exception as e:
+            current_run.log_warning(
+                f"Impossible d'enregistrer la structure du formulaire en cache : {e}"
+            )
 
     def get_data_structure_from_the_form(self, form_id: int) -> None:
         """
         Retrieves the data structure from the form specified by form_id.
 
+        The XLSForm is only downloaded and parsed when its latest version is not found in the
+        cache, i.e. when the form version has changed since the structure was last cached.
+
         Parameters:
             form_id (int): The ID of the form to retrieve data from.
 
         Returns:
             None: Updates the instance attributes in-place with the form data structure.
         """
-        excel_url = self._get_form_metadata(form_id)["latest_form_version"]["xls_file"]
-        self._get_data_structure_from_form_tuple(
-            self._get_form_dataframe_tuple_from_url(excel_url)
-        )
+        latest_form_version = self._get_form_metadata(form_id)["latest_form_version"]
+        version_id = latest_form_version["id"]
+
+        form_data_structure_df = self._load_cached_form_structure(form_id, version_id)
+        if form_data_structure_df is not None:
+            self._set_form_data_structure(form_data_structure_df)
+        else:
+            current_run.log_info(
+                f"Téléchargement de la structure du formulaire {form_id} (version {version_id})..."
+            )
+            self._get_data_structure_from_form_tuple(
+                self._get_form_dataframe_tuple_from_url(latest_form_version["xls_file"])
+            )
+            self._save_cached_form_structure(
+                form_id, version_id, self.form_data_structure_df
+            )
+
+        self.form_version_id = version_id
 
     def get_cols_from_the_form(self, type_filter: str | None = None) -> zip:
         """
@@ -352,34 +586,25 @@ class IASOConnectionHandler:
 
         return col_info_zip
 
-    def _json_iaso_instance_info_extractor(
-        self, instance_json: Dict[str, Any]
+    def _json_iaso_instances_info_extractor(
+        self, instances_json: List[Dict[str, Any]]
     ) -> pd.DataFrame:
         """
-        Extracts instance information from the provided JSON data.
+        Extracts instance information from a list of instances JSON data in a single pass.
 
         Parameters:
-            instance_json (Dict[str, Any]): The JSON data containing instance information.
+            instances_json (List[Dict[str, Any]]): The JSON data of the instances of a page.
 
         Returns:
             instance_full_df (pd.DataFrame): A dataframe containing the extracted instance information.
         """
-        self.instance_info_cols = [
-            "uuid",
-            "form_id",
-            "org_unit_id",
-            "org_unit_updated_at",
-            "created_at",
-            "period",
-            "status",
-        ]
-        instance_normalized_df = pd.json_normalize(instance_json, sep="_")
+        instance_normalized_df = pd.json_normalize(instances_json, sep="_")
+        form_cols = set(self.form_content_form_structure_base_columns_list)
         full_cols_sub = [
             _
             for _ in instance_normalized_df.columns
             if _ in self.instance_info_cols
-            or _.replace("file_content_", "")
-            in self.form_content_form_structure_base_columns_list
+            or _.replace("file_content_", "") in form_cols
         ]
         instance_full_df = instance_normalized_df[full_cols_sub]
 
@@ -395,16 +620,13 @@ class IASOConnectionHandler:
         Returns:
             instance_full_df (pd.DataFrame): A dataframe containing the extracted instance information.
         """
-        instance_full_df = [
-            self._json_iaso_instance_info_extractor(instance_json)
-            for instance_json in json_query_answer["instances"]
-        ]
-
-        if not instance_full_df:
+        if not json_query_answer["instances"]:
             return pd.DataFrame(columns=self.instance_info_cols)
 
         try:
-            instance_full_df = pd.concat(instance_full_df, ignore_index=True)
+            instance_full_df = self._json_iaso_instances_info_extractor(
+                json_query_answer["instances"]
+            )
             instance_full_df = instance_full_df.drop_duplicates(subset="uuid")
             instance_full_df.columns = [
                 col.replace("file_content_", "") for col in instance_full_df.columns
@@ -412,29 +634,34 @@ class IASOConnectionHandler:
             return instance_full_df
 
         except Exception as e:
-            current_run.log_error(f"Erreur lors de la concaténation des données : {e}")
+            current_run.log_error(f"Erreur lors de l'extraction des données : {e}")
             raise
 
-        return instance_full_df
-
-    def _json_request_extract(
+    def _iter_submission_pages(
         self,
         form_id: int,
         limit_batch: int = 50,
         dateFrom: str = None,
         dateTo: str = None,
-    ) -> pd.DataFrame:
+        modificationDateFrom: str = None,
+    ) -> Iterator[pd.DataFrame]:
         """
-        Extracts JSON data from IASO API for a specific form ID with pagination support.
+        Iterates over the pages of submissions of a specific form ID, in page order.
+
+        The first page is requested alone to read the total number of pages, the remaining
+        pages are then fetched in parallel (up to 'max_concurrent_requests' in flight, throttled
+        by the rate limiter). At most twice as many pages as concurrent requests are held in
+        memory waiting to be consumed.
 
         Parameters:
             form_id (int): The ID of the form to extract data for.
             limit_batch (int, optional): The number of records to fetch per batch. Defaults to 50.
             dateFrom (str, optional): The start date for filtering records. Defaults to None.
             dateTo (str, optional): The end date for filtering records. Defaults to None.
+            modificationDateFrom (str, optional): Only keep records modified since this date. Defaults to None.
 
         Returns:
-            form_full_df (pd.DataFrame): A dataframe containing the extracted JSON data.
+            Iterator[pd.DataFrame]: The dataframes of extracted submissions, one per page.
         """
         instances_endpoint = f"{self.iaso_connector.url}/api/instances/"
         form_endpoint = instances_endpoint + f"?form_ids={form_id}"
@@ -444,31 +671,79 @@ class IASOConnectionHandler:
             base_full_endpoint = base_full_endpoint + f"&dateFrom={dateFrom}"
         if dateTo:
             base_full_endpoint = base_full_endpoint + f"&dateTo={dateTo}"
+        if modificationDateFrom:
+            base_full_endpoint = (
+                base_full_endpoint + f"&modificationDateFrom={modificationDateFrom}"
+            )
 
+        self.rate_limiter.acquire()
         r = request_with_explanation(
             base_full_endpoint,
             self.headers,
             f"Form {form_id} Submission Request Page 1",
+            self.session,
         )
 
         json_extract = r.json()
         total_pages = json_extract["pages"]
-        print(total_pages)
+        current_run.log_info(
+            f"Formulaire {form_id} : {total_pages} page(s) de soumissions à extraire."
+        )
 
         instance_full_df = self._json_iaso_crawler(json_extract)
+        yield instance_full_df
         if instance_full_df.empty:
-            return instance_full_df
+            return
 
-        form_full_df = [instance_full_df]
-
-        for page_id in range(2, total_pages + 1):
-            time.sleep(0.5)
+        def fetch_page(page_id: int) -> pd.DataFrame:
+            self.rate_limiter.acquire()
             r = request_with_explanation(
                 base_full_endpoint + f"&page={page_id}",
                 self.headers,
                 f"Form {form_id} Submission Request Page {page_id}",
+                self.session,
+            )
+            return self._json_iaso_crawler(r.json())
+
+        # pages are yielded in order, whatever the completion order of the requests
+        max_pending_pages = 2 * self.max_concurrent_requests
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            pending_pages = deque()
+            for page_id in range(2, total_pages + 1):
+                pending_pages.append(executor.submit(fetch_page, page_id))
+                if len(pending_pages) >= max_pending_pages:
+                    yield pending_pages.popleft().result()
+            while pending_pages:
+                yield pending_pages.popleft().result()
+
+    def _json_request_extract(
+        self,
+        form_id: int,
+        limit_batch: int = 50,
+        dateFrom: str = None,
+        dateTo: str = None,
+        modificationDateFrom: str = None,
+    ) -> pd.DataFrame:
+        """
+        Extracts JSON data from IASO API for a specific form ID with pagination support.
+
+        Parameters:
+            form_id (int): The ID of the form to extract data for.
+            limit_batch (int, optional): The number of records to fetch per batch. Defaults to 50.
+            dateFrom (str, optional): The start date for filtering records. Defaults to None.
+            dateTo (str, optional): The end date for filtering records. Defaults to None.
+            modificationDateFrom (str, optional): Only keep records modified since this date. Defaults to None.
+
+        Returns:
+            form_full_df (pd.DataFrame): A dataframe containing the extracted JSON data.
+        """
+        form_full_df = list(
+            self._iter_submission_pages(
+                form_id, limit_batch, dateFrom, dateTo, modificationDateFrom
             )
-            form_full_df.append(self._json_iaso_crawler(r.json()))
+        )
+        if form_full_df[0].empty:
+            return form_full_df[0]
 
         form_full_df = pd.concat(form_full_df, ignore_index=True)
         form_full_df = form_full_df.drop_duplicates(subset="uuid")
@@ -498,7 +773,11 @@ class IASOConnectionHandler:
         return df
 
     def extract_submissions_info(
-        self, form_id: int, dateFrom: str = None, dateTo: str = None
+        self,
+        form_id: int,
+        dateFrom: str = None,
+        dateTo: str = None,
+        modificationDateFrom: str = None,
     ) -> pd.DataFrame:
         """
         Extracts and formats submission information for a specific form ID.
@@ -507,14 +786,126 @@ class IASOConnectionHandler:
             form_id (int): The ID of the form to extract submissions for.
             dateFrom (str, optional): The start date for filtering records. Defaults to None.
             dateTo (str, optional): The end date for filtering records. Defaults to None.
+            modificationDateFrom (str, optional): Only keep records modified since this date. Defaults to None.
 
         Returns:
             instance_full_df (pd.DataFrame): The formatted submission dataframe.
         """
         self.get_data_structure_from_the_form(form_id)
-        instance_full_df = self._json_request_extract(form_id, 50, dateFrom, dateTo)
+        instance_full_df = self._json_request_extract(
+            form_id, self.page_size, dateFrom, dateTo, modificationDateFrom
+        )
         if instance_full_df.empty:
             return instance_full_df
         else:
             instance_full_df = self._submmission_df_formatting(instance_full_df)
             return instance_full_df
+
+    def _get_submissions_arrow_schema(self) -> pa.Schema:
+        """
+        Builds the fixed Arrow schema of the formatted submissions: the instance information
+        columns followed by every column of the form structure (integer questions as floats,
+        other questions as strings).
+
+        Parameters:
+            None
+
+        Returns:
+            pa.Schema: The schema of the formatted submissions.
+        """
+        instance_info_types = {
+            "uuid": pa.string(),
+            "form_id": pa.int64(),
+            "org_unit_id": pa.int64(),
+            "org_unit_updated_at": pa.float64(),
+            "created_at": pa.float64(),
+            "updated_at": pa.float64(),
+            "period": pa.string(),
+            "status": pa.string(),
+        }
+        fields = [
+            pa.field(col, instance_info_types.get(col, pa.string()))
+            for col in self.instance_info_cols
+        ]
+        integer_cols = {
+            col_info[0] for col_info in self.get_cols_from_the_form("integer")
+        }
+        fields.extend(
+            pa.field(col, pa.float64() if col in integer_cols else pa.string())
+            for col in self.form_content_form_structure_base_columns_list
+            if col not in self.instance_info_cols
+        )
+        return pa.schema(fields)
+
+    def extract_submissions_to_file(
+        self,
+        form_id: int,
+        file_path: str,
+        dateFrom: str = None,
+        dateTo: str = None,
+        load_form_structure: bool = True,
+    ) -> int:
+        """
+        Extracts, formats and writes the submissions of a specific form ID to a feather file,
+        streaming each page to disk as soon as it is extracted so that memory use stays
+        bounded to a few pages whatever the number of submissions.
+
+        Each page is deduplicated on 'uuid' (first occurrence kept, across all the pages already
+        written) and appended as record batches to a temporary feather file, which then replaces
+        the feather file. The feather file is only replaced if at least one submission was extracted.
+
+        Parameters:
+            form_id (int): The ID of the form to extract submissions for.
+            file_path (str): The path of the feather file to write.
+            dateFrom (str, optional): The start date for filtering records. Defaults to None.
+            dateTo (str, optional): The end date for filtering records. Defaults to None.
+            load_form_structure (bool, optional): Whether to (re)load the form structure first. Set it to False
+                                                  when the structure was loaded beforehand, e.g. before running
+                                                  several extractions in parallel. Defaults to True.
+
+        Returns:
+            int: The number of submissions written to the feather file.
+        """
+        if load_form_structure:
+            self.get_data_structure_from_the_form(form_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = f"{file_path}.tmp"
+        # feather v2 files are Arrow IPC files, compressed like feather.write_feather does
+        write_options = pa.ipc.IpcWriteOptions(
+            compression="lz4" if pa.Codec.is_available("lz4") else None
+        )
+
+        try:
+            writer = None
+            schema = None
+            seen_uuids = set()
+            row_count = 0
+            with pa.OSFile(tmp_file_path, "wb") as sink:
+                for page_df in self._iter_submission_pages(
+                    form_id, self.page_size, dateFrom, dateTo
+                ):
+                    if page_df.empty:
+                        continue
+                    page_df = self._submmission_df_formatting(page_df)
+                    uuids = page_df["uuid"]
+                    page_df = page_df[
+                        ~uuids.duplicated(keep="first") & ~uuids.isin(seen_uuids)
+                    ]
+                    if page_df.empty:
+                        continue
+                    seen_uuids.update(page_df["uuid"])
+                    if writer is None:
+                        schema = self._get_submissions_arrow_schema()
+                        writer = pa.ipc.new_file(sink, schema, options=write_options)
+                    writer.write_table(conform_to_arrow_schema(page_df, schema))
+                    row_count += len(page_df)
+
+                if writer is None:
+                    return 0
+                writer.close()
+
+            os.replace(tmp_file_path, file_path)
+            return row_count
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
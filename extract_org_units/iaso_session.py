@@ -0,0 +1,211 @@
+import base64
+import json
+import threading
+import time
+from openhexa.sdk import current_run
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict
+
+
+class IASOSession(requests.Session):
+    """
+    HTTP session shared by all the calls made to an IASO instance.
+
+    The session keeps pooled keep-alive connections, accepts gzip responses, applies a default
+    timeout, retries with exponential backoff on 429 and 5xx responses and authenticates the
+    requests sent to the IASO API with a JWT that is refreshed transparently when it expires.
+
+    Parameters:
+        url (str): The base URL of the IASO instance.
+        username (str): The IASO username.
+        password (str): The IASO password.
+        timeout (float, optional): The default timeout of the requests, in seconds. Defaults to 120.
+        max_retries (int, optional): The maximum number of retries of a failed request. Defaults to 5.
+        backoff_factor (float, optional): The backoff factor between retries, in seconds. Defaults to 1.
+        pool_maxsize (int, optional): The maximum number of pooled connections. Defaults to 10.
+    """
+
+    # refresh the access token slightly before its expiry to avoid in-flight expirations
+    token_expiry_margin = 60
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        timeout: float = 120,
+        max_retries: int = 5,
+        backoff_factor: float = 1.0,
+        pool_maxsize: int = 10,
+    ):
+        """
+        Initializes the session with its connection pool and retry policy.
+
+        Parameters:
+            url (str): The base URL of the IASO instance.
+            username (str): The IASO username.
+            password (str): The IASO password.
+            timeout (float, optional): The default timeout of the requests, in seconds. Defaults to 120.
+            max_retries (int, optional): The maximum number of retries of a failed request. Defaults to 5.
+            backoff_factor (float, optional): The backoff factor between retries, in seconds. Defaults to 1.
+            pool_maxsize (int, optional): The maximum number of pooled connections. Defaults to 10.
+        """
+        super().__init__()
+        self.base_url = url.rstrip("/")
+        self.timeout = timeout
+        self._credentials = {"username": username, "password": password}
+        self._access_token = None
+        self._refresh_token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+        retry_policy = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry_policy,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+    @staticmethod
+    def _get_token_expiry(token: str) -> float:
+        """
+        Reads the expiry timestamp ('exp' claim) of a JWT without verifying its signature.
+
+        Parameters:
+            token (str): The JWT.
+
+        Returns:
+            float: The expiry as a unix timestamp, or infinity if it cannot be read.
+        """
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except Exception:
+            return float("inf")
+
+    def _store_tokens(self, token_json: Dict[str, str]) -> None:
+        """
+        Stores the tokens returned by the IASO token endpoints.
+
+        Parameters:
+            token_json (Dict[str, str]): The JSON answer containing the 'access' (and optionally 'refresh') token.
+
+        Returns:
+            None
+        """
+        self._access_token = token_json.get("access")
+        self._refresh_token = token_json.get("refresh", self._refresh_token)
+        self._token_expires_at = self._get_token_expiry(self._access_token or "")
+
+    def authenticate(self) -> Dict[str, str]:
+        """
+        Requests a new pair of tokens from the IASO API with the session credentials.
+
+        Parameters:
+            None
+
+        Returns:
+            headers (Dict[str, str]): A dictionary containing the authentication headers.
+        """
+        with self._token_lock:
+            r = super().request(
+                "POST",
+                f"{self.base_url}/api/token/",
+                json=self._credentials,
+                timeout=self.timeout,
+            )
+            r.raise_for_status()
+            self._store_tokens(r.json())
+            return self.auth_headers
+
+    def _refresh_access_token(self, expired_token: str | None) -> None:
+        """
+        Refreshes the access token, unless another thread already did it. Falls back to a
+        new authentication when the refresh token is rejected.
+
+        Parameters:
+            expired_token (str | None): The access token that was found expired.
+
+        Returns:
+            None
+        """
+        with self._token_lock:
+            if self._access_token != expired_token:
+                return
+
+            if self._refresh_token:
+                r = super().request(
+                    "POST",
+                    f"{self.base_url}/api/token/refresh/",
+                    json={"refresh": self._refresh_token},
+                    timeout=self.timeout,
+                )
+                if r.ok:
+                    self._store_tokens(r.json())
+                    return
+
+            current_run.log_info("Renouvellement de l'authentification IASO...")
+            r = super().request(
+                "POST",
+                f"{self.base_url}/api/token/",
+                json=self._credentials,
+                timeout=self.timeout,
+            )
+            r.raise_for_status()
+            self._store_tokens(r.json())
+
+    @property
+    def auth_headers(self) -> Dict[str, str]:
+        """
+        The authentication headers built from the current access token.
+        """
+        return {"Authorization": f"Bearer {self._access_token}"}
+
+    def request(self, method: str, url: str, *args, **kwargs) -> requests.Response:
+        """
+        Sends a request with the default timeout. Requests to the IASO API are sent with the
+        current access token (refreshed when expired or rejected), overriding any
+        'Authorization' header given by the caller.
+
+        Parameters:
+            method (str): The HTTP method.
+            url (str): The URL to send the request to.
+
+        Returns:
+            requests.Response: The response object.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if not url.startswith(self.base_url) or self._access_token is None:
+            return super().request(method, url, *args, **kwargs)
+
+        if time.time() >= self._token_expires_at - self.token_expiry_margin:
+            self._refresh_access_token(self._access_token)
+
+        headers = {
+            key: value
+            for key, value in (kwargs.pop("headers", None) or {}).items()
+            if key.lower() != "authorization"
+        }
+        used_token = self._access_token
+        r = super().request(
+            method, url, *args, headers={**headers, **self.auth_headers}, **kwargs
+        )
+        if r.status_code == 401:
+            self._refresh_access_token(used_token)
+            r = super().request(
+                method, url, *args, headers={**headers, **self.auth_headers}, **kwargs
+            )
+        return r
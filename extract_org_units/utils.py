@@ -4,6 +4,7 @@ import requests, json
 import io
 import datetime
 from typing import Dict, Any, List
+from iaso_session import IASOSession
 
 
 def request_explanatory_decorator(function):
@@ -20,7 +21,10 @@ def request_explanatory_decorator(function):
     """
 
     def wrapper_request(
-        url: str, headers: dict, process_message: str
+        url: str,
+        headers: dict,
+        process_message: str,
+        session: requests.Session | None = None,
     ) -> requests.Response | None:
         """
         Wrapper function to handle API requests and provide detailed error messages.
@@ -29,12 +33,13 @@ def request_explanatory_decorator(function):
             url (str): The URL to send the request to.
             headers (dict): The headers to include in the request.
             process_message (str): A message describing the process for error context.
+            session (requests.Session, optional): The session used to send the request. Defaults to None.
 
         Returns:
             requests.Response | None: The response object from the GET request, or None if an error occurred.
         """
         try:
-            r = function(url, headers)
+            r = function(url, headers, session)
             r.raise_for_status()
             if not r.text:
                 print("ERROR: Empty response body")
@@ -62,18 +67,22 @@ def request_explanatory_decorator(function):
 
 
 @request_explanatory_decorator
-def request_with_explanation(url: str, headers: dict):
+def request_with_explanation(
+    url: str, headers: dict, session: requests.Session | None = None
+):
     """
     Sends a GET request to the specified URL with the provided headers.
 
     Parameters:
         url (str): The URL to send the request to.
         headers (dict): The headers to include in the request.
+        session (requests.Session, optional): The session used to send the request.
+                                              Defaults to None (no connection reuse).
 
     Returns:
         requests.Response: The response object from the GET request.
     """
-    return requests.get(url, headers=headers)
+    return (session or requests).get(url, headers=headers)
 
 
 class Conector_from_Dict:
@@ -110,8 +119,12 @@ class IASOConnectionHandler:
             iaso_connector_slug (Dict[str, Any]): A dictionary containing 'username', 'password', and 'url' keys.
         """
         self.iaso_connector = Conector_from_Dict(iaso_connector_slug)
+        self.session = IASOSession(
+            self.iaso_connector.url,
+            self.iaso_connector.username,
+            self.iaso_connector.password,
+        )
         self.headers = self.connection()
-        self.session = requests.Session()
         self.instance_info_cols = [
             "uuid",
             "form_id",
@@ -133,13 +146,7 @@ class IASOConnectionHandler:
         Returns:
             headers (Dict[str, Any]): A dictionary containing the authentication headers.
         """
-        creds = {
-            "username": self.iaso_connector.username,
-            "password": self.iaso_connector.password,
-        }
-        r = requests.post(f"{self.iaso_connector.url}/api/token/", json=creds)
-        token = r.json().get("access")
-        headers = {"Authorization": "Bearer %s" % token}
+        headers = self.session.authenticate()
         return headers
 
     def _get_form_metadata(self, form_id: int) -> Dict[str, Any]:
@@ -163,7 +170,7 @@ class IASOConnectionHandler:
         ]
         url = f"{self.iaso_connector.url}/api/forms/{form_id}/?fields={','.join(fields_scope_list)}"
         current_run.log_info(f"URL for form metadata: {url}")
-        r = requests.get(url, headers=self.headers)
+        r = self.session.get(url)
         form_metadata_dict = json.loads(r.content)
         return form_metadata_dict
 
@@ -190,7 +197,10 @@ class IASOConnectionHandler:
         )  # rajouter filtre sur la dernière version du formulaire
         current_run.log_info(f"URL for org unit tree frame: {url}")
         r = request_with_explanation(
-            url, self.headers, "file recover from IASO Instance for OrgType Info"
+            url,
+            self.headers,
+            "file recover from IASO Instance for OrgType Info",
+            self.session,
         )
         org_df = pd.read_excel(io.BytesIO(r.content), engine="openpyxl")
         return org_df
@@ -210,7 +220,7 @@ class IASOConnectionHandler:
         """
         url_depth = f"{self.iaso_connector.url}/api/v2/orgunittypes/{org_unit_type_id}/?fields=depth"
         org_depth = request_with_explanation(
-            url_depth, self.headers, "OrgType depth Request"
+            url_depth, self.headers, "OrgType depth Request", self.session
         ).json()["depth"]
 
         base_cols = [
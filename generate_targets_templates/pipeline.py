@@ -3,8 +3,8 @@ import os
 import pandas as pd
 from openpyxl.styles import PatternFill
 from openpyxl.utils import get_column_letter
+from shared_utils import load_data
 from config import (
-    OUTPUTS_PATH,
     TEMPLATES_PATH,
     rename_dict,
     age_group_campaign_dict,
@@ -252,36 +252,6 @@ def validate_coherence_of_params(
         raise
 
 
-def load_data(file_name: str) -> pd.DataFrame:
-    """
-    Load data from a parquet file in the OUTPUTS_PATH.
-
-    Args:
-        file_name (str): The name of the file to read from.
-
-    Returns:
-        df (pd.DataFrame): The dataframe containing the file data.
-    """
-    current_run.log_info(f"Importation du fichier {file_name}...")
-    file_to_import = os.path.join(OUTPUTS_PATH, f"{file_name}.parquet")
-
-    if not os.path.exists(file_to_import):
-        msg = f"Le fichier {file_to_import} n'existe pas."
-        current_run.log_error(msg)
-        raise FileNotFoundError(msg)
-
-    try:
-        df = pd.read_parquet(file_to_import)
-        current_run.log_info(
-            f"Données du fichier {file_name} chargées avec succès depuis le fichier {file_to_import}"
-        )
-        return df
-    except Exception as e:
-        msg = f"Erreur lors de la lecture du fichier {file_to_import}: {str(e)}"
-        current_run.log_error(msg)
-        raise
-
-
 def create_template_file(
     org_unit_df: pd.DataFrame,
     campaign: str,
@@ -672,7 +672,7 @@ def match_district_to_org_unit_id(
             ["org_unit_id", "LVL_3_NAME"]
         ].drop_duplicates()
         iaso_org_unit_tree_for_matching = iaso_org_unit_tree_for_matching.groupby(
-            ["LVL_3_NAME"], as_index=False
+            ["LVL_3_NAME"], as_index=False, observed=True
         ).first()
 
         target_df_matched = district_level_target_df.merge(
@@ -958,9 +958,9 @@ def clean_org_unit_id(
             ["LVL_6_UID", "org_unit_id"]
         ].drop_duplicates()
         uid_to_org_id_df_raw = iaso_org_unit_tree_raw_df.copy()
-        uid_to_org_id_df_raw["LVL_6_UID"] = uid_to_org_id_df_raw.groupby("LVL_6_NAME")[
-            "LVL_6_UID"
-        ].transform("first")
+        uid_to_org_id_df_raw["LVL_6_UID"] = uid_to_org_id_df_raw.groupby(
+            "LVL_6_NAME", observed=True
+        )["LVL_6_UID"].transform("first")
         uid_to_org_id_df_raw = uid_to_org_id_df_raw[
             ["LVL_6_UID", "org_unit_id"]
         ].drop_duplicates()
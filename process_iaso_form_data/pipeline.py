@@ -3,6 +3,7 @@ import numpy as np
 from openhexa.sdk import current_run, pipeline
 from shared_utils import (
     load_data,
+    load_expected_structure,
     save_file,
     export_to_dataset,
 )
@@ -34,7 +35,9 @@ def process_iaso_form_data():
     # data imports
     iaso_org_unit_tree_clean = load_data("iaso_org_unit_tree_clean")
     iaso_org_unit_tree_raw = load_data("iaso_org_unit_tree_raw")
-    expected_data_structure = load_data("expected_data_structure")
+    expected_data_structure = load_expected_structure(
+        columns=["produit", "period", "year", "round"]
+    ).materialize(["produit", "period", "year", "round"])
     iaso_raw_df = load_data("combined_iaso_data_raw")
 
     # data processing
@@ -70,7 +73,7 @@ def align_to_clean_org_tree(
     )
     try:
         iaso_org_unit_tree_raw["LVL_6_UID"] = iaso_org_unit_tree_raw.groupby(
-            "LVL_6_NAME"
+            "LVL_6_NAME", observed=True
         )["LVL_6_UID"].transform("first")
 
         uid_to_org_id_dict = iaso_org_unit_tree_clean.set_index("LVL_6_UID").to_dict()[
@@ -137,9 +140,11 @@ def clean_combined_df(
         iaso_processed_df["period"] = pd.to_datetime(iaso_processed_df["period"])
 
         # explode multi-campaign entries
-        iaso_processed_df["choix_campagne"] = iaso_processed_df[
-            "choix_campagne"
-        ].replace(campaign_name_cleaning_dict)
+        iaso_processed_df["choix_campagne"] = (
+            iaso_processed_df["choix_campagne"]
+            .astype(object)
+            .replace(campaign_name_cleaning_dict)
+        )
         iaso_processed_df["choix_campagne"] = iaso_processed_df[
             "choix_campagne"
         ].str.split(" ")
@@ -225,7 +230,9 @@ def clean_combined_df(
                 "period"
             ].dt.year
             invalid_entries_summary = (
-                iaso_processed_invalid_df.groupby(["choix_campagne", "year"])
+                iaso_processed_invalid_df.groupby(
+                    ["choix_campagne", "year"], observed=True
+                )
                 .size()
                 .reset_index(name="count")
             )
@@ -244,7 +251,9 @@ def clean_combined_df(
         # adding the column 'month' identifying the month when each campaign round starts (expressed in str names for better readability)
         # the month corresponds to the month of the very first date in the period column when the data are grouped by choix_campagne, year and round
         iaso_processed_df["month"] = (
-            iaso_processed_df.groupby(["choix_campagne", "year", "round"])["period"]
+            iaso_processed_df.groupby(
+                ["choix_campagne", "year", "round"], observed=True
+            )["period"]
             .transform("min")
             .dt.month.map(months_mapping_dict)
         )
@@ -439,9 +439,9 @@ def clean_org_unit_id(
             ["LVL_6_UID", "org_unit_id"]
         ].drop_duplicates()
         uid_to_org_id_df_raw = iaso_org_unit_tree_raw_df.copy()
-        uid_to_org_id_df_raw["LVL_6_UID"] = uid_to_org_id_df_raw.groupby("LVL_6_NAME")[
-            "LVL_6_UID"
-        ].transform("first")
+        uid_to_org_id_df_raw["LVL_6_UID"] = uid_to_org_id_df_raw.groupby(
+            "LVL_6_NAME", observed=True
+        )["LVL_6_UID"].transform("first")
         uid_to_org_id_df_raw = uid_to_org_id_df_raw[
             ["LVL_6_UID", "org_unit_id"]
         ].drop_duplicates()
@@ -516,7 +516,9 @@ def add_round_info_to_configured_target_data(
             .astype(int)
         )
         max_rounds_historical = (
-            historical_target_df_modified.groupby(["year", "produit"])["round_num"]
+            historical_target_df_modified.groupby(["year", "produit"], observed=True)[
+                "round_num"
+            ]
             .max()
             .reset_index()
         )
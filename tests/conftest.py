@@ -0,0 +1,158 @@
+"""
+Shared fixtures of the pipeline tests.
+
+The pipelines run on an OpenHEXA workspace: the OpenHEXA SDK is replaced by a minimal fake, and
+each pipeline folder is imported on its own (each folder ships its own pipeline, config and
+shared_utils modules, as deployed).
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_MODULES = (
+    "pipeline",
+    "config",
+    "shared_utils",
+    "utils",
+    "iaso_session",
+)
+
+
+class FakeRun:
+    """Fake of openhexa.sdk.current_run, keeping the logged messages."""
+
+    def __init__(self):
+        self.messages = []
+
+    def log_info(self, msg):
+        self.messages.append(("info", msg))
+
+    def log_warning(self, msg):
+        self.messages.append(("warning", msg))
+
+    def log_error(self, msg):
+        self.messages.append(("error", msg))
+
+
+class FakeDatasetVersion:
+    """Fake of an OpenHEXA dataset version, keeping the names of the added files."""
+
+    def __init__(self, name):
+        self.name = name
+        self.files = []
+
+    def add_file(self, file_path, file_name):
+        self.files.append(file_name)
+
+
+class FakeDataset:
+    """Fake of an OpenHEXA dataset."""
+
+    def __init__(self):
+        self.versions = []
+
+    @property
+    def latest_version(self):
+        return self.versions[-1] if self.versions else None
+
+    def create_version(self, name):
+        version = FakeDatasetVersion(name)
+        self.versions.append(version)
+        return version
+
+
+class FakeWorkspace:
+    """Fake of openhexa.sdk.workspace, backed by a local folder and a SQLite database."""
+
+    def __init__(self):
+        self.files_path = REPO_PATH
+        self.database_url = "sqlite://"
+        self.datasets = {}
+
+    def get_dataset(self, slug):
+        return self.datasets[slug]
+
+    def create_dataset(self, name, description=""):
+        dataset = FakeDataset()
+        self.datasets[name.lower().replace("_", "-")] = dataset
+        return dataset
+
+    def get_connection(self, identifier):
+        return types.SimpleNamespace(
+            url="https://iaso.test", username="user", password="password"
+        )
+
+
+def _passthrough_decorator(*args, **kwargs):
+    return lambda function: function
+
+
+sdk = types.ModuleType("openhexa.sdk")
+sdk.current_run = FakeRun()
+sdk.workspace = FakeWorkspace()
+sdk.pipeline = _passthrough_decorator
+sdk.parameter = _passthrough_decorator
+openhexa = types.ModuleType("openhexa")
+openhexa.sdk = sdk
+sys.modules.setdefault("openhexa", openhexa)
+sys.modules.setdefault("openhexa.sdk", sdk)
+
+
+class PipelineModules:
+    """Lazy access to the modules of a pipeline folder, e.g. modules.pipeline."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def __getattr__(self, name):
+        if name not in PIPELINE_MODULES:
+            raise AttributeError(name)
+        return importlib.import_module(name)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """The fake OpenHEXA workspace, with its files in a temporary folder."""
+    sdk.workspace = FakeWorkspace()
+    sdk.workspace.files_path = str(tmp_path)
+    sdk.workspace.database_url = f"sqlite:///{tmp_path / 'db.sqlite'}"
+    sdk.current_run = FakeRun()
+    return sdk.workspace
+
+
+@pytest.fixture
+def current_run(workspace):
+    """The fake OpenHEXA run, holding the messages logged by the pipeline."""
+    return sdk.current_run
+
+
+@pytest.fixture
+def load_pipeline(workspace, monkeypatch):
+    """
+    Return a function importing the modules of a pipeline folder, fresh for each folder (the
+    config modules read the workspace path when they are imported).
+    """
+
+    def clear_modules():
+        for name in PIPELINE_MODULES:
+            sys.modules.pop(name, None)
+
+    def load(folder):
+        clear_modules()
+        other_paths = [
+            path
+            for path in sys.path
+            if not os.path.isfile(os.path.join(path, "pipeline.py"))
+        ]
+        monkeypatch.setattr(
+            sys, "path", [os.path.join(REPO_PATH, folder)] + other_paths
+        )
+        return PipelineModules(folder)
+
+    yield load
+    clear_modules()
@@ -0,0 +1,145 @@
+"""
+Fake of the IASO API, used in place of the IASO session by the extraction tests.
+"""
+
+import io
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import requests
+
+IASO_URL = "https://iaso.test"
+FORM_ID = 1186
+
+
+class FakeResponse:
+    """Minimal requests.Response."""
+
+    def __init__(self, payload=None, content=None, status_code=200):
+        self.status_code = status_code
+        self.content = (
+            content if content is not None else json.dumps(payload).encode("utf-8")
+        )
+        self.text = self.content.decode("utf-8", errors="replace")
+        self.ok = status_code < 400
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+def make_xlsform(questions):
+    """
+    Build the XLSForm of a form with the given questions.
+
+    Args:
+        questions (dict): The type of each question (e.g. {"vpo_0_11_mois": "integer"}).
+
+    Returns:
+        bytes: The content of the XLSForm.
+    """
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame(
+            {"type": list(questions.values()), "name": list(questions)}
+        ).to_excel(writer, sheet_name="survey", index=False)
+        pd.DataFrame(columns=["list_name", "name"]).to_excel(
+            writer, sheet_name="choices", index=False
+        )
+    return buffer.getvalue()
+
+
+def make_instance(uuid, created_at, **answers):
+    """Build the JSON of a submission, as returned by /api/instances/."""
+    return {
+        "uuid": uuid,
+        "form_id": FORM_ID,
+        "org_unit": {"id": 1, "updated_at": created_at},
+        "org_unit_id": 1,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "period": None,
+        "status": "READY",
+        "file_content": {"period": "2024-05-10", **answers},
+    }
+
+
+class FakeIASOServer:
+    """
+    Serves the form metadata, the XLSForm and the pages of submissions of a form, recording
+    the requests and the number of requests handled at the same time.
+    """
+
+    def __init__(self, pages, questions=None, version_id=7, page_delay=0.0):
+        self.pages = pages
+        self.questions = questions or {"vpo_0_11_mois": "integer", "site": "text"}
+        self.version_id = version_id
+        self.page_delay = page_delay
+        self.requests = []
+        self.xlsform_downloads = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, **kwargs):
+        parsed_url = urlparse(url)
+        query = parse_qs(parsed_url.query)
+        with self._lock:
+            self.requests.append(url)
+
+        if parsed_url.path == f"/api/forms/{FORM_ID}/":
+            return FakeResponse(
+                {
+                    "latest_form_version": {
+                        "id": self.version_id,
+                        "xls_file": f"{IASO_URL}/forms/{self.version_id}.xlsx",
+                    }
+                }
+            )
+        if parsed_url.path.startswith("/forms/"):
+            with self._lock:
+                self.xlsform_downloads += 1
+            return FakeResponse(content=make_xlsform(self.questions))
+        if parsed_url.path == "/api/instances/":
+            page_id = int(query.get("page", ["1"])[0])
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                time.sleep(self.page_delay)
+                instances = self.pages[page_id - 1] if self.pages else []
+                return FakeResponse({"pages": len(self.pages), "instances": instances})
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        return FakeResponse({}, status_code=404)
+
+
+def install_fake_session(monkeypatch, utils_module, server):
+    """Replace the IASO session of the connection handlers of a utils module with the fake server."""
+
+    class FakeIASOSession:
+        def __init__(self, url, username, password, **kwargs):
+            self.base_url = url
+            server.session_kwargs = kwargs
+
+        def authenticate(self):
+            return {"Authorization": "Bearer token"}
+
+        def get(self, url, headers=None, **kwargs):
+            return server.get(url, headers=headers, **kwargs)
+
+    monkeypatch.setattr(utils_module, "IASOSession", FakeIASOSession)
+    monkeypatch.setattr(utils_module.IASOConnectionHandler, "_form_structure_cache", {})
+
+
+def make_handler(utils_module, **kwargs):
+    return utils_module.IASOConnectionHandler(
+        {"url": IASO_URL, "username": "user", "password": "password"}, **kwargs
+    )
@@ -0,0 +1,596 @@
+import csv
+import io
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+@pytest.fixture
+def modules(load_pipeline):
+    return load_pipeline("build_visualisation_tables")
+
+
+def make_coverage_rows(campaigns, value=1):
+    """Rows of a partitioned table, with the dimension columns as plain text (object dtype)."""
+    return pd.DataFrame(
+        {
+            "choix_campagne": campaigns,
+            "year": [2025] * len(campaigns),
+            "round": ["round 1"] * len(campaigns),
+            "age": ["0-11 mois"] * len(campaigns),
+            "value": [value] * len(campaigns),
+        }
+    )
+
+
+def test_published_fingerprint_matches_saved_fingerprint(modules):
+    pipeline = modules.pipeline
+    df = make_coverage_rows(["rougeole", "polio"])
+    assert df["choix_campagne"].dtype == object
+
+    pipeline.write_tables_to_db({"ner_vaccination_supervision": df})
+    pipeline.save_file(df, "ner_vaccination_supervision")
+
+    with pipeline.get_db_engine().begin() as connection:
+        published = pipeline.get_published_fingerprints(connection)
+        saved = pipeline.read_fingerprint(
+            pipeline.get_storage_backend(),
+            "ner_vaccination_supervision.parquet.fingerprint",
+        )
+        assert published["ner_vaccination_supervision"] == saved["fingerprint"]
+
+        previous_df = pipeline.load_data("ner_vaccination_supervision")
+        assert pipeline.can_replace_partitions_in_place(
+            sa.inspect(connection),
+            "ner_vaccination_supervision",
+            published["ner_vaccination_supervision"],
+            previous_df,
+            make_coverage_rows(["rougeole"], value=2),
+        )
+
+
+def test_compute_fingerprint_ignores_categorical_storage(modules):
+    shared_utils = modules.shared_utils
+    df = make_coverage_rows(["rougeole", "polio"])
+
+    assert shared_utils.compute_fingerprint(df) == shared_utils.compute_fingerprint(
+        shared_utils.apply_categorical_schema(df)
+    )
+
+
+def publish_initial_run(pipeline, table, reference):
+    pipeline.write_tables_to_db(
+        {"ner_vaccination_supervision": table, "ner_spatial_units": reference}
+    )
+    pipeline.save_file(table, "ner_vaccination_supervision")
+
+
+def read_table(pipeline, table_name):
+    with pipeline.get_db_engine().connect() as connection:
+        return pd.read_sql_table(table_name, connection)
+
+
+def test_write_partitions_to_db_publishes_in_place_and_reference_tables(modules):
+    pipeline = modules.pipeline
+    previous_df = make_coverage_rows(["rougeole", "polio"])
+    publish_initial_run(pipeline, previous_df, pd.DataFrame({"org_unit_id": [1]}))
+
+    new_rows = make_coverage_rows(["rougeole"], value=5)
+    merged_df = pd.concat([previous_df.iloc[[1]], new_rows], ignore_index=True)
+    pipeline.write_partitions_to_db(
+        {"ner_vaccination_supervision": merged_df},
+        {"ner_vaccination_supervision": new_rows},
+        {
+            "ner_vaccination_supervision": pipeline.load_data(
+                "ner_vaccination_supervision"
+            )
+        },
+        ["rougeole|2025|round 1"],
+        {"ner_spatial_units": pd.DataFrame({"org_unit_id": [1, 2]})},
+    )
+
+    published = read_table(pipeline, "ner_vaccination_supervision")
+    assert sorted(zip(published["choix_campagne"], published["value"])) == [
+        ("polio", 1),
+        ("rougeole", 5),
+    ]
+    assert read_table(pipeline, "ner_spatial_units")["org_unit_id"].tolist() == [1, 2]
+    with pipeline.get_db_engine().connect() as connection:
+        fingerprints = pipeline.get_published_fingerprints(connection)
+    assert fingerprints["ner_vaccination_supervision"] == pipeline.compute_fingerprint(
+        merged_df
+    )
+
+
+def test_write_partitions_to_db_is_atomic(modules, monkeypatch):
+    pipeline = modules.pipeline
+    previous_df = make_coverage_rows(["rougeole", "polio"])
+    publish_initial_run(pipeline, previous_df, pd.DataFrame({"org_unit_id": [1]}))
+    with pipeline.get_db_engine().connect() as connection:
+        fingerprints = pipeline.get_published_fingerprints(connection)
+
+    def swap_staged_tables(connection, staged_fingerprints):
+        raise RuntimeError("swap failed")
+
+    monkeypatch.setattr(pipeline, "swap_staged_tables", swap_staged_tables)
+    new_rows = make_coverage_rows(["rougeole"], value=5)
+    with pytest.raises(RuntimeError):
+        pipeline.write_partitions_to_db(
+            {"ner_vaccination_supervision": new_rows},
+            {"ner_vaccination_supervision": new_rows},
+            {
+                "ner_vaccination_supervision": pipeline.load_data(
+                    "ner_vaccination_supervision"
+                )
+            },
+            ["rougeole|2025|round 1"],
+            {"ner_spatial_units": pd.DataFrame({"org_unit_id": [1, 2]})},
+        )
+
+    # the partition update made before the failure is rolled back with the rest
+    published = read_table(pipeline, "ner_vaccination_supervision")
+    assert sorted(zip(published["choix_campagne"], published["value"])) == [
+        ("polio", 1),
+        ("rougeole", 1),
+    ]
+    assert read_table(pipeline, "ner_spatial_units")["org_unit_id"].tolist() == [1]
+    with pipeline.get_db_engine().connect() as connection:
+        assert pipeline.get_published_fingerprints(connection) == fingerprints
+
+
+def test_write_tables_to_db_skips_unchanged_tables(modules, monkeypatch):
+    pipeline = modules.pipeline
+    tables = {
+        "ner_vaccination_supervision": make_coverage_rows(["rougeole", "polio"]),
+        "ner_spatial_units": pd.DataFrame({"org_unit_id": [1]}),
+    }
+    pipeline.write_tables_to_db(tables)
+
+    written_tables = []
+    write_to_db = pipeline.write_to_db
+    monkeypatch.setattr(
+        pipeline,
+        "write_to_db",
+        lambda df, table_name, connection: written_tables.append(table_name)
+        or write_to_db(df, table_name, connection),
+    )
+    pipeline.write_tables_to_db(
+        {**tables, "ner_spatial_units": pd.DataFrame({"org_unit_id": [1, 2]})}
+    )
+
+    assert written_tables == [f"ner_spatial_units{pipeline.db_staging_suffix}"]
+    assert read_table(pipeline, "ner_spatial_units")["org_unit_id"].tolist() == [1, 2]
+    with pipeline.get_db_engine().connect() as connection:
+        table_names = sa.inspect(connection).get_table_names()
+    assert not [
+        name for name in table_names if name.endswith(pipeline.db_staging_suffix)
+    ]
+
+
+def test_write_tables_to_db_keeps_the_published_tables_on_failure(modules, monkeypatch):
+    pipeline = modules.pipeline
+    publish_initial_run(
+        pipeline,
+        make_coverage_rows(["rougeole", "polio"]),
+        pd.DataFrame({"org_unit_id": [1]}),
+    )
+
+    write_to_db = pipeline.write_to_db
+
+    def failing_write_to_db(df, table_name, connection):
+        if table_name.startswith("ner_spatial_units"):
+            raise RuntimeError("connexion perdue")
+        write_to_db(df, table_name, connection)
+
+    monkeypatch.setattr(pipeline, "write_to_db", failing_write_to_db)
+    with pytest.raises(RuntimeError):
+        pipeline.write_tables_to_db(
+            {
+                "ner_vaccination_supervision": make_coverage_rows(["rougeole"], 5),
+                "ner_spatial_units": pd.DataFrame({"org_unit_id": [1, 2]}),
+            }
+        )
+
+    published = read_table(pipeline, "ner_vaccination_supervision")
+    assert published["value"].tolist() == [1, 1]
+    assert read_table(pipeline, "ner_spatial_units")["org_unit_id"].tolist() == [1]
+
+
+ORG_UNIT_TREE = pd.DataFrame(
+    {
+        "org_unit_id": [1, 2, 3],
+        "LVL_1_NAME": "Niger",
+        "LVL_1_UID": "n",
+        "LVL_2_NAME": ["R1", "R1", "R2"],
+        "LVL_2_UID": ["r1", "r1", "r2"],
+        "LVL_3_NAME": ["D1", "D1", "D2"],
+        "LVL_3_UID": ["d1", "d1", "d2"],
+        "LVL_6_NAME": ["C1", "C2", "C3"],
+        "LVL_6_UID": ["c1", "c2", "c3"],
+    }
+)
+FORM_PARTITIONS = [
+    ("polio", 2024, 1, ["2024-03-01", "2024-03-02"]),
+    ("polio", 2025, 1, ["2025-03-01", "2025-03-02"]),
+    ("rougeole", 2025, 1, ["2025-03-01", "2025-03-02"]),
+]
+
+
+def make_form_data(config, cross_campaign_values=True):
+    """
+    Form data of a few campaign rounds. The rougeole rows also report vitamine A doses, which
+    belong to the polio partition of the same round.
+    """
+    columns_campaign = {}
+    for campaign_map in config.unpivot_campaign_maps.values():
+        for campaign, cols in campaign_map.items():
+            for col in cols:
+                columns_campaign.setdefault(col, campaign)
+    vitamin_a_cols = [col for col in config.cvrg_polio_cols if "vitamine_a" in col][:4]
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for campaign, year, round_number, periods in FORM_PARTITIONS:
+        for period in periods:
+            for org_unit_id in ORG_UNIT_TREE["org_unit_id"]:
+                row = {
+                    "choix_campagne": campaign,
+                    "year": year,
+                    "round": round_number,
+                    "period": pd.Timestamp(period),
+                    "org_unit_id": org_unit_id,
+                    "month": "Mars",
+                }
+                for col, col_campaign in columns_campaign.items():
+                    if col_campaign == campaign:
+                        row[col] = float(rng.integers(0, 5))
+                if campaign == "rougeole" and cross_campaign_values:
+                    for col in vitamin_a_cols:
+                        row[col] = float(rng.integers(1, 5))
+                rows.append(row)
+    return pd.DataFrame(rows).reindex(
+        columns=list(dict.fromkeys([*rows[0], *columns_campaign]))
+    )
+
+
+def make_expected_structure(pipeline, form_df):
+    """The expected structure of the campaign rounds reported in the form data."""
+    cvrg_total, _ = pipeline.create_coverage_dataset(
+        pipeline.get_unpivoted_table(pipeline.unpivot_form_data(form_df), "couverture"),
+        pipeline.ExpectedStructure.from_dataframe(
+            pd.DataFrame(columns=["source", *pipeline.cvrg_expected_structure_cols])
+        ),
+    )
+    block_cols = ["produit", "year", "round"]
+    blocks = []
+    for values, block_rows in cvrg_total.groupby(block_cols, observed=True):
+        block = pd.DataFrame([dict(zip(block_cols, values))])
+        for dimension in ["age", "site", "vaccination_status", "sexe", "period"]:
+            block = block.merge(block_rows[[dimension]].drop_duplicates(), how="cross")
+        blocks.append(block)
+    expected_df = pd.concat(blocks, ignore_index=True).merge(
+        ORG_UNIT_TREE[["org_unit_id", "LVL_3_NAME", "LVL_6_NAME"]], how="cross"
+    )
+    expected_df["order_day"] = (
+        expected_df.groupby(block_cols, observed=True)["period"]
+        .rank(method="dense")
+        .astype(int)
+    )
+    expected_df["source"] = "test"
+    return expected_df
+
+
+def write_inputs(modules, form_df, expected_df):
+    shared_utils = modules.shared_utils
+    target_df = expected_df[
+        ["year", "produit", "round", "age", "LVL_3_NAME", "LVL_6_NAME", "org_unit_id"]
+    ].drop_duplicates()
+    target_df["cible"] = 100
+    shared_utils.save_file(form_df, "combined_iaso_data")
+    shared_utils.save_file(target_df, "combined_target_data")
+    shared_utils.save_expected_structure(
+        shared_utils.ExpectedStructure.from_dataframe(expected_df)
+    )
+    shared_utils.save_file(ORG_UNIT_TREE, "iaso_org_unit_tree_clean")
+
+
+def assert_same_rows(actual, expected):
+    assert sorted(actual.columns) == sorted(expected.columns)
+    cols = sorted(expected.columns)
+
+    def normalize(df):
+        normalized = df[cols].astype(str).sort_values(cols).reset_index(drop=True)
+        return normalized.rename_axis(columns=None)
+
+    pd.testing.assert_frame_equal(normalize(actual), normalize(expected))
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+@pytest.mark.parametrize(
+    "cross_campaign_values_after", [True, False], ids=["bump", "removed_feed"]
+)
+def test_incremental_rebuild_matches_full_rebuild(
+    modules, current_run, cross_campaign_values_after
+):
+    pipeline = modules.pipeline
+    form_df = make_form_data(modules.config)
+    expected_df = make_expected_structure(pipeline, form_df)
+    write_inputs(modules, form_df, expected_df)
+    pipeline.build_visualisation_tables()
+
+    # the polio rows of 2025 change, or the rougeole rows stop reporting vitamine A doses:
+    # in both cases the polio partition of 2025, fed by both campaigns, has to be rebuilt
+    if cross_campaign_values_after:
+        new_form_df = form_df.copy()
+        is_polio_2025 = (new_form_df["choix_campagne"] == "polio") & (
+            new_form_df["year"] == 2025
+        )
+        polio_col = next(
+            col for col in modules.config.cvrg_polio_cols if "vitamine_a" not in col
+        )
+        new_form_df.loc[is_polio_2025, polio_col] = 42.0
+    else:
+        new_form_df = make_form_data(modules.config, cross_campaign_values=False)
+    write_inputs(modules, new_form_df, expected_df)
+    current_run.messages.clear()
+    pipeline.build_visualisation_tables()
+
+    logged = [msg for _, msg in current_run.messages]
+    assert any("Reconstruction incrémentale" in msg for msg in logged)
+    assert not any("Reconstruction complète" in msg for msg in logged)
+    assert any("polio|2025|1" in msg for msg in logged)
+
+    full_tables = pipeline.build_partitioned_tables(
+        pipeline.load_data("combined_iaso_data"),
+        pipeline.load_data("combined_target_data"),
+        pipeline.load_expected_structure(),
+        pipeline.load_data("iaso_org_unit_tree_clean"),
+    )
+    for table_name, full_df in full_tables.items():
+        assert_same_rows(pipeline.load_data(table_name), full_df)
+
+
+def test_get_partition_outputs_follows_the_product_of_each_column(modules):
+    form_df = make_form_data(modules.config)
+
+    partition_outputs = modules.utils.get_partition_outputs(form_df)
+
+    assert partition_outputs["rougeole|2025|1"] == ["polio|2025|1", "rougeole|2025|1"]
+    assert partition_outputs["polio|2024|1"] == ["polio|2024|1"]
+
+
+def make_tricky_rows():
+    """Rows with missing values, embedded newlines and quotes, and a categorical column."""
+    return pd.DataFrame(
+        {
+            "choix_campagne": pd.Categorical(["polio", "rougeole", None]),
+            "comment": ["ligne 1\nligne 2", 'guillemet " et, virgule', None],
+            "year": [2025, 2025, 2024],
+            "value": [1.5, np.nan, 3.0],
+        }
+    )
+
+
+def test_write_to_db_round_trips_rows_on_sqlite(modules):
+    pipeline = modules.pipeline
+    df = make_tricky_rows()
+
+    with pipeline.get_db_engine().begin() as connection:
+        pipeline.write_to_db(df, "ner_vaccination_supervision", connection)
+    published = read_table(pipeline, "ner_vaccination_supervision")
+
+    assert published["choix_campagne"].tolist() == ["polio", "rougeole", None]
+    assert published["comment"].tolist() == [
+        "ligne 1\nligne 2",
+        'guillemet " et, virgule',
+        None,
+    ]
+    assert published["year"].tolist() == [2025, 2025, 2024]
+    assert published["value"].isna().tolist() == [False, True, False]
+
+
+class FakeCopyCursor:
+    """Fake psycopg2 cursor, keeping the COPY statements and their CSV payload."""
+
+    def __init__(self):
+        self.copies = []
+        self.closed = False
+
+    def copy_expert(self, sql, file):
+        self.copies.append((sql, file.read()))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCopy:
+    def __init__(self, copies, sql):
+        self.copies = copies
+        self.sql = sql
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def write(self, data):
+        self.copies.append((self.sql, data))
+
+
+class FakePsycopg3Cursor:
+    """Fake psycopg 3 cursor, keeping the COPY statements and their CSV payload."""
+
+    def __init__(self):
+        self.copies = []
+
+    def copy(self, sql):
+        return FakeCopy(self.copies, sql)
+
+    def close(self):
+        pass
+
+
+def fake_postgresql_connection(cursor):
+    return types.SimpleNamespace(
+        dialect=postgresql.dialect(),
+        connection=types.SimpleNamespace(cursor=lambda: cursor),
+    )
+
+
+@pytest.mark.parametrize("cursor_class", [FakeCopyCursor, FakePsycopg3Cursor])
+def test_append_dataframe_to_table_uses_copy_on_postgresql(
+    modules, monkeypatch, cursor_class
+):
+    pipeline = modules.pipeline
+    monkeypatch.setattr(pipeline, "db_copy_batch_size", 2)
+    cursor = cursor_class()
+
+    pipeline.append_dataframe_to_table(
+        make_tricky_rows(), "ner vaccination", fake_postgresql_connection(cursor)
+    )
+
+    assert [sql for sql, _ in cursor.copies] == [
+        'COPY "ner vaccination" (choix_campagne, comment, year, value) '
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    ] * 2
+    rows = [
+        row for _, payload in cursor.copies for row in csv.reader(io.StringIO(payload))
+    ]
+    assert rows == [
+        ["polio", "ligne 1\nligne 2", "2025", "1.5"],
+        ["rougeole", 'guillemet " et, virgule', "2025", "\\N"],
+        ["\\N", "\\N", "2024", "3.0"],
+    ]
+    if isinstance(cursor, FakeCopyCursor):
+        assert cursor.closed
+
+
+def all_form_columns(config):
+    return list(
+        dict.fromkeys(
+            col
+            for campaign_map in config.unpivot_campaign_maps.values()
+            for cols in campaign_map.values()
+            for col in cols
+        )
+    )
+
+
+@pytest.mark.parametrize("use_pattern", [False, True])
+def test_new_cols_matches_the_per_row_categorizers(modules, use_pattern):
+    utils = modules.utils
+    categories = all_form_columns(modules.config)
+    df = pd.DataFrame({"category": [*categories, np.nan, *categories[::-1]]})
+    function_list = [
+        utils.age_categorizer,
+        utils.site_categorizer,
+        utils.produit_categorizer,
+        utils.vaccination_status_categorizer,
+    ]
+    if use_pattern:
+        function_list = [
+            obj
+            for name, obj in vars(utils).items()
+            if callable(obj) and "categorizer" in name and obj.__module__ == "utils"
+        ]
+
+    result = utils.new_cols(
+        df.copy(), "categorizer", "category", None if use_pattern else function_list
+    )
+
+    for fun in function_list:
+        col = fun.__name__.rsplit("_", maxsplit=1)[0]
+        expected = df["category"].map(fun, na_action="ignore")
+        pd.testing.assert_series_equal(
+            result[col], expected.astype(object), check_names=False
+        )
+
+
+def test_sparse_melt_matches_the_filtered_dense_melt(modules):
+    df = pd.DataFrame(
+        {
+            "org_unit_id": [1, 2, 3],
+            "period": ["2025-03-01", "2025-03-02", "2025-03-03"],
+            "vpo_0_11_mois": [0.0, 2.0, np.nan],
+            "vpo_12_59_mois": [5.0, np.nan, 0.0],
+            "vpo_plus_59_mois": [1.0, 3.0, 4.0],
+        }
+    )
+    value_vars = ["vpo_0_11_mois", "vpo_12_59_mois", "vpo_plus_59_mois"]
+
+    long_df = modules.utils.sparse_melt(
+        df, ["org_unit_id", "period"], value_vars, "category", "value"
+    )
+
+    dense_df = pd.melt(
+        df.fillna(0),
+        id_vars=["org_unit_id", "period"],
+        value_vars=value_vars,
+        var_name="category",
+        value_name="value",
+    )
+    expected_df = dense_df[dense_df["value"] != 0].reset_index(drop=True)
+    pd.testing.assert_frame_equal(long_df, expected_df)
+
+
+def test_sparse_melt_keeps_integer_values_and_handles_no_cell(modules):
+    df = pd.DataFrame({"id": [1, 2], "a": [0, 7], "b": [0, 0]})
+
+    long_df = modules.utils.sparse_melt(df, ["id"], ["a", "b"])
+    empty_df = modules.utils.sparse_melt(df, ["id"], ["b"])
+
+    assert long_df.to_dict("records") == [{"id": 2, "variable": "a", "value": 7}]
+    assert long_df["value"].dtype == "int64"
+    assert empty_df.empty
+    assert list(empty_df.columns) == ["id", "variable", "value"]
+
+
+def test_unpivot_form_data_emits_each_cell_once_per_table_and_campaign(modules):
+    pipeline, config = modules.pipeline, modules.config
+    form_df = make_form_data(config)
+
+    unpivoted_df = pipeline.unpivot_form_data(form_df)
+
+    # the same cells as one melt per (table, campaign), as the table builders used to do
+    expected_frames = []
+    for table_name, campaign_map in config.unpivot_campaign_maps.items():
+        for campaign_name, cols in campaign_map.items():
+            valid_cols = list(dict.fromkeys(col for col in cols if col in form_df))
+            melted_df = pd.melt(
+                form_df.fillna(0),
+                id_vars=config.unpivot_id_vars,
+                value_vars=valid_cols,
+                var_name="category",
+                value_name="value",
+            )
+            expected_frames.append(
+                melted_df[melted_df["value"] != 0].assign(
+                    table=table_name, campaign=campaign_name
+                )
+            )
+    expected_df = pd.concat(expected_frames, ignore_index=True)
+
+    sort_cols = ["table", "campaign", "category", *config.unpivot_id_vars]
+    pd.testing.assert_frame_equal(
+        unpivoted_df[expected_df.columns].sort_values(sort_cols).reset_index(drop=True),
+        expected_df.sort_values(sort_cols).reset_index(drop=True),
+    )
+    coverage_df = pipeline.get_unpivoted_table(unpivoted_df, "couverture")
+    assert "table" not in coverage_df.columns
+    assert len(coverage_df) == (unpivoted_df["table"] == "couverture").sum()
+
+
+def test_combined_iaso_data_cols_cover_the_unpivoted_columns(modules):
+    config = modules.config
+
+    assert len(config.combined_iaso_data_cols) == len(
+        set(config.combined_iaso_data_cols)
+    )
+    assert set(all_form_columns(config)) | set(config.unpivot_id_vars) <= set(
+        config.combined_iaso_data_cols
+    )
@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+from test_shared_utils import BLOCKS, make_dense_expected_structure, sort_rows
+
+
+@pytest.fixture
+def modules(load_pipeline):
+    return load_pipeline("combine_expected_data_structures")
+
+
+def write_config_file(config_dir, name, config_df):
+    os.makedirs(config_dir, exist_ok=True)
+    config_df.drop(columns="source").to_parquet(
+        os.path.join(config_dir, f"{name}.parquet"), index=False
+    )
+
+
+def test_new_campaign_config_files_are_read_and_factorized(modules, tmp_path):
+    pipeline = modules.pipeline
+    config_dir = str(tmp_path / "config")
+    first_df = make_dense_expected_structure(BLOCKS[1:2])
+    second_df = make_dense_expected_structure(BLOCKS[2:])
+    write_config_file(config_dir, "config_rougeole", first_df)
+    write_config_file(config_dir, "config_polio", second_df)
+    write_config_file(config_dir, "brouillon", second_df)
+
+    structure = pipeline.generate_expected_data_structure_for_new_campaigns(config_dir)
+
+    materialized_df = structure.materialize(["produit", "round", "org_unit_id"])
+    assert sorted(structure.blocks()["source"].unique()) == [
+        "config_polio",
+        "config_rougeole",
+    ]
+    assert len(structure.materialize()) == len(first_df) + len(second_df)
+    assert set(materialized_df["produit"]) == {"polio", "rougeole"}
+
+
+def test_config_rows_are_deduplicated_on_their_natural_key(modules, tmp_path):
+    pipeline = modules.pipeline
+    config_dir = str(tmp_path / "config")
+    config_df = make_dense_expected_structure(BLOCKS[2:])
+    # the same expected row twice, with a different description of its org unit
+    duplicated_df = pd.concat(
+        [config_df, config_df.head(1).assign(LVL_6_NAME="aire renommée")],
+        ignore_index=True,
+    )
+    write_config_file(config_dir, "config_polio", duplicated_df)
+
+    structure = pipeline.generate_expected_data_structure_for_new_campaigns(config_dir)
+
+    assert len(structure.materialize()) == len(config_df)
+
+
+def test_invalid_config_file_is_reported(modules, tmp_path, current_run):
+    pipeline = modules.pipeline
+    config_dir = str(tmp_path / "config")
+    write_config_file(
+        config_dir, "config_rougeole", make_dense_expected_structure(BLOCKS[1:2])
+    )
+    # one expected row of the campaign round is missing from the cross product
+    polio_df = make_dense_expected_structure(BLOCKS[2:])
+    write_config_file(config_dir, "config_polio", polio_df.iloc[1:])
+
+    with pytest.raises(ValueError, match="config_polio.parquet") as error:
+        pipeline.generate_expected_data_structure_for_new_campaigns(config_dir)
+
+    assert "polio 2025 round 2 (source: config_polio" in str(error.value)
+    assert "rougeole" not in str(error.value)
+    assert current_run.messages[-1][0] == "error"
+
+
+def test_no_config_file_gives_no_structure(modules, tmp_path, current_run):
+    assert (
+        modules.pipeline.generate_expected_data_structure_for_new_campaigns(
+            str(tmp_path)
+        )
+        is None
+    )
+    assert current_run.messages[-1][0] == "warning"
+
+
+def test_combine_expected_data_structures(modules):
+    pipeline, shared_utils = modules.pipeline, modules.shared_utils
+    historical_df = make_dense_expected_structure(BLOCKS[:2])
+    new_df = make_dense_expected_structure(BLOCKS[2:])
+    shared_utils.save_expected_structure(
+        shared_utils.ExpectedStructure.from_dataframe(historical_df),
+        "expected_data_structure_historical_campaigns",
+    )
+    write_config_file(pipeline.CONFIG_PATH, "config_polio", new_df)
+
+    pipeline.combine_expected_data_structures()
+
+    combined = shared_utils.load_expected_structure()
+    expected_df = shared_utils.apply_categorical_schema(
+        pd.concat([historical_df, new_df], ignore_index=True)[
+            shared_utils.EXPECTED_STRUCTURE_COLUMNS
+        ]
+    )
+    pd.testing.assert_frame_equal(
+        sort_rows(combined.materialize()), sort_rows(expected_df)
+    )
@@ -0,0 +1,839 @@
+import base64
+import datetime
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from fake_iaso import (
+    FORM_ID,
+    FakeIASOServer,
+    install_fake_session,
+    make_handler,
+    make_instance,
+)
+
+
+@pytest.fixture
+def modules(load_pipeline):
+    return load_pipeline("extract_iaso_form_data")
+
+
+def current_period_str():
+    return time.strftime("%Y-%m")
+
+
+def write_month(pipeline, period_str, df):
+    pipeline.save_feather_file(
+        df,
+        os.path.join(
+            pipeline.IASO_EXTRACTION_PATH, f"multicampaign_df_{period_str}_raw.feather"
+        ),
+    )
+
+
+def read_month(pipeline, period_str):
+    return pd.read_feather(
+        os.path.join(
+            pipeline.IASO_EXTRACTION_PATH, f"multicampaign_df_{period_str}_raw.feather"
+        )
+    )
+
+
+def submissions(uuids, value, created_at=1_700_000_000, updated_at=None):
+    return pd.DataFrame(
+        {
+            "uuid": uuids,
+            "value": [value] * len(uuids),
+            "created_at": [float(created_at)] * len(uuids),
+            "updated_at": [float(updated_at or created_at)] * len(uuids),
+        }
+    )
+
+
+def test_upsert_monthly_partition_replaces_submissions_by_uuid(modules):
+    pipeline = modules.pipeline
+    write_month(pipeline, "2024-05", submissions(["a", "b"], value=1))
+
+    upserted = pipeline.upsert_monthly_partition(
+        submissions(["b", "c"], value=2, updated_at=1_700_000_100), "2024-05"
+    )
+
+    assert upserted
+    month_df = read_month(pipeline, "2024-05").sort_values("uuid")
+    assert month_df["uuid"].tolist() == ["a", "b", "c"]
+    assert month_df["value"].tolist() == [1, 2, 2]
+
+
+def test_upsert_monthly_partition_ignores_unmodified_submissions(modules):
+    pipeline = modules.pipeline
+    write_month(pipeline, "2024-05", submissions(["a", "b"], value=1))
+    file_path = os.path.join(
+        pipeline.IASO_EXTRACTION_PATH, "multicampaign_df_2024-05_raw.feather"
+    )
+    modified_time = os.stat(file_path).st_mtime_ns
+
+    # the day-level overlap of the delta brings back the stored submissions
+    upserted = pipeline.upsert_monthly_partition(
+        submissions(["a", "b"], value=2), "2024-05"
+    )
+
+    assert not upserted
+    assert os.stat(file_path).st_mtime_ns == modified_time
+    assert read_month(pipeline, "2024-05")["value"].tolist() == [1, 1]
+
+
+def test_upsert_monthly_partition_keeps_the_stored_schema(modules):
+    pipeline = modules.pipeline
+    month_df = submissions(["a"], value=1.5).assign(site="x", note=None)
+    month_table = pa.Table.from_pandas(month_df, preserve_index=False)
+    os.makedirs(pipeline.IASO_EXTRACTION_PATH)
+    pyarrow.feather.write_feather(
+        month_table,
+        os.path.join(
+            pipeline.IASO_EXTRACTION_PATH, "multicampaign_df_2024-05_raw.feather"
+        ),
+    )
+    delta_df = submissions(["b"], value=2).assign(site=3, note="ok", new_question=4)
+
+    assert pipeline.upsert_monthly_partition(delta_df, "2024-05")
+
+    table = pyarrow.feather.read_table(
+        os.path.join(
+            pipeline.IASO_EXTRACTION_PATH, "multicampaign_df_2024-05_raw.feather"
+        )
+    )
+    assert table.schema.field("value").type == pa.float64()
+    assert table.schema.field("site").type == pa.string()
+    assert table.schema.field("note").type == pa.string()
+    assert table.schema.field("new_question").type == pa.float64()
+    assert table.column("site").to_pylist() == ["x", "3"]
+    assert table.column("new_question").to_pylist() == [None, 4.0]
+
+
+def test_upsert_monthly_partition_skips_months_without_file(modules):
+    pipeline = modules.pipeline
+
+    upserted = pipeline.upsert_monthly_partition(submissions(["a"], value=1), "2024-06")
+
+    assert not upserted
+    # no file is created, so that the month is still planned for its full extraction
+    assert not os.path.exists(pipeline.IASO_EXTRACTION_PATH)
+
+
+class FakeConnector:
+    def __init__(self, delta_df):
+        self.delta_df = delta_df
+        self.requests = []
+
+    def extract_submissions_info(self, form_id, **filters):
+        self.requests.append(filters)
+        return self.delta_df
+
+
+def test_extract_iaso_data_since_watermark_upserts_existing_months_only(
+    modules, monkeypatch
+):
+    pipeline = modules.pipeline
+    may = pd.Timestamp("2024-05-10").timestamp()
+    june = pd.Timestamp("2024-06-10").timestamp()
+    write_month(pipeline, "2024-05", submissions(["a", "b"], value=1, created_at=may))
+    delta_df = pd.concat(
+        [
+            submissions(["b"], value=2, created_at=may, updated_at=june),
+            submissions(["d"], value=2, created_at=june),
+        ],
+        ignore_index=True,
+    )
+    connector = FakeConnector(delta_df)
+    monkeypatch.setattr(pipeline, "get_iaso_connector_instance", lambda: connector)
+
+    pipeline.extract_iaso_data_since_watermark(pd.Timestamp("2024-06-01").timestamp())
+
+    assert connector.requests == [{"modificationDateFrom": "2024-06-01"}]
+    month_df = read_month(pipeline, "2024-05").sort_values("uuid")
+    assert month_df["value"].tolist() == [1, 2]
+    # june has no file: its full extraction has not run yet, and must still be planned
+    assert not os.path.exists(
+        os.path.join(
+            pipeline.IASO_EXTRACTION_PATH, "multicampaign_df_2024-06_raw.feather"
+        )
+    )
+
+
+def test_watermark_file_keeps_the_watermark_and_the_refresh_time(modules):
+    pipeline = modules.pipeline
+    combined_df = pd.DataFrame(
+        {"uuid": ["a", "b"], "created_at": [10.0, 30.0], "updated_at": [20.0, None]}
+    )
+
+    pipeline.save_current_month_refresh_time(pipeline.iaso_form_id)
+    pipeline.save_extraction_watermark(pipeline.iaso_form_id, combined_df)
+
+    assert pipeline.load_extraction_watermark(pipeline.iaso_form_id) == 30.0
+    with open(pipeline.WATERMARK_FILE_PATH) as f:
+        watermarks = json.load(f)
+    assert "current_month_refreshed_at" in watermarks[str(pipeline.iaso_form_id)]
+
+
+def test_current_month_refresh_is_due_without_file_or_when_stale(modules):
+    pipeline = modules.pipeline
+    form_id = pipeline.iaso_form_id
+
+    pipeline.save_current_month_refresh_time(form_id)
+    assert pipeline.is_current_month_refresh_due(form_id)
+
+    write_month(pipeline, current_period_str(), submissions(["a"], value=1))
+    assert not pipeline.is_current_month_refresh_due(form_id)
+
+    watermarks = pipeline.read_watermark_file()
+    watermarks[str(form_id)]["current_month_refreshed_at"] = time.time() - (
+        pipeline.iaso_current_month_refresh_days * 86400 + 1
+    )
+    pipeline.write_watermark_file(watermarks)
+    assert pipeline.is_current_month_refresh_due(form_id)
+
+
+class FakeFormConnector:
+    form_version_id = 1
+
+    def get_data_structure_from_the_form(self, form_id):
+        pass
+
+
+@pytest.mark.parametrize(
+    "watermark, refresh_due, expected_calls",
+    [
+        (None, False, ["backfill", "current_month"]),
+        (100.0, False, ["backfill", "delta"]),
+        (100.0, True, ["backfill", "delta", "current_month"]),
+    ],
+)
+def test_backfill_runs_before_the_delta(
+    modules, monkeypatch, watermark, refresh_due, expected_calls
+):
+    pipeline = modules.pipeline
+    calls = []
+    monkeypatch.setattr(
+        pipeline,
+        "extract_iaso_data_for_other_months",
+        lambda: calls.append("backfill"),
+    )
+    monkeypatch.setattr(
+        pipeline,
+        "extract_iaso_data_since_watermark",
+        lambda watermark: calls.append("delta"),
+    )
+    monkeypatch.setattr(
+        pipeline,
+        "extract_iaso_data_for_current_month",
+        lambda: calls.append("current_month"),
+    )
+    monkeypatch.setattr(
+        pipeline, "load_extraction_watermark", lambda form_id: watermark
+    )
+    monkeypatch.setattr(
+        pipeline, "is_current_month_refresh_due", lambda form_id: refresh_due
+    )
+    monkeypatch.setattr(pipeline, "get_iaso_connector_instance", FakeFormConnector)
+    monkeypatch.setattr(pipeline, "build_partitions_manifest", lambda version_id: {})
+    monkeypatch.setattr(
+        pipeline, "partitions_changed_since_last_combine", lambda manifest: False
+    )
+
+    pipeline.extract_iaso_form_data()
+
+    assert calls == expected_calls
+
+
+def make_pages(page_count, page_size=3, duplicated_uuid=None):
+    pages = [
+        [
+            make_instance(
+                f"uuid-{page_id}-{row}", 1_700_000_000 + row, vpo_0_11_mois=row
+            )
+            for row in range(page_size)
+        ]
+        for page_id in range(1, page_count + 1)
+    ]
+    if duplicated_uuid:
+        pages[-1].append(dict(pages[0][0]))
+    return pages
+
+
+@pytest.fixture
+def iaso_server(modules, monkeypatch):
+    def install(*args, **kwargs):
+        server = FakeIASOServer(*args, **kwargs)
+        install_fake_session(monkeypatch, modules.utils, server)
+        return server
+
+    return install
+
+
+def test_submission_pages_are_yielded_in_page_order(modules, iaso_server):
+    server = iaso_server(make_pages(8), page_delay=0.02)
+    handler = make_handler(
+        modules.utils, max_concurrent_requests=4, requests_per_second=0
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    pages = list(handler._iter_submission_pages(FORM_ID, limit_batch=3))
+
+    assert [page.uuid.tolist()[0] for page in pages] == [
+        f"uuid-{page_id}-0" for page_id in range(1, 9)
+    ]
+    assert 1 < server.max_in_flight <= 4
+
+
+@pytest.mark.parametrize("max_concurrent_requests", [1, 3])
+def test_concurrent_requests_are_bounded(modules, iaso_server, max_concurrent_requests):
+    server = iaso_server(make_pages(10), page_delay=0.01)
+    handler = make_handler(
+        modules.utils,
+        max_concurrent_requests=max_concurrent_requests,
+        requests_per_second=0,
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    list(handler._iter_submission_pages(FORM_ID, limit_batch=3))
+
+    assert server.max_in_flight <= max_concurrent_requests
+    page_ids = sorted(
+        int(url.split("&page=")[1]) for url in server.requests if "&page=" in url
+    )
+    assert page_ids == list(range(2, 11))
+
+
+def test_submissions_are_deduplicated_across_pages(modules, iaso_server):
+    iaso_server(make_pages(3, duplicated_uuid=True))
+    handler = make_handler(
+        modules.utils, max_concurrent_requests=2, requests_per_second=0
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    submissions_df = handler._json_request_extract(FORM_ID, limit_batch=3)
+
+    assert len(submissions_df) == 9
+    assert submissions_df.uuid.is_unique
+
+
+def test_rate_limiter_throttles_after_the_burst(modules):
+    rate_limiter = modules.utils.TokenBucketRateLimiter(rate=20, capacity=2)
+
+    start = time.monotonic()
+    for _ in range(6):
+        rate_limiter.acquire()
+    elapsed = time.monotonic() - start
+
+    # 2 tokens available at once, then one token every 1/20 s
+    assert 0.18 <= elapsed < 1
+
+
+def test_rate_limiter_is_disabled_by_a_non_positive_rate(modules):
+    rate_limiter = modules.utils.TokenBucketRateLimiter(rate=0)
+
+    start = time.monotonic()
+    for _ in range(1000):
+        rate_limiter.acquire()
+
+    assert time.monotonic() - start < 0.5
+
+
+def test_page_flattening_matches_per_instance_flattening(modules, iaso_server):
+    iaso_server([])
+    handler = make_handler(modules.utils, requests_per_second=0)
+    handler.get_data_structure_from_the_form(FORM_ID)
+    instances = [
+        make_instance("a", 1_700_000_000, vpo_0_11_mois="3", site="x", hidden="y"),
+        make_instance("b", 1_700_000_001, vpo_0_11_mois="5"),
+        make_instance("a", 1_700_000_002, vpo_0_11_mois="4", site="z"),
+    ]
+
+    page_df = handler._json_iaso_crawler({"instances": instances})
+
+    per_instance_df = pd.concat(
+        [
+            handler._json_iaso_crawler({"instances": [instance]})
+            for instance in instances
+        ],
+        ignore_index=True,
+    ).drop_duplicates(subset="uuid")
+    pd.testing.assert_frame_equal(
+        page_df.reset_index(drop=True),
+        per_instance_df[page_df.columns].reset_index(drop=True),
+    )
+    assert page_df.uuid.tolist() == ["a", "b"]
+    assert "hidden" not in page_df.columns
+    assert {"vpo_0_11_mois", "site", "period", "org_unit_id"} <= set(page_df.columns)
+    assert not any(col.startswith("file_content_") for col in page_df.columns)
+
+
+def test_empty_page_is_flattened_to_the_instance_info_columns(modules, iaso_server):
+    iaso_server([])
+    handler = make_handler(modules.utils, requests_per_second=0)
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    page_df = handler._json_iaso_crawler({"instances": []})
+
+    assert page_df.empty
+    assert list(page_df.columns) == handler.instance_info_cols
+
+
+def test_form_structure_is_downloaded_once_per_version(modules, iaso_server, tmp_path):
+    server = iaso_server([])
+    cache_dir = str(tmp_path / "form_schema_cache")
+    handler = make_handler(
+        modules.utils, requests_per_second=0, schema_cache_dir=cache_dir
+    )
+
+    handler.get_data_structure_from_the_form(FORM_ID)
+    handler.get_data_structure_from_the_form(FORM_ID)
+    make_handler(
+        modules.utils, requests_per_second=0, schema_cache_dir=cache_dir
+    ).get_data_structure_from_the_form(FORM_ID)
+
+    assert server.xlsform_downloads == 1
+    assert handler.form_version_id == 7
+    assert os.listdir(cache_dir) == [f"form_{FORM_ID}_version_7_structure.pkl"]
+
+
+def test_form_structure_is_read_from_the_disk_cache(modules, iaso_server, tmp_path):
+    server = iaso_server([])
+    cache_dir = str(tmp_path / "form_schema_cache")
+    handler = make_handler(
+        modules.utils, requests_per_second=0, schema_cache_dir=cache_dir
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+    expected_structure_df = handler.form_data_structure_df
+
+    # a new run starts with an empty in-memory cache
+    modules.utils.IASOConnectionHandler._form_structure_cache.clear()
+    handler = make_handler(
+        modules.utils, requests_per_second=0, schema_cache_dir=cache_dir
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    assert server.xlsform_downloads == 1
+    pd.testing.assert_frame_equal(handler.form_data_structure_df, expected_structure_df)
+    assert list(handler.form_content_form_structure_base_columns_list) == [
+        "vpo_0_11_mois",
+        "site",
+    ]
+
+
+def test_new_form_version_is_downloaded(modules, iaso_server, tmp_path):
+    server = iaso_server([])
+    handler = make_handler(
+        modules.utils,
+        requests_per_second=0,
+        schema_cache_dir=str(tmp_path / "form_schema_cache"),
+    )
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    server.version_id = 8
+    server.questions = {**server.questions, "vpo_12_59_mois": "integer"}
+    handler.get_data_structure_from_the_form(FORM_ID)
+
+    assert server.xlsform_downloads == 2
+    assert handler.form_version_id == 8
+    assert "vpo_12_59_mois" in handler.form_content_form_structure_base_columns_list
+
+
+def period_form_convert_date(row):
+    """Row-wise conversion that period_processing replaced, kept as the reference."""
+    val_0 = row.iloc[0]
+
+    if len(str(val_0)) == 8 and str(val_0).isdigit():
+        return pd.to_datetime(val_0, format="%Y%m%d").strftime("%Y-%m-%d")
+    elif len(str(val_0)) >= 8:
+        return pd.to_datetime(val_0, format="%Y-%m-%d").strftime("%Y-%m-%d")
+    elif len(str(row.iloc[1])) >= 8:
+        return pd.to_datetime(row.iloc[1], unit="s").strftime("%Y-%m-%d")
+    else:
+        return val_0
+
+
+def test_period_processing_normalizes_mixed_formats(modules):
+    created_at = 1_715_000_000  # 2024-05-06
+    df = pd.DataFrame(
+        {
+            "period": ["20240510", "2024-05-11", None, "Invalid date", "202405"],
+            "created_at": [float(created_at)] * 5,
+        }
+    )
+
+    expected_df = df.copy()
+    expected_df.period = expected_df.period.mask(
+        expected_df.period == "Invalid date", None
+    )
+    expected_df.period = expected_df.period.mask(
+        expected_df.period.isna(),
+        expected_df.created_at.apply(
+            lambda x: pd.to_datetime(x, unit="s").strftime("%Y-%m-%d")
+        ),
+    )
+    expected_df.period = expected_df[["period", "created_at"]].apply(
+        period_form_convert_date, axis=1
+    )
+
+    result_df = modules.utils.period_processing(df.copy())
+
+    assert result_df.period.tolist() == expected_df.period.tolist()
+    assert result_df.period.tolist() == [
+        "2024-05-10",
+        "2024-05-11",
+        "2024-05-06",
+        "2024-05-06",
+        "2024-05-06",
+    ]
+
+
+def make_jwt(expires_at):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires_at}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+class FakeIASOAdapter(HTTPAdapter):
+    """Transport answering the IASO token endpoints and checking the bearer of API calls."""
+
+    def __init__(self, token_lifetime=3600, refresh_ok=True):
+        super().__init__()
+        self.token_lifetime = token_lifetime
+        self.refresh_ok = refresh_ok
+        self.valid_tokens = set()
+        self.calls = []
+
+    def new_access_token(self):
+        token = make_jwt(time.time() + self.token_lifetime) + str(len(self.calls))
+        self.valid_tokens = {token}
+        return token
+
+    def send(self, request, **kwargs):
+        path = urlparse(request.url).path
+        self.calls.append((request.method, path, request.headers.get("Authorization")))
+        if path == "/api/token/":
+            return self.make_response(
+                200, {"access": self.new_access_token(), "refresh": "refresh-token"}
+            )
+        if path == "/api/token/refresh/":
+            if not self.refresh_ok:
+                return self.make_response(401, {})
+            return self.make_response(200, {"access": self.new_access_token()})
+        bearer = (request.headers.get("Authorization") or "").removeprefix("Bearer ")
+        if bearer not in self.valid_tokens:
+            return self.make_response(401, {})
+        return self.make_response(200, {"ok": True})
+
+    @staticmethod
+    def make_response(status_code, payload):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode()
+        return response
+
+
+@pytest.fixture
+def iaso_session(modules):
+    def create(**adapter_kwargs):
+        session = modules.iaso_session.IASOSession(
+            "https://iaso.test", "user", "password"
+        )
+        adapter = FakeIASOAdapter(**adapter_kwargs)
+        session.mount("https://iaso.test", adapter)
+        session.authenticate()
+        return session, adapter
+
+    return create
+
+
+def test_session_sends_the_current_token(iaso_session):
+    session, adapter = iaso_session()
+
+    r = session.get(
+        "https://iaso.test/api/forms/1/", headers={"Authorization": "Bearer stale"}
+    )
+
+    assert r.status_code == 200
+    assert adapter.calls[-1][2] == f"Bearer {session._access_token}"
+
+
+def test_session_refreshes_a_rejected_token(iaso_session):
+    session, adapter = iaso_session()
+    # the server revokes the token in the middle of the extraction
+    adapter.valid_tokens = set()
+
+    r = session.get("https://iaso.test/api/instances/")
+
+    assert r.status_code == 200
+    assert [path for _, path, _ in adapter.calls] == [
+        "/api/token/",
+        "/api/instances/",
+        "/api/token/refresh/",
+        "/api/instances/",
+    ]
+
+
+def test_session_refreshes_an_expiring_token_before_the_request(iaso_session):
+    session, adapter = iaso_session(token_lifetime=30)
+
+    r = session.get("https://iaso.test/api/instances/")
+
+    assert r.status_code == 200
+    assert [path for _, path, _ in adapter.calls] == [
+        "/api/token/",
+        "/api/token/refresh/",
+        "/api/instances/",
+    ]
+
+
+def test_session_authenticates_again_when_the_refresh_is_rejected(iaso_session):
+    session, adapter = iaso_session(refresh_ok=False)
+    adapter.valid_tokens = set()
+
+    r = session.get("https://iaso.test/api/instances/")
+
+    assert r.status_code == 200
+    assert [path for _, path, _ in adapter.calls] == [
+        "/api/token/",
+        "/api/instances/",
+        "/api/token/refresh/",
+        "/api/token/",
+        "/api/instances/",
+    ]
+
+
+def test_session_does_not_send_the_token_outside_iaso(iaso_session):
+    session, adapter = iaso_session()
+    session.mount("https://files.test", adapter)
+
+    session.get("https://files.test/forms/7.xlsx")
+
+    assert adapter.calls[-1][2] is None
+
+
+def test_session_retries_throttled_and_server_errors(modules):
+    session = modules.iaso_session.IASOSession(
+        "https://iaso.test", "user", "password", max_retries=3
+    )
+
+    retry_policy = session.get_adapter("https://iaso.test/").max_retries
+
+    assert retry_policy.total == 3
+    assert set(retry_policy.status_forcelist) == {429, 500, 502, 503, 504}
+    assert {"GET", "POST"} <= set(retry_policy.allowed_methods)
+    assert session.headers["Accept-Encoding"] == "gzip, deflate"
+
+
+def test_plan_missing_months_skips_saved_months_and_the_current_month(modules):
+    existing_files = [
+        "multicampaign_df_2024-02_raw.feather",
+        "multicampaign_df_2024-12_raw.feather.tmp",
+    ]
+
+    missing_months = modules.pipeline.plan_missing_months(2025, 2, existing_files)
+
+    assert [month[0] for month in missing_months] == [
+        "2024-01",
+        *[f"2024-{month:02d}" for month in range(3, 13)],
+        "2025-01",
+    ]
+    assert dict((month[0], month[1:]) for month in missing_months)["2024-12"] == (
+        datetime.date(2024, 12, 1),
+        datetime.date(2025, 1, 1),
+    )
+
+
+class FakeBackfillConnector:
+    """Fake connection handler writing one feather file per extracted month."""
+
+    def __init__(self, failing_period_start=None):
+        self.failing_period_start = failing_period_start
+        self.structure_loads = 0
+        self.extracted_months = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get_data_structure_from_the_form(self, form_id):
+        self.structure_loads += 1
+
+    def extract_submissions_to_file(
+        self, form_id, file_path, dateFrom, dateTo, load_form_structure=True
+    ):
+        if load_form_structure:
+            self.structure_loads += 1
+        with self._lock:
+            self.threads.add(threading.get_ident())
+        time.sleep(0.02)
+        if dateFrom == self.failing_period_start:
+            raise RuntimeError("IASO indisponible")
+        submissions(["a"], value=1).to_feather(file_path)
+        with self._lock:
+            self.extracted_months.append(dateFrom)
+        return 1
+
+
+def test_backfill_extracts_the_missing_months_in_parallel(
+    modules, monkeypatch, current_run
+):
+    pipeline = modules.pipeline
+    missing_months = pipeline.plan_missing_months(2024, 7, [])
+    connector = FakeBackfillConnector(failing_period_start="2024-03-01")
+    connectors = []
+    monkeypatch.setattr(
+        pipeline,
+        "get_iaso_connector_instance",
+        lambda **kwargs: connectors.append(kwargs) or connector,
+    )
+    monkeypatch.setattr(
+        pipeline, "plan_missing_months", lambda *args: list(missing_months)
+    )
+    monkeypatch.setattr(pipeline, "iaso_backfill_max_workers", 3)
+    os.makedirs(pipeline.IASO_EXTRACTION_PATH, exist_ok=True)
+
+    pipeline.extract_iaso_data_for_other_months()
+
+    # a single authenticated connection sized for the workers, and the form structure loaded once
+    assert connectors == [{"max_parallel_extractions": 3}]
+    assert connector.structure_loads == 1
+    assert len(connector.threads) > 1
+    assert sorted(os.listdir(pipeline.IASO_EXTRACTION_PATH)) == [
+        f"multicampaign_df_2024-{month:02d}_raw.feather" for month in [1, 2, 4, 5, 6]
+    ]
+    errors = [msg for level, msg in current_run.messages if level == "error"]
+    assert len(errors) == 1
+    assert "2024-03" in errors[0]
+    progress = [msg for level, msg in current_run.messages if "/6]" in msg]
+    assert len(progress) == 6
+
+
+def test_connection_pool_is_sized_for_the_parallel_extractions(modules, iaso_server):
+    iaso_server = iaso_server([])
+    make_handler(modules.utils, max_concurrent_requests=4)
+    assert iaso_server.session_kwargs["pool_maxsize"] == 10
+
+    make_handler(modules.utils, max_concurrent_requests=4, max_parallel_extractions=6)
+    assert iaso_server.session_kwargs["pool_maxsize"] == 24
+
+
+def test_submissions_are_streamed_to_a_deduplicated_file(
+    modules, iaso_server, tmp_path
+):
+    pages = make_pages(3, duplicated_uuid=True)
+    # only the second page answers 'site': the column still gets its fixed type,
+    # and it repeats one of its own submissions
+    pages[1] = [
+        make_instance(f"uuid-2-{row}", 1_700_000_000, vpo_0_11_mois=row, site="x")
+        for row in range(3)
+    ]
+    pages[1].append(dict(pages[1][1]))
+    iaso_server(pages)
+    handler = make_handler(
+        modules.utils, max_concurrent_requests=2, requests_per_second=0
+    )
+    file_path = str(tmp_path / "extraction" / "month.feather")
+
+    row_count = handler.extract_submissions_to_file(FORM_ID, file_path)
+
+    table = pa.feather.read_table(file_path)
+    assert row_count == table.num_rows == 9
+    assert table.column("uuid").to_pylist() == [
+        f"uuid-{page_id}-{row}" for page_id in range(1, 4) for row in range(3)
+    ]
+    assert table.schema.field("vpo_0_11_mois").type == pa.float64()
+    assert table.schema.field("site").type == pa.string()
+    assert table.schema.field("created_at").type == pa.float64()
+    assert table.column("site").null_count == 6
+    # written as one record batch per page, without materializing the whole extraction
+    assert table.column("uuid").num_chunks == 3
+    assert os.listdir(tmp_path / "extraction") == ["month.feather"]
+
+
+def test_empty_extraction_keeps_the_existing_file(modules, iaso_server, tmp_path):
+    iaso_server([])
+    handler = make_handler(modules.utils, requests_per_second=0)
+    file_path = str(tmp_path / "month.feather")
+    submissions(["a"], value=1).to_feather(file_path)
+
+    row_count = handler.extract_submissions_to_file(FORM_ID, file_path)
+
+    assert row_count == 0
+    assert pd.read_feather(file_path).uuid.tolist() == ["a"]
+    assert os.listdir(tmp_path) == ["month.feather"]
+
+
+def test_combined_partitions_share_a_unified_schema(modules, current_run):
+    pipeline = modules.pipeline
+    write_month(
+        pipeline,
+        "2024-01",
+        pd.DataFrame(
+            {
+                "uuid": ["a", "b"],
+                "vpo_0_11_mois": pd.array([1, 2], dtype="int64"),
+                "site": [None, None],
+            }
+        ),
+    )
+    write_month(
+        pipeline,
+        "2024-02",
+        pd.DataFrame(
+            {"uuid": ["b", "c"], "vpo_0_11_mois": [2.5, 3.5], "site": ["x", "y"]}
+        ),
+    )
+
+    combined_df = pipeline.process_historical_and_current_data(
+        ["uuid", "vpo_0_11_mois", "site", "vpo_12_59_mois"]
+    )
+
+    assert combined_df.uuid.tolist() == ["a", "b", "c"]
+    assert combined_df.vpo_0_11_mois.dtype == "float64"
+    # the duplicated submission keeps its first occurrence, from the oldest month
+    assert combined_df.vpo_0_11_mois.tolist() == [1.0, 2.0, 3.5]
+    assert combined_df.site.tolist() == [None, None, "y"]
+    assert combined_df.vpo_12_59_mois.isna().all()
+    assert any("1 doublons" in msg for _, msg in current_run.messages)
+
+
+def test_unify_partition_schemas_falls_back_to_string(modules):
+    tables = [
+        pa.table({"a": pa.array([1], pa.int64()), "b": pa.array([None], pa.null())}),
+        pa.table({"a": pa.array(["x"]), "b": pa.array([1.5])}),
+    ]
+
+    schema = modules.pipeline.unify_partition_schemas(tables)
+
+    assert schema.field("a").type == pa.string()
+    assert schema.field("b").type == pa.float64()
+
+
+def test_combine_manifest_detects_changed_partitions(modules):
+    pipeline = modules.pipeline
+    write_month(pipeline, "2024-01", submissions(["a"], value=1))
+    manifest = pipeline.build_partitions_manifest(form_version_id=7)
+    assert pipeline.partitions_changed_since_last_combine(manifest)
+
+    with open(
+        os.path.join(pipeline.OUTPUTS_PATH, "combined_iaso_data_raw.parquet"), "wb"
+    ):
+        pass
+    pipeline.save_combine_manifest(manifest)
+
+    assert not pipeline.partitions_changed_since_last_combine(
+        pipeline.build_partitions_manifest(form_version_id=7)
+    )
+    assert pipeline.partitions_changed_since_last_combine(
+        pipeline.build_partitions_manifest(form_version_id=8)
+    )
+    write_month(pipeline, "2024-01", submissions(["a", "b"], value=1))
+    assert pipeline.partitions_changed_since_last_combine(
+        pipeline.build_partitions_manifest(form_version_id=7)
+    )
@@ -0,0 +1,595 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import FakeDatasetVersion
+
+
+@pytest.fixture
+def shared_utils(load_pipeline):
+    # shared_utils.py is the same in every pipeline folder (see test_vendored_modules)
+    return load_pipeline("build_visualisation_tables").shared_utils
+
+
+@pytest.fixture
+def in_memory_storage(shared_utils):
+    storage = shared_utils.InMemoryStorage()
+    previous_storage = shared_utils.get_storage_backend()
+    shared_utils.set_storage_backend(storage)
+    yield storage
+    shared_utils.set_storage_backend(previous_storage)
+
+
+def make_rows():
+    return pd.DataFrame(
+        {
+            "produit": ["polio", "rougeole", "polio"],
+            "year": [2024, 2025, 2025],
+            "value": [1, 2, 3],
+        }
+    )
+
+
+def test_save_file_rewrites_the_file_when_its_partition_columns_change(shared_utils):
+    df = make_rows()
+    file_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+
+    shared_utils.save_file(df, "data")
+    assert os.path.isfile(file_path)
+
+    shared_utils.save_file(df, "data", partition_cols=["produit"])
+    assert os.path.isdir(os.path.join(file_path, "produit=rougeole"))
+
+    shared_utils.save_file(df, "data")
+    assert os.path.isfile(file_path)
+    loaded = shared_utils.load_data("data").sort_values("value", ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, shared_utils.apply_categorical_schema(df))
+
+
+def test_save_file_keeps_an_unchanged_file(shared_utils):
+    df = make_rows()
+    shared_utils.save_file(df, "data", partition_cols=["produit"])
+    file_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    modified_time = os.stat(file_path).st_mtime_ns
+
+    shared_utils.save_file(df.astype({"produit": "category"}), "data", ["produit"])
+
+    assert os.stat(file_path).st_mtime_ns == modified_time
+
+
+def test_save_file_rewrites_changed_data(shared_utils):
+    shared_utils.save_file(make_rows(), "data")
+    file_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    modified_time = os.stat(file_path).st_mtime_ns
+
+    shared_utils.save_file(make_rows(), "data")
+    assert os.stat(file_path).st_mtime_ns == modified_time
+
+    changed_df = make_rows().assign(value=[1, 2, 4])
+    shared_utils.save_file(changed_df, "data")
+    assert os.stat(file_path).st_mtime_ns != modified_time
+    assert shared_utils.load_data("data")["value"].tolist() == [1, 2, 4]
+
+
+def test_export_to_dataset_skips_unchanged_data(shared_utils, workspace):
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+
+    shared_utils.export_to_dataset(make_rows(), export_path, "data", formats=("csv",))
+    shared_utils.export_to_dataset(make_rows(), export_path, "data", formats=("csv",))
+    dataset = workspace.get_dataset("data")
+    assert [version.name for version in dataset.versions] == ["v1"]
+
+    changed_df = make_rows().assign(value=[1, 2, 4])
+    shared_utils.export_to_dataset(changed_df, export_path, "data", formats=("csv",))
+    assert [version.name for version in dataset.versions] == ["v1", "v2"]
+    assert dataset.latest_version.files == ["data.csv"]
+
+
+def test_export_to_dataset_rewrites_missing_export_files(shared_utils, workspace):
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+    file_path = os.path.join(export_path, "data.csv")
+
+    shared_utils.export_to_dataset(make_rows(), export_path, "data", formats=("csv",))
+    os.remove(file_path)
+    shared_utils.export_to_dataset(make_rows(), export_path, "data", formats=("csv",))
+
+    dataset = workspace.get_dataset("data")
+    assert [version.name for version in dataset.versions] == ["v1", "v2"]
+    pd.testing.assert_frame_equal(pd.read_csv(file_path), make_rows())
+
+
+def test_export_to_dataset_uploads_the_saved_parquet_file(shared_utils, workspace):
+    df = make_rows()
+    shared_utils.save_file(df, "data")
+    file_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    modified_time = os.stat(file_path).st_mtime_ns
+
+    shared_utils.export_to_dataset(
+        df, shared_utils.OUTPUTS_PATH, "data", formats=("parquet",)
+    )
+
+    assert workspace.get_dataset("data").latest_version.files == ["data.parquet"]
+    # the file written by save_file is not rewritten, so its Arrow cache stays fresh
+    assert os.stat(file_path).st_mtime_ns == modified_time
+
+
+def test_in_memory_storage_round_trips_without_touching_the_workspace(
+    shared_utils, in_memory_storage
+):
+    df = make_rows()
+
+    shared_utils.save_file(df, "data", partition_cols=["produit"])
+    loaded = shared_utils.load_data("data", filters=[("year", "==", 2025)])
+
+    assert not os.path.exists(shared_utils.OUTPUTS_PATH)
+    assert {"data.parquet", "data.arrow"} <= set(in_memory_storage.files)
+    assert loaded["value"].tolist() == [2, 3]
+    assert isinstance(loaded["produit"].dtype, pd.CategoricalDtype)
+
+
+def test_load_data_of_a_missing_file_fails(shared_utils, in_memory_storage):
+    with pytest.raises(FileNotFoundError):
+        shared_utils.load_data("missing")
+
+
+def test_select_export_formats_skips_formats_over_their_row_limit(
+    shared_utils, current_run
+):
+    df = make_rows()
+
+    formats = shared_utils.select_export_formats(
+        df, ("parquet", "xlsx", "csv"), {"xlsx": 2, "csv": 3}
+    )
+
+    assert formats == ["parquet", "csv"]
+    assert [level for level, msg in current_run.messages if "xlsx" in msg] == [
+        "warning"
+    ]
+
+
+def test_export_to_dataset_writes_and_uploads_every_format(shared_utils, workspace):
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+
+    shared_utils.export_to_dataset(make_rows(), export_path, "data")
+
+    version = workspace.get_dataset("data").latest_version
+    assert sorted(version.files) == ["data.csv", "data.parquet", "data.xlsx"]
+    pd.testing.assert_frame_equal(
+        pd.read_csv(os.path.join(export_path, "data.csv")), make_rows()
+    )
+    pd.testing.assert_frame_equal(
+        pd.read_excel(os.path.join(export_path, "data.xlsx")), make_rows()
+    )
+
+
+def test_export_to_dataset_uploads_from_the_calling_thread(
+    shared_utils, workspace, monkeypatch
+):
+    upload_threads = []
+    add_file = FakeDatasetVersion.add_file
+
+    def record_add_file(self, file_path, file_name):
+        upload_threads.append(threading.get_ident())
+        add_file(self, file_path, file_name)
+
+    monkeypatch.setattr(FakeDatasetVersion, "add_file", record_add_file)
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+
+    shared_utils.export_to_dataset(make_rows(), export_path, "data")
+
+    assert upload_threads == [threading.get_ident()] * 3
+    assert len(workspace.get_dataset("data").versions) == 1
+
+
+def test_export_to_dataset_creates_no_version_when_a_writer_fails(
+    shared_utils, workspace, monkeypatch
+):
+    def write_export_file(df, format_type, file_path):
+        raise OSError("disque plein")
+
+    monkeypatch.setattr(shared_utils, "write_export_file", write_export_file)
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+
+    with pytest.raises(OSError):
+        shared_utils.export_to_dataset(make_rows(), export_path, "data")
+
+    assert workspace.get_dataset("data").versions == []
+
+
+def test_write_xlsx_streaming_splits_large_frames_over_sheets(shared_utils, tmp_path):
+    df = pd.DataFrame(
+        {
+            "name": [f"site {i}" for i in range(7)],
+            "value": [1.5, None, 3.0, 4.0, 5.0, 6.0, 7.0],
+            "date": pd.date_range("2025-01-01", periods=7, tz="UTC"),
+        }
+    )
+    file_path = str(tmp_path / "data.xlsx")
+
+    shared_utils.write_xlsx_streaming(df, file_path, max_rows_per_sheet=3)
+
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    assert list(sheets) == ["Sheet1", "Sheet2", "Sheet3"]
+    assert [len(sheet) for sheet in sheets.values()] == [3, 3, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(sheets.values(), ignore_index=True),
+        df.assign(date=df["date"].dt.tz_localize(None)),
+        check_dtype=False,
+    )
+
+
+def test_write_xlsx_streaming_writes_the_header_of_an_empty_frame(
+    shared_utils, tmp_path
+):
+    file_path = str(tmp_path / "data.xlsx")
+
+    shared_utils.write_xlsx_streaming(make_rows().head(0), file_path)
+
+    assert list(pd.read_excel(file_path).columns) == ["produit", "year", "value"]
+
+
+def test_export_to_dataset_splits_xlsx_at_the_sheet_row_limit(
+    shared_utils, monkeypatch
+):
+    monkeypatch.setattr(shared_utils, "XLSX_MAX_ROWS_PER_SHEET", 2)
+    monkeypatch.setattr(shared_utils, "XLSX_WRITE_BATCH_SIZE", 1)
+    export_path = os.path.join(shared_utils.OUTPUTS_PATH, "exports")
+
+    shared_utils.export_to_dataset(make_rows(), export_path, "data", formats=("xlsx",))
+
+    sheets = pd.read_excel(os.path.join(export_path, "data.xlsx"), sheet_name=None)
+    assert [len(sheet) for sheet in sheets.values()] == [2, 1]
+
+
+def test_dimension_columns_round_trip_as_sorted_categoricals(shared_utils):
+    df = pd.DataFrame(
+        {
+            "produit": ["rougeole", "polio", "rougeole"],
+            "LVL_3_NAME": ["Zinder", "Agadez", np.nan],
+            "org_unit_name": ["b", "a", "c"],
+            "year": [2025, 2024, 2025],
+        }
+    )
+
+    shared_utils.save_file(df, "data")
+    loaded = shared_utils.load_data("data")
+
+    assert list(loaded["produit"].cat.categories) == ["polio", "rougeole"]
+    assert list(loaded["LVL_3_NAME"].cat.categories) == ["Agadez", "Zinder"]
+    assert loaded["org_unit_name"].dtype == object
+    assert loaded["year"].dtype == "int64"
+    pd.testing.assert_frame_equal(
+        loaded.astype({"produit": object, "LVL_3_NAME": object}), df
+    )
+
+
+def test_apply_categorical_schema_does_not_depend_on_the_row_order(shared_utils):
+    df = make_rows()
+
+    categorical_df = shared_utils.apply_categorical_schema(df)
+    reversed_df = shared_utils.apply_categorical_schema(df.iloc[::-1])
+
+    assert categorical_df["produit"].dtype == reversed_df["produit"].dtype
+    assert shared_utils.apply_categorical_schema(categorical_df) is categorical_df
+    assert df["produit"].dtype == object
+
+
+BLOCKS = [
+    # source, produit, year, round, org units, ages, periods
+    ("historique", "polio", 2024, "round 1", [1, 2], ["0-11 mois", "12-59 mois"], 2),
+    ("historique", "rougeole", 2025, "round 1", [2, 3], ["9-59 mois"], 3),
+    ("nouvelle_campagne", "polio", 2025, "round 2", [1], ["0-59 mois"], 1),
+]
+
+
+def make_dense_expected_structure(blocks=BLOCKS):
+    """The expected rows as built before the structure was factorized: the cross product of each block."""
+    rows = []
+    for source, produit, year, round_name, org_unit_ids, ages, period_count in blocks:
+        periods = pd.date_range(f"{year}-03-01", periods=period_count)
+        for (
+            org_unit_id,
+            sexe,
+            age,
+            site,
+            status,
+            (order_day, period),
+        ) in itertools.product(
+            org_unit_ids,
+            ["F", "M"],
+            ages,
+            ["fixe", "mobile"],
+            ["vacciné"],
+            enumerate(periods, start=1),
+        ):
+            rows.append(
+                {
+                    "org_unit_id": org_unit_id,
+                    "LVL_3_NAME": f"district {org_unit_id % 2}",
+                    "LVL_6_NAME": f"aire {org_unit_id}",
+                    "sexe": sexe,
+                    "year": year,
+                    "produit": produit,
+                    "round": round_name,
+                    "age": age,
+                    "site": site,
+                    "vaccination_status": status,
+                    "period": period,
+                    "order_day": order_day,
+                    "source": source,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def sort_rows(df):
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_expected_structure_materializes_the_dense_frame(shared_utils):
+    dense_df = make_dense_expected_structure()
+
+    structure = shared_utils.ExpectedStructure.from_dataframe(dense_df)
+    materialized_df = structure.materialize()
+
+    expected_df = shared_utils.apply_categorical_schema(
+        dense_df[shared_utils.EXPECTED_STRUCTURE_COLUMNS]
+    )
+    pd.testing.assert_frame_equal(sort_rows(materialized_df), sort_rows(expected_df))
+    assert structure.block_sizes()["size"].sum() == len(dense_df)
+
+
+def test_expected_structure_projection_matches_the_dense_projection(shared_utils):
+    dense_df = make_dense_expected_structure()
+    structure = shared_utils.ExpectedStructure.from_dataframe(dense_df)
+    columns = ["produit", "year", "age", "LVL_3_NAME"]
+
+    projected_df = structure.materialize(columns)
+
+    expected_df = shared_utils.apply_categorical_schema(
+        dense_df[columns].drop_duplicates()
+    )
+    pd.testing.assert_frame_equal(sort_rows(projected_df), sort_rows(expected_df))
+
+
+def test_expected_structure_select_blocks_and_concat(shared_utils):
+    dense_df = make_dense_expected_structure()
+    structure = shared_utils.ExpectedStructure.from_dataframe(dense_df)
+
+    rougeole = structure.select_blocks(
+        pd.DataFrame(
+            [
+                {
+                    "source": "historique",
+                    "produit": "rougeole",
+                    "year": 2025,
+                    "round": "round 1",
+                }
+            ]
+        )
+    )
+    assert len(rougeole.materialize()) == (dense_df["produit"] == "rougeole").sum()
+
+    # a campaign round configured by two sources is materialized once
+    reconfigured_df = make_dense_expected_structure(BLOCKS[:1]).assign(
+        source="nouvelle_campagne"
+    )
+    combined = shared_utils.ExpectedStructure.concat(
+        [structure, shared_utils.ExpectedStructure.from_dataframe(reconfigured_df)]
+    )
+    pd.testing.assert_frame_equal(
+        sort_rows(combined.materialize()), sort_rows(structure.materialize())
+    )
+
+
+def test_expected_structure_rejects_rows_that_are_not_a_cross_product(shared_utils):
+    dense_df = make_dense_expected_structure()
+
+    with pytest.raises(
+        ValueError,
+        match=r"polio 2024 round 1 \(source: historique, 31 lignes au lieu de 32\)$",
+    ):
+        shared_utils.ExpectedStructure.from_dataframe(dense_df.iloc[1:])
+    with pytest.raises(ValueError):
+        shared_utils.ExpectedStructure.from_dataframe(dense_df.assign(extra=1))
+
+
+def test_expected_structure_save_and_load(shared_utils):
+    dense_df = make_dense_expected_structure()
+    structure = shared_utils.ExpectedStructure.from_dataframe(dense_df)
+
+    shared_utils.save_expected_structure(structure)
+    loaded = shared_utils.load_expected_structure()
+
+    pd.testing.assert_frame_equal(
+        sort_rows(loaded.materialize()), sort_rows(structure.materialize())
+    )
+
+
+@pytest.fixture(params=["local", "memory"])
+def storage(request, shared_utils):
+    if request.param == "local":
+        return shared_utils.get_storage_backend()
+    return request.getfixturevalue("in_memory_storage")
+
+
+def test_partitioned_file_filtered_read(shared_utils, storage):
+    df = make_rows()
+
+    shared_utils.save_file(df, "data", partition_cols=["produit", "year"])
+    # read the parquet file, not its Arrow cache
+    shared_utils.get_storage_backend().remove("data.arrow")
+    loaded = shared_utils.load_data(
+        "data", filters=[("produit", "in", ["polio"]), ("year", "==", 2025)]
+    )
+
+    assert loaded["value"].tolist() == [3]
+    assert loaded["year"].dtype == "int64"
+    assert isinstance(loaded["produit"].dtype, pd.CategoricalDtype)
+
+
+def test_partitioned_read_skips_the_other_partitions(shared_utils):
+    shared_utils.save_file(make_rows(), "data", partition_cols=["produit", "year"])
+    dataset_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    assert sorted(os.listdir(dataset_path)) == [
+        shared_utils.PARQUET_DATASET_METADATA,
+        "produit=polio",
+        "produit=rougeole",
+    ]
+    assert sorted(os.listdir(os.path.join(dataset_path, "produit=polio"))) == [
+        "year=2024",
+        "year=2025",
+    ]
+
+    # a partition that is not read can not fail the read
+    rougeole_path = os.path.join(dataset_path, "produit=rougeole", "year=2025")
+    for file_name in os.listdir(rougeole_path):
+        with open(os.path.join(rougeole_path, file_name), "wb") as f:
+            f.write(b"not a parquet file")
+    loaded = shared_utils.get_storage_backend().read_parquet(
+        "data.parquet", filters=[("produit", "==", "polio")]
+    )
+
+    assert sorted(loaded["value"].tolist()) == [1, 3]
+
+
+def test_expected_structure_is_saved_partitioned_and_loaded_filtered(shared_utils):
+    dense_df = make_dense_expected_structure()
+    shared_utils.save_expected_structure(
+        shared_utils.ExpectedStructure.from_dataframe(dense_df)
+    )
+
+    org_units_path = os.path.join(
+        shared_utils.OUTPUTS_PATH, "expected_data_structure_org_units.parquet"
+    )
+    assert os.path.isdir(os.path.join(org_units_path, "produit=polio", "year=2025"))
+
+    columns = ["produit", "year", "org_unit_id", "age"]
+    loaded = shared_utils.load_expected_structure(
+        columns=columns, filters={"produit": ["rougeole"], "age": ["9-59 mois"]}
+    )
+
+    assert list(loaded.dimensions["periods"].columns) == (
+        shared_utils.EXPECTED_STRUCTURE_KEYS
+    )
+    expected_df = shared_utils.apply_categorical_schema(
+        dense_df.loc[dense_df["produit"] == "rougeole", columns].drop_duplicates()
+    )
+    pd.testing.assert_frame_equal(
+        sort_rows(loaded.materialize(columns)), sort_rows(expected_df)
+    )
+
+
+@pytest.mark.parametrize("from_cache", [True, False])
+def test_load_data_projects_columns_and_pushes_filters(
+    shared_utils, storage, from_cache
+):
+    shared_utils.save_file(make_rows(), "data")
+    if not from_cache:
+        storage.remove("data.arrow")
+
+    loaded = shared_utils.load_data(
+        "data",
+        columns=["value", "absent", "produit"],
+        filters=[("year", ">=", 2025), ("produit", "in", ["polio"])],
+    )
+
+    assert list(loaded.columns) == ["value", "produit"]
+    assert loaded["value"].tolist() == [3]
+
+
+def loaded_from(current_run):
+    return [msg for _, msg in current_run.messages if "chargées avec succès" in msg][-1]
+
+
+def test_load_data_uses_the_fresh_arrow_cache(shared_utils, current_run):
+    shared_utils.save_file(make_rows(), "data")
+
+    loaded = shared_utils.load_data("data")
+
+    assert loaded_from(current_run).endswith("data.arrow")
+    pd.testing.assert_frame_equal(
+        loaded, shared_utils.apply_categorical_schema(make_rows())
+    )
+
+
+def test_arrow_cache_is_stale_after_an_external_parquet_rewrite(
+    shared_utils, current_run
+):
+    shared_utils.save_file(make_rows(), "data")
+    file_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    cache_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.arrow")
+    make_rows().assign(value=[7, 8, 9]).to_parquet(file_path, index=False)
+    cache_modified_time = os.path.getmtime(cache_path)
+    os.utime(file_path, (cache_modified_time + 10, cache_modified_time + 10))
+
+    loaded = shared_utils.load_data("data")
+
+    assert loaded_from(current_run).endswith("data.parquet")
+    assert loaded["value"].tolist() == [7, 8, 9]
+
+    # the rewritten parquet file no longer holds the saved data: saving it again rewrites it
+    shared_utils.save_file(make_rows(), "data")
+    assert shared_utils.load_data("data")["value"].tolist() == [1, 2, 3]
+    assert loaded_from(current_run).endswith("data.arrow")
+
+
+def test_arrow_cache_is_stale_after_an_external_partition_rewrite(
+    shared_utils, current_run
+):
+    shared_utils.save_file(make_rows(), "data", partition_cols=["produit"])
+    dataset_path = os.path.join(shared_utils.OUTPUTS_PATH, "data.parquet")
+    cache_modified_time = os.path.getmtime(
+        os.path.join(shared_utils.OUTPUTS_PATH, "data.arrow")
+    )
+    storage = shared_utils.LocalStorage(shared_utils.OUTPUTS_PATH)
+    [partition_path] = [
+        os.path.join(dir_path, file_name)
+        for dir_path, _, file_names in os.walk(dataset_path)
+        if dir_path.endswith("produit=polio")
+        for file_name in file_names
+    ]
+    # a partition file rewritten in place leaves the mtime of the dataset directory unchanged
+    pd.read_parquet(partition_path).assign(value=9).to_parquet(partition_path)
+    os.utime(partition_path, (cache_modified_time + 10, cache_modified_time + 10))
+    assert storage.modified_time("data.parquet") == cache_modified_time + 10
+
+    loaded = shared_utils.load_data("data")
+
+    assert loaded_from(current_run).endswith("data.parquet")
+    assert sorted(loaded["value"].tolist()) == [2, 9, 9]
+
+    shared_utils.save_file(make_rows(), "data", partition_cols=["produit"])
+    assert sorted(shared_utils.load_data("data")["value"].tolist()) == [1, 2, 3]
+    assert loaded_from(current_run).endswith("data.arrow")
+
+    # the metadata files of the dataset count as well
+    metadata_path = os.path.join(dataset_path, "_common_metadata")
+    open(metadata_path, "wb").close()
+    os.utime(metadata_path, (cache_modified_time + 20, cache_modified_time + 20))
+    assert storage.modified_time("data.parquet") == cache_modified_time + 20
+
+
+def test_arrow_cache_is_stale_when_its_fingerprint_differs(
+    shared_utils, storage, current_run
+):
+    shared_utils.save_file(make_rows(), "data")
+    shared_utils.write_fingerprint(
+        storage, "data.parquet.fingerprint", {"fingerprint": "other"}
+    )
+
+    assert shared_utils.read_arrow_cache(storage, "data") is None
+    assert shared_utils.load_data("data")["value"].tolist() == [1, 2, 3]
+    assert loaded_from(current_run).endswith("data.parquet")
+
+
+def test_save_file_replaces_the_cache_of_changed_data(shared_utils, storage):
+    shared_utils.save_file(make_rows(), "data")
+    shared_utils.save_file(make_rows().assign(value=[4, 5, 6]), "data")
+
+    cached = shared_utils.read_arrow_cache(storage, "data")
+
+    assert cached["value"].tolist() == [4, 5, 6]
@@ -0,0 +1,32 @@
+"""
+Each pipeline folder is deployed on its own, so the modules shared by several pipelines are vendored
+(copied) in each folder that uses them. The copies must stay identical: edit one copy, then copy it to
+the other folders.
+"""
+
+import glob
+import os
+
+import pytest
+
+from conftest import REPO_PATH
+
+VENDORED_MODULES = ["shared_utils.py", "iaso_session.py"]
+
+
+@pytest.mark.parametrize("module_name", VENDORED_MODULES)
+def test_vendored_module_copies_are_identical(module_name):
+    copies = sorted(glob.glob(os.path.join(REPO_PATH, "*", module_name)))
+    assert len(copies) > 1
+
+    with open(copies[0], "rb") as f:
+        reference_content = f.read()
+    different_copies = []
+    for copy_path in copies[1:]:
+        with open(copy_path, "rb") as f:
+            if f.read() != reference_content:
+                different_copies.append(os.path.relpath(copy_path, REPO_PATH))
+
+    assert (
+        not different_copies
+    ), f"{', '.join(different_copies)} differ(s) from {os.path.relpath(copies[0], REPO_PATH)}"